@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from safedelete.admin import SafeDeleteAdmin
+
+from .models import FanOutParent, WideModel
+
+
+@admin.register(WideModel)
+class WideModelAdmin(SafeDeleteAdmin):
+    pass
+
+
+@admin.register(FanOutParent)
+class FanOutParentAdmin(SafeDeleteAdmin):
+    pass
@@ -0,0 +1,318 @@
+"""The benchmarks, named after the operation measured and the data set it runs on."""
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory
+
+from safedelete.config import HARD_DELETE
+
+from . import data
+from .models import (
+    TREE_MODELS,
+    Article,
+    FanOutParent,
+    NoCascadeModel,
+    WideModel,
+)
+from .runner import benchmark
+
+# Model delete() and undelete()
+
+
+@benchmark('delete.model.soft')
+def delete_model_soft(size):
+    objs = data.make_wide(size)
+
+    def run():
+        for obj in objs:
+            obj.delete()
+    return run
+
+
+@benchmark('delete.model.hard')
+def delete_model_hard(size):
+    objs = data.make_wide(size)
+
+    def run():
+        for obj in objs:
+            obj.delete(force_policy=HARD_DELETE)
+    return run
+
+
+@benchmark('delete.model.hard_nocascade')
+def delete_model_hard_nocascade(size):
+    objs = data.make_no_cascade(size, dependent=size // 2)
+
+    def run():
+        for obj in objs:
+            obj.delete()
+    return run
+
+
+@benchmark('undelete.model')
+def undelete_model(size):
+    data.make_wide(size, deleted=size)
+    objs = list(WideModel.deleted_objects.all())
+
+    def run():
+        for obj in objs:
+            obj.undelete()
+    return run
+
+
+# Queryset delete() and undelete()
+
+
+@benchmark('delete.queryset.soft')
+def delete_queryset_soft(size):
+    data.make_wide(size)
+
+    def run():
+        WideModel.objects.all().delete()
+    return run
+
+
+@benchmark('delete.queryset.hard')
+def delete_queryset_hard(size):
+    data.make_wide(size)
+
+    def run():
+        WideModel.objects.all().delete(force_policy=HARD_DELETE)
+    return run
+
+
+@benchmark('delete.queryset.hard_nocascade')
+def delete_queryset_hard_nocascade(size):
+    data.make_no_cascade(size, dependent=size // 2)
+
+    def run():
+        NoCascadeModel.objects.all().delete()
+    return run
+
+
+@benchmark('undelete.queryset')
+def undelete_queryset(size):
+    data.make_wide(size, deleted=size)
+
+    def run():
+        WideModel.deleted_objects.all().undelete()
+    return run
+
+
+# SOFT_DELETE_CASCADE, "size" being the number of roots of the trees or parents of the fan out
+
+
+@benchmark('cascade.tree.delete.model')
+def cascade_tree_delete_model(size):
+    roots = data.make_tree(size)
+
+    def run():
+        for root in roots:
+            root.delete()
+    return run
+
+
+@benchmark('cascade.tree.delete.queryset')
+def cascade_tree_delete_queryset(size):
+    data.make_tree(size)
+
+    def run():
+        TREE_MODELS[0].objects.all().delete()
+    return run
+
+
+@benchmark('cascade.tree.undelete.model')
+def cascade_tree_undelete_model(size):
+    data.make_tree(size)
+    TREE_MODELS[0].objects.all().delete()
+    roots = list(TREE_MODELS[0].deleted_objects.all())
+
+    def run():
+        for root in roots:
+            root.undelete()
+    return run
+
+
+@benchmark('cascade.tree.undelete.queryset')
+def cascade_tree_undelete_queryset(size):
+    data.make_tree(size)
+    TREE_MODELS[0].objects.all().delete()
+
+    def run():
+        TREE_MODELS[0].deleted_objects.all().undelete()
+    return run
+
+
+@benchmark('cascade.fan_out.delete.queryset')
+def cascade_fan_out_delete_queryset(size):
+    data.make_fan_out(size)
+
+    def run():
+        FanOutParent.objects.all().delete()
+    return run
+
+
+@benchmark('cascade.fan_out.undelete.queryset')
+def cascade_fan_out_undelete_queryset(size):
+    data.make_fan_out(size)
+    FanOutParent.objects.all().delete()
+
+    def run():
+        FanOutParent.deleted_objects.all().undelete()
+    return run
+
+
+@benchmark('cascade.m2m.delete.queryset')
+def cascade_m2m_delete_queryset(size):
+    data.make_articles(size)
+
+    def run():
+        Article.objects.all().delete()
+    return run
+
+
+# update_or_create(), "size" being the number of calls
+
+
+@benchmark('update_or_create.create')
+def update_or_create_create(size):
+    def run():
+        for index in range(size):
+            WideModel.objects.update_or_create(code='code-%d' % index, defaults={'field_0': 'created'})
+    return run
+
+
+@benchmark('update_or_create.update')
+def update_or_create_update(size):
+    data.make_wide(size)
+
+    def run():
+        for index in range(size):
+            WideModel.objects.update_or_create(code='code-%d' % index, defaults={'field_0': 'updated'})
+    return run
+
+
+@benchmark('update_or_create.revive')
+def update_or_create_revive(size):
+    data.make_wide(size, deleted=size)
+
+    def run():
+        for index in range(size):
+            WideModel.objects.update_or_create(code='code-%d' % index, defaults={'field_0': 'revived'})
+    return run
+
+
+@benchmark('bulk_update_or_create')
+def bulk_update_or_create(size):
+    # A third of the objects are alive, a third soft deleted and a third created.
+    data.make_wide(size * 2 // 3, deleted=size // 3)
+    objs = [{'code': 'code-%d' % index, 'field_0': 'value'} for index in range(size)]
+
+    def run():
+        WideModel.objects.bulk_update_or_create(objs, unique_fields=['code'], update_fields=['field_0'])
+    return run
+
+
+# Admin actions, on the soft deleted parents of a fan out
+
+
+def admin_request(post):
+    user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+    request = RequestFactory().post('/', {'post': 'yes'} if post else {})
+    request.user = user
+    request._messages = CookieStorage(request)
+    return request
+
+
+def admin_action(action, post, size):
+    data.make_fan_out(size)
+    FanOutParent.objects.all().delete()
+    model_admin = admin.site._registry[FanOutParent]
+    request = admin_request(post)
+
+    def run():
+        response = getattr(model_admin, action)(request, FanOutParent.all_objects.all())
+        if response is not None:
+            response.render()
+    return run
+
+
+@benchmark('admin.undelete_selected.confirm')
+def admin_undelete_selected_confirm(size):
+    return admin_action('undelete_selected', False, size)
+
+
+@benchmark('admin.undelete_selected.post')
+def admin_undelete_selected_post(size):
+    return admin_action('undelete_selected', True, size)
+
+
+@benchmark('admin.hard_delete_soft_deleted.confirm')
+def admin_hard_delete_soft_deleted_confirm(size):
+    return admin_action('hard_delete_soft_deleted', False, size)
+
+
+@benchmark('admin.hard_delete_soft_deleted.post')
+def admin_hard_delete_soft_deleted_post(size):
+    return admin_action('hard_delete_soft_deleted', True, size)
+
+
+# Reads through the safedelete manager, compared to a vanilla manager on the same table
+
+
+@benchmark('read.list.safedelete')
+def read_list_safedelete(size):
+    data.make_wide(size)
+
+    def run():
+        list(WideModel.objects.all())
+    return run
+
+
+@benchmark('read.list.vanilla')
+def read_list_vanilla(size):
+    data.make_wide(size)
+
+    def run():
+        list(WideModel.vanilla_objects.all())
+    return run
+
+
+@benchmark('read.get.safedelete')
+def read_get_safedelete(size):
+    objs = data.make_wide(size)
+
+    def run():
+        for obj in objs:
+            WideModel.objects.get(pk=obj.pk)
+    return run
+
+
+@benchmark('read.get.vanilla')
+def read_get_vanilla(size):
+    objs = data.make_wide(size)
+
+    def run():
+        for obj in objs:
+            WideModel.vanilla_objects.get(pk=obj.pk)
+    return run
+
+
+@benchmark('read.m2m.safedelete')
+def read_m2m_safedelete(size):
+    data.make_articles(size)
+
+    def run():
+        for article in Article.objects.prefetch_related('tags'):
+            list(article.tags.all())
+    return run
+
+
+@benchmark('read.m2m.vanilla')
+def read_m2m_vanilla(size):
+    data.make_articles(size)
+
+    def run():
+        for article in Article.vanilla_objects.prefetch_related('tags'):
+            list(article.tags.all())
+    return run
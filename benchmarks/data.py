@@ -0,0 +1,76 @@
+"""Synthetic data generators, creating the objects with ``bulk_create()``.
+
+The generators return the objects created, with their primary keys since SQLite returns them.
+"""
+from django.utils import timezone
+
+from safedelete.config import FIELD_NAME
+
+from .models import (
+    FAN_OUT_MODELS,
+    TREE_MODELS,
+    Article,
+    FanOutParent,
+    NoCascadeChild,
+    NoCascadeModel,
+    Tag,
+    WideModel,
+)
+
+
+def soft_delete(model, objs):
+    """ Mark "objs" as soft deleted without going through safedelete. """
+    model._base_manager.filter(pk__in=[obj.pk for obj in objs]).update(**{FIELD_NAME: timezone.now()})
+
+
+def make_wide(count, deleted=0):
+    """ Create "count" wide objects, the first "deleted" ones soft deleted. """
+    objs = WideModel.objects.bulk_create(WideModel(code='code-%d' % index) for index in range(count))
+    if deleted:
+        soft_delete(WideModel, objs[:deleted])
+    return objs
+
+
+def make_tree(roots, fan_out=2, depth=len(TREE_MODELS)):
+    """ Create "roots" trees, each object having "fan_out" children on the next level, up to "depth" levels.
+
+    Returns the roots. A tree has ``sum(fan_out ** level for level in range(depth))`` objects.
+    """
+    parents = TREE_MODELS[0].objects.bulk_create(TREE_MODELS[0](name='root-%d' % index) for index in range(roots))
+    root_objs = parents
+    for model in TREE_MODELS[1:depth]:
+        parents = model.objects.bulk_create(
+            model(parent=parent, name='%s-%d' % (parent.name, index))
+            for parent in parents for index in range(fan_out)
+        )
+    return root_objs
+
+
+def make_fan_out(parents, children=10):
+    """ Create "parents" objects referenced by "children" objects of each fan out model. """
+    parent_objs = FanOutParent.objects.bulk_create(FanOutParent(name='parent-%d' % index) for index in range(parents))
+    for model in FAN_OUT_MODELS:
+        model.objects.bulk_create(
+            model(parent=parent, name='child-%d' % index)
+            for parent in parent_objs for index in range(children)
+        )
+    return parent_objs
+
+
+def make_no_cascade(count, dependent=0):
+    """ Create "count" objects, the first "dependent" ones referenced by an object. """
+    objs = NoCascadeModel.objects.bulk_create(NoCascadeModel(name='name-%d' % index) for index in range(count))
+    NoCascadeChild.objects.bulk_create(NoCascadeChild(parent=obj) for obj in objs[:dependent])
+    return objs
+
+
+def make_articles(count, tags=5, tags_per_article=3):
+    """ Create "count" articles each linked to "tags_per_article" of "tags" tags. """
+    tag_objs = Tag.objects.bulk_create(Tag(name='tag-%d' % index) for index in range(tags))
+    articles = Article.objects.bulk_create(Article(title='article-%d' % index) for index in range(count))
+    Through = Article.tags.through
+    Through.objects.bulk_create(
+        Through(article_id=article.pk, tag_id=tag_objs[(index + offset) % tags].pk)
+        for index, article in enumerate(articles) for offset in range(tags_per_article)
+    )
+    return articles
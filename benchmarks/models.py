@@ -0,0 +1,95 @@
+"""The models of the benchmarks, shaped after the workloads measured.
+
+- ``WideModel``: a table with many columns, read through ``objects`` and a vanilla manager.
+- ``TreeLevel0`` to ``TreeLevel5``: a chain of foreign keys, each level referencing the previous one.
+- ``FanOutParent``: a model referenced by several models, each of them with many objects.
+- ``Article`` and ``Tag``: a many to many relation.
+"""
+from django.db import models
+
+from safedelete.config import (
+    HARD_DELETE_NOCASCADE,
+    SOFT_DELETE,
+    SOFT_DELETE_CASCADE,
+)
+from safedelete.models import SafeDeleteModel
+
+WIDE_FIELDS = 30
+TREE_DEPTH = 6
+FAN_OUT_RELATIONS = 5
+
+
+class WideModel(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE
+
+    code = models.CharField(max_length=100, unique=True)
+    for index in range(WIDE_FIELDS):
+        vars()['field_%d' % index] = models.CharField(max_length=100, default='x' * 50)
+    del index
+
+    vanilla_objects = models.Manager()
+
+
+class NoCascadeModel(SafeDeleteModel):
+    _safedelete_policy = HARD_DELETE_NOCASCADE
+
+    name = models.CharField(max_length=100)
+
+
+class NoCascadeChild(SafeDeleteModel):
+    parent = models.ForeignKey(NoCascadeModel, on_delete=models.CASCADE)
+
+
+def make_tree_models(depth):
+    """ Return a chain of "depth" models, each one with a foreign key to the previous one. """
+    tree_models = []
+    for level in range(depth):
+        attrs = {
+            '__module__': __name__,
+            '_safedelete_policy': SOFT_DELETE_CASCADE,
+            'name': models.CharField(max_length=100),
+        }
+        if tree_models:
+            attrs['parent'] = models.ForeignKey(tree_models[-1], on_delete=models.CASCADE, related_name='children')
+        tree_models.append(type('TreeLevel%d' % level, (SafeDeleteModel,), attrs))
+    return tree_models
+
+
+TREE_MODELS = make_tree_models(TREE_DEPTH)
+
+
+class FanOutParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100)
+
+
+def make_fan_out_models(count):
+    """ Return "count" models with a foreign key to ``FanOutParent``. """
+    return [
+        type('FanOutChild%d' % index, (SafeDeleteModel,), {
+            '__module__': __name__,
+            '_safedelete_policy': SOFT_DELETE_CASCADE,
+            'parent': models.ForeignKey(FanOutParent, on_delete=models.CASCADE),
+            'name': models.CharField(max_length=100),
+        })
+        for index in range(count)
+    ]
+
+
+FAN_OUT_MODELS = make_fan_out_models(FAN_OUT_RELATIONS)
+
+
+class Tag(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE
+
+    name = models.CharField(max_length=100)
+
+
+class Article(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    title = models.CharField(max_length=100)
+    tags = models.ManyToManyField(Tag, related_name='articles')
+
+    vanilla_objects = models.Manager()
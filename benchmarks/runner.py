@@ -0,0 +1,171 @@
+"""Run the benchmarks and compare their results.
+
+A benchmark is a function registered with :py:func:`benchmark`, taking the size of the data set.
+It creates its data and returns the function measured. Each run is done in a transaction rolled back
+afterwards, so that every run starts from the same data.
+
+The results are a JSON document::
+
+    {
+        "environment": {"commit": "...", "python": "...", "django": "...", "sqlite": "...", "date": "..."},
+        "results": [
+            {"name": "delete.queryset.soft", "size": 100, "time": 0.0012, "time_median": 0.0013,
+             "queries": 1, "memory": 20480},
+            ...
+        ]
+    }
+
+``time`` is the best wall time of the runs in seconds, ``queries`` the number of statements executed
+and ``memory`` the peak of the memory allocated by Python during a run, in bytes, measured by a separate
+run with :py:mod:`tracemalloc` so that it does not slow down the timed runs.
+"""
+import datetime
+import gc
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.db import connection, transaction
+
+# name: function
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """ Register the decorated function as the benchmark "name". """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rollback():
+    """ Run the block in a transaction which is always rolled back. """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+@contextmanager
+def count_queries(counter):
+    """ Count the statements executed in the block in ``counter['queries']``.
+
+    An execute wrapper is cheaper than ``CaptureQueriesContext``, which records the SQL of each query.
+    """
+    def wrapper(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+def measure_once(func, size, trace_memory=False):
+    with rollback():
+        run = func(size)
+        counter = {'queries': 0}
+        gc.collect()
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with count_queries(counter):
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    return elapsed, counter['queries'], peak
+
+
+def measure(name, size, repeat):
+    """ Run the benchmark "name" with "size", "repeat" times, and return its result. """
+    func = BENCHMARKS[name]
+    times = []
+    queries = None
+    for index in range(repeat):
+        elapsed, queries, _ = measure_once(func, size)
+        times.append(elapsed)
+    _, _, memory = measure_once(func, size, trace_memory=True)
+    return {
+        'name': name,
+        'size': size,
+        'time': min(times),
+        'time_median': statistics.median(times),
+        'queries': queries,
+        'memory': memory,
+    }
+
+
+def get_commit():
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, check=True, text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def get_environment():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT sqlite_version()')
+        sqlite_version = cursor.fetchone()[0]
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite_version,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def run_benchmarks(names, sizes, repeat, report=None):
+    """ Run the benchmarks "names" with each size of "sizes", calling "report" with each result. """
+    results = []
+    for name in names:
+        for size in sizes:
+            result = measure(name, size, repeat)
+            if report is not None:
+                report(result)
+            results.append(result)
+    return {'environment': get_environment(), 'results': results}
+
+
+def compare(baseline, current, threshold):
+    """Compare the "current" results to the "baseline" ones.
+
+    Returns the lines of the comparison and the regressions: the benchmarks running more queries,
+    or slower by more than the "threshold" ratio.
+    """
+    baseline_results = {(result['name'], result['size']): result for result in baseline['results']}
+    lines = []
+    regressions = []
+    for result in current['results']:
+        key = (result['name'], result['size'])
+        if key not in baseline_results:
+            continue
+        old = baseline_results[key]
+        time_ratio = result['time'] / old['time'] if old['time'] else 1
+        memory_ratio = result['memory'] / old['memory'] if old['memory'] else 1
+        line = '%-45s %6d  time x%.2f  queries %d -> %d  memory x%.2f' % (
+            result['name'], result['size'], time_ratio, old['queries'], result['queries'], memory_ratio,
+        )
+        if result['queries'] > old['queries'] or time_ratio > threshold:
+            regressions.append(key)
+            line += '  REGRESSION'
+        lines.append(line)
+    return lines, regressions
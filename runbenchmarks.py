@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+import argparse
+import fnmatch
+import json
+import os
+import sys
+
+import django
+from django.core.management import call_command
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the safedelete benchmarks on SQLite.')
+    parser.add_argument('patterns', nargs='*', help='Run the benchmarks matching these patterns, e.g. "delete.*".')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='The sizes of the data sets.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of timed runs of each benchmark.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare the results to this JSON file.')
+    parser.add_argument('--results', help='Compare the results of this JSON file instead of running the benchmarks.')
+    parser.add_argument(
+        '--threshold', type=float, default=1.5,
+        help='A benchmark slower than the baseline by more than this ratio is a regression.',
+    )
+    parser.add_argument('--list', action='store_true', help='List the benchmarks.')
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    django.setup()
+    import benchmarks.cases  # noqa: F401 registers the benchmarks
+    from benchmarks.runner import BENCHMARKS, compare, run_benchmarks
+
+    names = [
+        name for name in BENCHMARKS
+        if not args.patterns or any(fnmatch.fnmatch(name, pattern) for pattern in args.patterns)
+    ]
+    if args.list:
+        print('\n'.join(names))
+        sys.exit(0)
+
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        call_command('migrate', run_syncdb=True, verbosity=0)
+        results = run_benchmarks(names, args.sizes, args.repeat, report=lambda result: print(
+            '%(name)-45s %(size)6d  %(time).6fs  %(queries)6d queries  %(memory)10d bytes' % result
+        ))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(baseline, results, args.threshold)
+        print('\n'.join(lines))
+        sys.exit(bool(regressions))
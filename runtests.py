@@ -7,7 +7,7 @@ from django.conf import settings
 from django.test.utils import get_runner
 
 if __name__ == '__main__':
-    os.environ['DJANGO_SETTINGS_MODULE'] = 'safedelete.tests.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safedelete.tests.settings')
     django.setup()
     TestRunner = get_runner(settings)
     test_runner = TestRunner()
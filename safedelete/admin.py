@@ -1,12 +1,14 @@
 from __future__ import unicode_literals
 
 import django
+from django.apps import apps
 from django.contrib import admin, messages
 from django.contrib.admin import helpers
 from django.contrib.admin.models import CHANGE, LogEntry
-from django.contrib.admin.utils import model_ngettext
+from django.contrib.admin.utils import NestedObjects, model_ngettext
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import PermissionDenied
+from django.db import router
 from django.db.models import F
 from django.template.response import TemplateResponse
 from django.utils.encoding import force_str
@@ -14,6 +16,7 @@ from django.utils.html import conditional_escape, format_html
 from django.utils.translation import gettext_lazy as _
 from packaging.version import parse as parse_version
 
+from .cascade import preview_cascade
 from .config import FIELD_NAME
 from .utils import related_objects
 from .models import HARD_DELETE
@@ -138,6 +141,24 @@ class SafeDeleteAdmin(admin.ModelAdmin):
                 action_flag=CHANGE,
             )
 
+    def log_undeletions(self, request, queryset):
+        """
+        Log that the objects of "queryset" will be undeleted.
+
+        The log entries are created with a single query on Django >= 5.1, unless
+        :func:`log_undeletion` is overridden.
+        """
+        bulk = (django.VERSION[0] == 5 and django.VERSION[1] >= 1) or django.VERSION[0] >= 6
+        if bulk and type(self).log_undeletion is SafeDeleteAdmin.log_undeletion:
+            LogEntry.objects.log_actions(
+                user_id=request.user.pk,
+                queryset=queryset,
+                action_flag=CHANGE,
+            )
+        else:
+            for obj in queryset:
+                self.log_undeletion(request, obj, force_str(obj))
+
     def undelete_selected(self, request, queryset):
         """ Admin action to undelete objects in bulk with confirmation. """
         if not self.has_delete_permission(request):
@@ -150,9 +171,7 @@ class SafeDeleteAdmin(admin.ModelAdmin):
         if request.POST.get('post'):
             requested = queryset.count()
             if requested:
-                for obj in queryset:
-                    obj_display = force_str(obj)
-                    self.log_undeletion(request, obj, obj_display)
+                self.log_undeletions(request, queryset)
                 changed = queryset.undelete()[0]
                 if changed < requested:
                     self.message_user(
@@ -184,7 +203,10 @@ class SafeDeleteAdmin(admin.ModelAdmin):
             objects_name = force_str(opts.verbose_name_plural)
         title = _("Are you sure?")
 
-        related_list = [list(related_objects(obj)) for obj in queryset]
+        # The related objects of all the selected objects are collected together, with a query per relation.
+        collector = NestedObjects(using=router.db_for_write(self.model))
+        collector.collect(list(queryset))
+        related_list = [list(related_objects(obj, collector=collector)) for obj in queryset]
 
         context = {
             'title': title,
@@ -262,8 +284,10 @@ class SafeDeleteAdmin(admin.ModelAdmin):
             objects_name = force_str(opts.verbose_name_plural)
         title = _("Are you sure?")
 
-        related_list = [
-            list(related_objects(obj)) for obj in objects_marked_for_deletion
+        # Counts of the objects deleted in cascade, which may be too many to be listed.
+        cascade_preview = [
+            (apps.get_model(label)._meta.verbose_name_plural, preview.count, preview.truncated)
+            for label, preview in preview_cascade(objects_marked_for_deletion).items()
         ]
 
         context = {
@@ -273,7 +297,7 @@ class SafeDeleteAdmin(admin.ModelAdmin):
             "opts": opts,
             "app_label": opts.app_label,
             "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
-            "related_list": related_list,
+            "cascade_preview": cascade_preview,
         }
 
         if parse_version(django.get_version()) < parse_version('1.10'):
@@ -1,4 +1,5 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import class_prepared
 
 
 class SafeDeleteConfig(AppConfig):
@@ -7,4 +8,10 @@ class SafeDeleteConfig(AppConfig):
     verbose_name = 'Safe Delete'
 
     def ready(self):
-        pass
+        from . import registry
+        from .triggers import connect_recursive_triggers
+
+        registry.populate()
+        for model in apps.get_models():
+            connect_recursive_triggers(model)
+        class_prepared.connect(connect_recursive_triggers, dispatch_uid='safedelete_recursive_triggers')
@@ -0,0 +1,502 @@
+import time
+from collections import Counter, defaultdict, namedtuple
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+from django.conf import settings
+from django.db import connections, models, router
+from django.db.models import Exists, OuterRef
+from django.db.models.deletion import (
+    CASCADE,
+    DO_NOTHING,
+    PROTECT,
+    RESTRICT,
+    SET_DEFAULT,
+    SET_NULL,
+    ProtectedError,
+)
+from django.db.models.functions import Cast
+
+from . import instrumentation
+from .config import (
+    DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_NAME,
+)
+from .registry import get_plan, is_safedelete_cls
+from .signals import (
+    post_bulk_softdelete,
+    post_bulk_undelete,
+    pre_bulk_softdelete,
+)
+from .utils import has_field, has_operation_field, update_in_batches
+
+# Cascades deeper than this (e.g. rows referencing each other) are left to the per-object implementation.
+MAX_DEPTH = 32
+
+INTEGER_FIELD_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField',
+    'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+
+class CascadeTooDeep(Exception):
+    pass
+
+
+# The objects of "model" related through "field" to the objects of "source", at "depth" from the root objects.
+CascadeStep = namedtuple('CascadeStep', ['source', 'model', 'field', 'queryset', 'depth'])
+
+
+def get_cascade_relations(model):
+    """ Return the (field, related model, on_delete) of the relations followed when deleting "model" objects.
+
+    The field is either the foreign key of the related model or a generic relation of "model".
+    """
+    return get_plan(model).cascade_relations
+
+
+def get_cascade_models(model):
+    """ Return the models whose objects can be deleted in cascade with "model" objects, in the order they are reached.
+
+    "model" itself is only included if it is related to itself.
+    """
+    return get_plan(model).cascade_models
+
+
+def get_operation_models(model):
+    """ Return the models of the objects undeleted in cascade with "model" objects through the operation id.
+
+    These are the safedelete models with a ``deleted_by_cascade`` field, like the ones walked by
+    :py:class:`UndeleteCollector`. Return None if one of them has no operation field.
+    """
+    seen = set()
+    operation_models = set()
+    stack = [model]
+    while stack:
+        current_model = stack.pop()
+        for field, related_model, on_delete in get_cascade_relations(current_model):
+            if on_delete is not CASCADE or not is_safedelete_cls(related_model):
+                continue
+            parent_link = getattr(field.remote_field, 'parent_link', False)
+            if parent_link and has_field(current_model, FIELD_NAME):
+                # Children of multi-table inheritance share the fields of their parent.
+                pass
+            elif has_field(related_model, DELETED_BY_CASCADE_FIELD_NAME):
+                if not has_operation_field(related_model):
+                    return None
+                operation_models.add(related_model)
+            else:
+                continue
+            if related_model not in seen:
+                seen.add(related_model)
+                stack.append(related_model)
+    return operation_models
+
+
+def is_bulk_on_delete(on_delete):
+    """ Return whether :py:class:`SoftDeleteCollector` handles "on_delete" without loading the objects.
+
+    These are the built-in handlers, the others may use any method of the deletion collector.
+    """
+    if on_delete in (CASCADE, PROTECT, RESTRICT, SET_NULL, SET_DEFAULT, DO_NOTHING):
+        return True
+    # SET() handlers are created for each relation.
+    deconstruct = getattr(on_delete, 'deconstruct', None)
+    return deconstruct is not None and deconstruct()[0] == 'django.db.models.SET'
+
+
+def can_bulk_soft_delete_cascade(model):
+    """ Return whether the objects deleted in cascade with "model" objects can be soft deleted in bulk.
+
+    See :py:func:`safedelete.models.SafeDeleteModel.can_bulk_soft_delete`. The relations must use
+    the built-in ``on_delete`` handlers, see :py:func:`is_bulk_on_delete`.
+    """
+    cascade_models = get_cascade_models(model)
+    return all(
+        related_model.can_bulk_soft_delete()
+        for related_model in cascade_models if is_safedelete_cls(related_model)
+    ) and all(
+        is_bulk_on_delete(on_delete)
+        for current_model in (model, *cascade_models)
+        for field, related_model, on_delete in get_cascade_relations(current_model)
+    )
+
+
+def can_bulk_undelete_cascade(model):
+    """ Return whether the objects deleted in cascade with "model" objects can be undeleted in bulk.
+
+    See :py:func:`safedelete.models.SafeDeleteModel.can_bulk_undelete`.
+    """
+    return all(
+        related_model.can_bulk_undelete()
+        for related_model in get_cascade_models(model) if is_safedelete_cls(related_model)
+    )
+
+
+def related_queryset(field, related_model, queryset, using):
+    """ Return the objects of "related_model" related through "field" to the objects of "queryset". """
+    manager = related_model._base_manager.using(using)
+    if hasattr(field, 'bulk_related_objects'):
+        object_id_field = related_model._meta.get_field(field.object_id_field_name)
+        if object_id_field.get_internal_type() in INTEGER_FIELD_TYPES:
+            pks = queryset.values('pk')
+        else:
+            pks = queryset.annotate(
+                _safedelete_object_id=Cast('pk', output_field=models.CharField())
+            ).values('_safedelete_object_id')
+        return manager.filter(**{
+            field.content_type_field_name: field.get_content_type(),
+            '%s__in' % field.object_id_field_name: pks,
+        })
+    return manager.filter(**{'%s__in' % field.name: queryset})
+
+
+def dependents_queryset(field, related_model, obj, using):
+    """ Return the objects of "related_model" related through "field" to "obj".
+
+    If "obj" is None, they are related to the objects of the outer query, for an ``Exists`` subquery.
+    """
+    manager = related_model._base_manager.using(using)
+    if hasattr(field, 'bulk_related_objects'):
+        if obj is not None:
+            value = obj.pk
+        else:
+            value = OuterRef('pk')
+            object_id_field = related_model._meta.get_field(field.object_id_field_name)
+            if object_id_field.get_internal_type() not in INTEGER_FIELD_TYPES:
+                value = Cast(value, output_field=models.CharField())
+        return manager.filter(**{
+            field.content_type_field_name: field.get_content_type(),
+            field.object_id_field_name: value,
+        })
+    if obj is not None:
+        return manager.filter(**{field.name: obj})
+    # The foreign key may reference another field than the primary key.
+    return manager.filter(**{field.attname: OuterRef(field.target_field.attname)})
+
+
+def has_dependents(obj, using=None):
+    """ Return whether objects would be deleted in cascade with "obj".
+
+    Each ``CASCADE`` relation costs at most an ``EXISTS`` query, until one has objects.
+    """
+    using = using or router.db_for_write(type(obj), instance=obj)
+    return any(
+        dependents_queryset(field, related_model, obj, using).exists()
+        for field, related_model, on_delete in get_cascade_relations(type(obj))
+        if on_delete is CASCADE
+    )
+
+
+def split_dependents(queryset):
+    """ Split "queryset" between the objects without and with objects deleted in cascade with them.
+
+    Both querysets filter "queryset" with an ``EXISTS`` subquery per ``CASCADE`` relation,
+    so that each of them is evaluated with a single query.
+    """
+    conditions = [
+        Exists(dependents_queryset(field, related_model, None, queryset.db))
+        for field, related_model, on_delete in get_cascade_relations(queryset.model)
+        if on_delete is CASCADE
+    ]
+    if not conditions:
+        return queryset, queryset.none()
+    condition = reduce(or_, conditions)
+    return queryset.exclude(condition), queryset.filter(condition)
+
+
+CascadePreview = namedtuple('CascadePreview', ['count', 'truncated', 'pks'])
+CascadePreview.__doc__ = """The objects of a model deleted in cascade, see :py:func:`preview_cascade`.
+
+``count`` is the number of objects, ``truncated`` whether there may be more of them
+and ``pks`` a sample of their primary keys.
+"""
+
+
+def preview_cascade(queryset, max_count=None, sample_size=0):
+    """Return the objects deleted in cascade with a hard delete of "queryset", without loading them.
+
+    The ``CASCADE`` relations are walked like in :py:class:`SoftDeleteCollector`, each relation
+    costs a ``COUNT`` query limited to "max_count" objects, and the deeper relations are walked from
+    the first "max_count" objects (by primary key) only, so the preview takes a bounded time whatever the number of
+    related objects. The objects reachable through several relations are counted for each of them.
+
+    On the backends without ``LIMIT`` in ``IN`` subqueries (MySQL), the deeper relations are walked
+    from all the objects, only their counts are limited.
+
+    Args:
+        queryset: The objects to delete, which are not part of the preview.
+        max_count: The maximum number of objects counted per relation.
+            (default: {None}, the SAFE_DELETE_PREVIEW_MAX_COUNT setting)
+        sample_size: The maximum number of primary keys returned per model. (default: {0})
+
+    Returns:
+        A dictionary of :py:class:`CascadePreview` per model label, in the order they were found.
+        They are truncated when a relation has more than "max_count" objects or is deeper than ``MAX_DEPTH``.
+    """
+    if max_count is None:
+        max_count = getattr(settings, 'SAFE_DELETE_PREVIEW_MAX_COUNT', 1000)
+    using = queryset.db
+    can_limit_subqueries = connections[using].features.allow_sliced_subqueries_with_in
+    preview = {}
+
+    def collect(model, queryset, depth, truncated):
+        # "truncated" tells whether the objects of "queryset" are only a part of the objects to delete.
+        for field, related_model, on_delete in get_cascade_relations(model):
+            if on_delete is not CASCADE:
+                continue
+            sub_queryset = related_queryset(field, related_model, queryset, using)
+            count = sub_queryset[:max_count + 1].count()
+            if not count:
+                continue
+            label = related_model._meta.label
+            previous = preview.get(label, CascadePreview(0, False, []))
+            pks = previous.pks
+            if len(pks) < sample_size:
+                pks = pks + list(sub_queryset.values_list('pk', flat=True)[:sample_size - len(pks)])
+            sub_truncated = truncated or count > max_count
+            preview[label] = CascadePreview(
+                previous.count + min(count, max_count),
+                previous.truncated or sub_truncated or depth + 1 >= MAX_DEPTH,
+                pks,
+            )
+            if depth + 1 < MAX_DEPTH:
+                if count > max_count and can_limit_subqueries:
+                    sub_queryset = related_model._base_manager.using(using).filter(
+                        pk__in=sub_queryset.order_by('pk').values('pk')[:max_count],
+                    )
+                collect(related_model, sub_queryset, depth + 1, sub_truncated)
+
+    collect(queryset.model, queryset, 0, False)
+    return preview
+
+
+class FieldUpdateRecorder:
+    """Stands for a deletion collector to get the value an on_delete handler sets."""
+
+    value = None
+
+    def add_field_update(self, field, value, objs):
+        self.value = value
+
+
+def get_field_update_value(on_delete, field, queryset):
+    """ Return the value set on "field" by a SET_NULL, SET_DEFAULT or SET() on_delete handler. """
+    recorder = FieldUpdateRecorder()
+    on_delete(recorder, field, queryset, queryset.db)
+    return recorder.value
+
+
+def soft_delete_rows(model, queryset, deleted, is_cascade=False, operation_id=None):
+    """ Soft delete the objects of "queryset" which are not deleted yet and return their number.
+
+    The batch signals are sent if receivers are connected for "model".
+    The primary keys are recorded if they are collected, see :py:func:`safedelete.instrumentation.collect_pks`.
+    """
+    filters = {FIELD_NAME + '__isnull': True}
+    values = {FIELD_NAME: deleted}
+    if is_cascade and has_field(model, DELETED_BY_CASCADE_FIELD_NAME):
+        values[DELETED_BY_CASCADE_FIELD_NAME] = True
+    if operation_id is not None and has_operation_field(model):
+        values[DELETED_OPERATION_FIELD_NAME] = operation_id
+    queryset = queryset.filter(**filters)
+
+    if not (pre_bulk_softdelete.has_listeners(model) or post_bulk_softdelete.has_listeners(model) or
+            instrumentation.collects_pks()):
+        return queryset.update(**values)
+
+    # Receivers need the primary keys, so the UPDATE is split in pk batches.
+    using = queryset.db
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    pre_bulk_softdelete.send(sender=model, pks=pks, using=using, deleted=deleted)
+    count = update_in_batches(model, pks, using, filters, values)
+    post_bulk_softdelete.send(sender=model, pks=pks, using=using, deleted=deleted)
+    instrumentation.record_pks(model, pks)
+    return count
+
+
+def undelete_rows(model, queryset):
+    """ Undelete the soft deleted objects of "queryset" and return their number.
+
+    The batch signal is sent if receivers are connected for "model".
+    The primary keys are recorded if they are collected, see :py:func:`safedelete.instrumentation.collect_pks`.
+    """
+    filters = {FIELD_NAME + '__isnull': False}
+    values = {FIELD_NAME: None}
+    if has_field(model, DELETED_BY_CASCADE_FIELD_NAME):
+        values[DELETED_BY_CASCADE_FIELD_NAME] = False
+    if has_operation_field(model):
+        values[DELETED_OPERATION_FIELD_NAME] = None
+    queryset = queryset.filter(**filters)
+
+    if not (post_bulk_undelete.has_listeners(model) or instrumentation.collects_pks()):
+        # Bypass SafeDeleteQueryset.update, which only updates the objects which are not deleted.
+        return models.QuerySet.update(queryset, **values)
+
+    # Receivers need the primary keys, so the UPDATE is split in pk batches.
+    using = queryset.db
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    count = update_in_batches(model, pks, using, filters, values)
+    post_bulk_undelete.send(sender=model, pks=pks, using=using)
+    instrumentation.record_pks(model, pks)
+    return count
+
+
+class SoftDeleteCollector:
+    """Soft delete in cascade without loading the related objects.
+
+    The reverse relations are walked level by level: the objects of each level are selected
+    with a subquery on the primary keys of the previous level, so that each relation costs
+    an ``EXISTS`` query, then an ``UPDATE`` for safedelete models.
+
+    Like :py:class:`django.contrib.admin.utils.NestedObjects`, ``PROTECT`` relations to objects
+    which are not deleted prevent the deletion, so do ``RESTRICT`` relations unless the objects
+    are deleted in cascade too, ``SET_NULL``, ``SET_DEFAULT`` and ``SET()`` relations are updated
+    and objects of other models are kept, although their relations are followed.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        # CascadeStep of the objects to soft delete, in the order they were found
+        self.steps = []
+        # (field, value, queryset) of the foreign keys to update
+        self.field_updates = []
+        # querysets of the objects preventing the deletion
+        self.protected = []
+        # (model, queryset) of the objects preventing the deletion unless they are reached through a CASCADE
+        self.restricted = []
+        # model: querysets of the objects reached through a CASCADE
+        self.cascaded = defaultdict(list)
+
+    def collect(self, model, queryset, depth=0):
+        """ Collect the objects related to the objects of "queryset", a queryset of "model". """
+        if depth >= MAX_DEPTH:
+            raise CascadeTooDeep()
+
+        for field, related_model, on_delete in get_cascade_relations(model):
+            sub_queryset = related_queryset(field, related_model, queryset, self.using)
+            is_safedelete = is_safedelete_cls(related_model)
+
+            if on_delete in (PROTECT, RESTRICT):
+                if is_safedelete:
+                    sub_queryset = sub_queryset.filter(**{FIELD_NAME + '__isnull': True})
+                if not sub_queryset.exists():
+                    continue
+                if on_delete is PROTECT:
+                    self.protected.append(sub_queryset)
+                else:
+                    self.restricted.append((related_model, sub_queryset))
+            elif on_delete is CASCADE:
+                if not sub_queryset.exists():
+                    continue
+                self.cascaded[related_model].append(sub_queryset)
+                # Children of multi-table inheritance share the deleted field of their parent.
+                parent_link = getattr(field.remote_field, 'parent_link', False)
+                if is_safedelete and not (parent_link and has_field(model, FIELD_NAME)):
+                    self.steps.append(CascadeStep(model, related_model, field, sub_queryset, depth + 1))
+                self.collect(related_model, sub_queryset, depth + 1)
+            else:
+                value = get_field_update_value(on_delete, field, sub_queryset)
+                self.field_updates.append((field, value, sub_queryset))
+
+    def get_protected(self):
+        """ Return the querysets of the objects preventing the deletion.
+
+        Like Django, the objects related through ``RESTRICT`` can be deleted in cascade through another relation.
+        """
+        protected = list(self.protected)
+        for model, queryset in self.restricted:
+            for cascaded_queryset in self.cascaded[model]:
+                queryset = queryset.exclude(pk__in=cascaded_queryset.values('pk'))
+            if queryset.exists():
+                protected.append(queryset)
+        return protected
+
+    def raise_protected(self, model):
+        """ Raise ProtectedError if some protected objects prevent deleting "model" objects. """
+        protected_objects = defaultdict(list)
+        for queryset in self.get_protected():
+            for obj in queryset:
+                protected_objects[obj.__class__.__name__].append(obj)
+        if protected_objects:
+            raise ProtectedError(
+                'Cannot delete some instances of model %r because they are '
+                'referenced through protected foreign keys: %s.' % (
+                    model.__name__,
+                    ', '.join(protected_objects),
+                ),
+                set(chain.from_iterable(protected_objects.values())),
+            )
+
+    def soft_delete(self, deleted, operation_id=None):
+        """ Soft delete the collected objects, marking them as deleted by cascade. """
+        deleted_counter = Counter()
+        for step in self.steps:
+            start = time.perf_counter()
+            count = soft_delete_rows(step.model, step.queryset, deleted, is_cascade=True, operation_id=operation_id)
+            instrumentation.record_relation(
+                step.source, step.model, step.field, step.depth, count, time.perf_counter() - start,
+            )
+            if count:
+                deleted_counter[step.model._meta.label] += count
+        return deleted_counter
+
+    def update_fields(self):
+        """ Update the foreign keys of the objects related through SET_NULL, SET_DEFAULT or SET(). """
+        for field, value, queryset in self.field_updates:
+            queryset.update(**{field.name: value})
+
+
+class UndeleteCollector:
+    """Undelete in cascade without loading the related objects.
+
+    The objects deleted by cascade (with ``deleted_by_cascade`` set) are found level by level
+    like in :py:class:`SoftDeleteCollector`. The walk stops at objects which were not deleted
+    by cascade, so they and their related objects stay deleted. The deepest levels are
+    undeleted first, so that the subqueries of the upper levels still select their objects.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        # CascadeStep of the objects to undelete, in the order they were found
+        self.steps = []
+
+    def collect(self, model, queryset, depth=0):
+        """ Collect the objects deleted by cascade with the objects of "queryset", a queryset of "model". """
+        if depth >= MAX_DEPTH:
+            raise CascadeTooDeep()
+
+        for field, related_model, on_delete in get_cascade_relations(model):
+            if on_delete is not CASCADE or not is_safedelete_cls(related_model):
+                continue
+            sub_queryset = related_queryset(field, related_model, queryset, self.using)
+            if getattr(field.remote_field, 'parent_link', False) and has_field(model, FIELD_NAME):
+                # Children of multi-table inheritance share the deleted field of their parent.
+                if sub_queryset.exists():
+                    self.collect(related_model, sub_queryset, depth + 1)
+                continue
+            if not has_field(related_model, DELETED_BY_CASCADE_FIELD_NAME):
+                continue
+            sub_queryset = sub_queryset.filter(**{
+                DELETED_BY_CASCADE_FIELD_NAME: True,
+                FIELD_NAME + '__isnull': False,
+            })
+            if sub_queryset.exists():
+                self.steps.append(CascadeStep(model, related_model, field, sub_queryset, depth + 1))
+                self.collect(related_model, sub_queryset, depth + 1)
+
+    def undelete(self):
+        """ Undelete the collected objects, the deepest first. """
+        undeleted_counter = Counter()
+        for step in reversed(self.steps):
+            start = time.perf_counter()
+            count = undelete_rows(step.model, step.queryset)
+            instrumentation.record_relation(
+                step.source, step.model, step.field, step.depth, count, time.perf_counter() - start,
+            )
+            if count:
+                undeleted_counter[step.model._meta.label] += count
+        return undeleted_counter
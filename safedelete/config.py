@@ -10,5 +10,12 @@ DELETED_INVISIBLE = 10
 DELETED_VISIBLE_BY_FIELD = DELETED_VISIBLE_BY_PK = 11
 DELETED_ONLY_VISIBLE = 12
 DELETED_VISIBLE = 13
+
+BULK_CREATED = 'created'
+BULK_REVIVED = 'revived'
+BULK_UPDATED = 'updated'
+
 FIELD_NAME = getattr(settings, 'SAFE_DELETE_FIELD_NAME', 'deleted')
+FIELD_DB_INDEX = getattr(settings, 'SAFE_DELETE_FIELD_DB_INDEX', True)
 DELETED_BY_CASCADE_FIELD_NAME = getattr(settings, 'SAFE_DELETE_CASCADED_FIELD_NAME', 'deleted_by_cascade')
+DELETED_OPERATION_FIELD_NAME = getattr(settings, 'SAFE_DELETE_OPERATION_FIELD_NAME', None)
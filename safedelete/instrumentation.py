@@ -0,0 +1,438 @@
+"""Timings, query counts and cascades of the deletions.
+
+The operations measured are :py:func:`safedelete.models.SafeDeleteModel.delete` and ``undelete()``,
+:py:func:`safedelete.queryset.SafeDeleteQueryset.delete` and ``undelete()``, and
+:py:func:`safedelete.managers.SafeDeleteManager.update_or_create` and ``bulk_update_or_create()``.
+An operation started inside another one, e.g. for each object deleted by a queryset, is part of it.
+
+The operations are reported while a :py:func:`record` block is active in the current context
+or when handlers are configured, by the ``SAFE_DELETE_INSTRUMENTATION_HANDLERS`` setting or
+:py:func:`add_handler`. Otherwise only the deletions and undeletions are measured, for their
+:py:class:`safedelete.operations.DeletionResult`, and the other methods only check a context
+variable and a list.
+"""
+import logging
+import sys
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, List, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, router
+from django.utils.module_loading import import_string
+
+from .config import (
+    HARD_DELETE,
+    HARD_DELETE_NOCASCADE,
+    NO_DELETE,
+    SOFT_DELETE,
+    SOFT_DELETE_CASCADE,
+)
+
+logger = logging.getLogger('safedelete.instrumentation')
+slow_logger = logging.getLogger('safedelete.slow')
+
+POLICY_NAMES = {
+    HARD_DELETE: 'HARD_DELETE',
+    SOFT_DELETE: 'SOFT_DELETE',
+    SOFT_DELETE_CASCADE: 'SOFT_DELETE_CASCADE',
+    HARD_DELETE_NOCASCADE: 'HARD_DELETE_NOCASCADE',
+    NO_DELETE: 'NO_DELETE',
+}
+# The operations logged when they are slow, see log_slow_operation().
+DELETION_OPERATIONS = {'delete', 'undelete', 'queryset.delete', 'queryset.undelete'}
+# The settings read by get_setting_handlers().
+HANDLER_SETTINGS = {
+    'SAFE_DELETE_INSTRUMENTATION_HANDLERS', 'SAFE_DELETE_SLOW_CASCADE_MS', 'SAFE_DELETE_SLOW_CASCADE_ROWS',
+}
+
+# The active Recorder, if any.
+_recorder: ContextVar[Optional['Recorder']] = ContextVar('safedelete_recorder', default=None)
+# The Operation being measured, if any.
+_operation: ContextVar[Optional['Operation']] = ContextVar('safedelete_operation', default=None)
+# The handlers of the SAFE_DELETE_INSTRUMENTATION_HANDLERS setting, loaded on first use.
+_setting_handlers: Optional[List[Callable]] = None
+# The handlers added with add_handler().
+_handlers: List[Callable] = []
+# The maximum number of primary keys collected per model, None unless collect_pks() is active.
+_pks_limit: ContextVar[Optional[int]] = ContextVar('safedelete_pks_limit', default=None)
+
+RelationStats = namedtuple('RelationStats', ['source', 'model', 'field', 'depth', 'rows', 'elapsed'])
+RelationStats.__doc__ = """The objects of a relation soft deleted or undeleted in cascade by an operation.
+
+``source`` and ``model`` are the labels of the models referenced and referencing, ``field`` the
+name of the relation field, ``depth`` the level of the relation from the objects of the operation
+(1 for their related objects), ``rows`` the number of objects updated and ``elapsed`` the seconds
+taken by their ``UPDATE``. The objects undeleted through the operation ids are updated per model,
+without walking the relations, so their ``field`` and ``depth`` are None.
+"""
+
+
+class Operation:
+    """A measured operation.
+
+    :attribute name: ``delete``, ``undelete``, ``queryset.delete``, ``queryset.undelete``,
+        ``update_or_create`` or ``bulk_update_or_create``.
+    :attribute model: The label of the model.
+    :attribute pk: The primary key of the object, None for the querysets and managers.
+    :attribute policy: The delete policy, either the forced one or the policy of the model.
+    :attribute using: The database alias.
+    :attribute elapsed: The wall time in seconds.
+    :attribute queries: The number of SQL statements run on the database.
+    :attribute rows: The number of objects deleted, undeleted, updated or created per model label.
+    :attribute relations: The :py:class:`RelationStats` of the relations walked by the cascades
+        with an ``UPDATE`` per relation, in the order they were updated.
+    :attribute pks: The primary keys of the objects deleted or undeleted per model label, inside a
+        :py:func:`collect_pks` block, otherwise None.
+    :attribute exception: The exception raised by the operation, if any.
+    """
+
+    def __init__(self, name, model, policy, using, pk=None):
+        self.name = name
+        self.model = model
+        self.pk = pk
+        self.policy = policy
+        self.using = using
+        self.elapsed = 0.0
+        self.queries = 0
+        self.rows = {}
+        self.relations = []
+        self.pks = None
+        self.exception = None
+
+    def __repr__(self):
+        return '<Operation %s %s: %d rows in %.3fs, %d queries>' % (
+            self.name, self.model, sum(self.rows.values()), self.elapsed, self.queries,
+        )
+
+    @property
+    def depth(self):
+        """ The depth of the cascade, 0 without any relation walked. """
+        return max((relation.depth for relation in self.relations if relation.depth is not None), default=0)
+
+    @property
+    def fan_out(self):
+        """ The largest number of relations walked from a model at a level of the cascade. """
+        counter = Counter(
+            (relation.source, relation.depth) for relation in self.relations if relation.depth is not None
+        )
+        return max(counter.values(), default=0)
+
+    def as_dict(self):
+        """ Return the measures as a dictionary of JSON serializable values. """
+        return {
+            'name': self.name,
+            'model': self.model,
+            'pk': self.pk if self.pk is None or isinstance(self.pk, int) else str(self.pk),
+            'policy': self.policy,
+            'policy_name': POLICY_NAMES.get(self.policy),
+            'using': self.using,
+            'elapsed': self.elapsed,
+            'queries': self.queries,
+            'rows': dict(self.rows),
+            'depth': self.depth,
+            'fan_out': self.fan_out,
+            'relations': [relation._asdict() for relation in self.relations],
+            'pks': json_pks(self.pks),
+            'exception': repr(self.exception) if self.exception is not None else None,
+        }
+
+
+class Recorder:
+    """The operations measured in a :py:func:`record` block.
+
+    :attribute operations: The :py:class:`Operation` list, in the order they ended.
+    """
+
+    def __init__(self):
+        self.operations = []
+
+
+@contextmanager
+def record():
+    """Measure the operations run in the block, in the current context.
+
+    .. code-block:: python
+
+        with record() as recorder:
+            article.delete()
+        operation, = recorder.operations
+    """
+    recorder = Recorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def collect_pks(limit=None):
+    """Collect the primary keys of the objects deleted or undeleted in the block, in the current context.
+
+    They are in the ``pks`` of the results of the deletions and undeletions, see
+    :py:class:`safedelete.operations.DeletionResult`, and of the :py:class:`Operation`.
+    The objects updated without loading them are selected first, adding a query per ``UPDATE``.
+
+    Args:
+        limit: The maximum number of primary keys kept per model. (default: {None}, all of them)
+
+    .. code-block:: python
+
+        with collect_pks(limit=1000):
+            result = Article.objects.filter(author=author).delete()
+        result.pks
+    """
+    token = _pks_limit.set(sys.maxsize if limit is None else limit)
+    try:
+        yield
+    finally:
+        _pks_limit.reset(token)
+
+
+def get_setting_handlers():
+    """Return the handlers of the ``SAFE_DELETE_INSTRUMENTATION_HANDLERS`` setting, a list of dotted paths.
+
+    :py:func:`log_slow_operation` is added when the ``SAFE_DELETE_SLOW_CASCADE_MS`` or
+    ``SAFE_DELETE_SLOW_CASCADE_ROWS`` setting is set.
+    """
+    global _setting_handlers
+    if _setting_handlers is None:
+        handlers = [
+            import_string(path) for path in getattr(settings, 'SAFE_DELETE_INSTRUMENTATION_HANDLERS', [])
+        ]
+        if getattr(settings, 'SAFE_DELETE_SLOW_CASCADE_MS', None) is not None \
+                or getattr(settings, 'SAFE_DELETE_SLOW_CASCADE_ROWS', None) is not None:
+            handlers.append(log_slow_operation)
+        _setting_handlers = handlers
+    return _setting_handlers
+
+
+def add_handler(handler):
+    """ Call "handler" with each :py:class:`Operation` measured, in any context. """
+    _handlers.append(handler)
+
+
+def remove_handler(handler):
+    """ Stop calling "handler", added with :py:func:`add_handler`. """
+    _handlers.remove(handler)
+
+
+def reset_handlers(setting, **kwargs):
+    global _setting_handlers
+    if setting in HANDLER_SETTINGS:
+        _setting_handlers = None
+
+
+setting_changed.connect(reset_handlers)
+
+
+def is_enabled():
+    """ Return whether the operations are measured. """
+    if _recorder.get() is not None or _handlers:
+        return True
+    return bool(get_setting_handlers())
+
+
+def record_relation(source, model, field, depth, rows, elapsed):
+    """ Add the :py:class:`RelationStats` of a relation to the operation being measured, if any. """
+    operation = _operation.get()
+    if operation is not None:
+        operation.relations.append(RelationStats(
+            source._meta.label, model._meta.label, getattr(field, 'name', None), depth, rows, elapsed,
+        ))
+
+
+def collects_pks():
+    """ Return whether the primary keys of the objects changed by the operation being measured are collected. """
+    operation = _operation.get()
+    return operation is not None and operation.pks is not None
+
+
+def record_pks(model, pks):
+    """ Add the primary keys of "model" objects deleted or undeleted to the operation being measured, if collected. """
+    operation = _operation.get()
+    if operation is None or operation.pks is None:
+        return
+    model_pks = operation.pks.setdefault(model._meta.label, [])
+    model_pks.extend(pks[:max(0, _pks_limit.get() - len(model_pks))])
+
+
+def json_pks(pks):
+    # The primary keys per model label, as JSON serializable values.
+    if pks is None:
+        return None
+    return {
+        label: [pk if pk is None or isinstance(pk, int) else str(pk) for pk in model_pks]
+        for label, model_pks in pks.items()
+    }
+
+
+def deletion_rows(result):
+    # The (count, {label: count}) tuple of the deletions, None if an overridden method returns nothing.
+    return dict(result[1]) if result is not None else {}
+
+
+def update_or_create_rows(result):
+    # The (obj, created) tuple of update_or_create().
+    return {result[0]._meta.label: 1}
+
+
+def bulk_update_or_create_rows(result):
+    # The (obj, status) tuples of bulk_update_or_create().
+    return Counter(obj._meta.label for obj, status in result)
+
+
+def instrument(name, describe, rows=deletion_rows, result=None):
+    """Measure the decorated method as the operation "name".
+
+    Args:
+        name: The name of the operation.
+        describe: A function called with the arguments of the method, returning the model,
+            the primary key of the object, the policy and the database alias of the operation.
+        rows: A function returning the rows per model label from the result of the method.
+            (default: {deletion_rows})
+        result: A function called with the result of the method and the :py:class:`Operation`,
+            returning the result of the decorated method. The operation is then always measured.
+            (default: {None})
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if _operation.get() is not None:
+                return func(self, *args, **kwargs)
+            enabled = is_enabled()
+            if not enabled and result is None:
+                return func(self, *args, **kwargs)
+            return measure(name, describe, rows, result, enabled, func, self, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def measure(name, describe, rows, result, enabled, func, self, args, kwargs):
+    model, pk, policy, using = describe(self, *args, **kwargs)
+    operation = Operation(name, model._meta.label, policy, using, pk=pk)
+    if _pks_limit.get() is not None:
+        operation.pks = {}
+
+    def execute_wrapper(execute, sql, params, many, context):
+        operation.queries += 1
+        return execute(sql, params, many, context)
+
+    token = _operation.set(operation)
+    start = time.perf_counter()
+    try:
+        with connections[using].execute_wrapper(execute_wrapper):
+            value = func(self, *args, **kwargs)
+        operation.rows = {label: count for label, count in rows(value).items() if count}
+    except Exception as e:
+        operation.exception = e
+        raise
+    finally:
+        operation.elapsed = time.perf_counter() - start
+        _operation.reset(token)
+        if enabled:
+            emit(operation)
+    return value if result is None else result(value, operation)
+
+
+def emit(operation):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.operations.append(operation)
+    for handler in get_setting_handlers() + _handlers:
+        try:
+            handler(operation)
+        except Exception:
+            logger.exception('Instrumentation handler %r failed.', handler)
+
+
+def describe_model(obj, force_policy=None, **kwargs):
+    # The arguments of SafeDeleteModel._delete() and undelete().
+    model = type(obj)
+    policy = model._safedelete_policy if force_policy is None else force_policy
+    return model, obj.pk, policy, kwargs.get('using') or router.db_for_write(model, instance=obj)
+
+
+def describe_queryset(queryset, force_policy=None, *args, **kwargs):
+    # The arguments of SafeDeleteQueryset.delete() and undelete().
+    model = queryset.model
+    policy = model._safedelete_policy if force_policy is None else force_policy
+    return model, None, policy, queryset._db or router.db_for_write(model, **queryset._hints)
+
+
+def describe_manager(manager, *args, **kwargs):
+    # The arguments of SafeDeleteManager.update_or_create() and bulk_update_or_create().
+    model = manager.model
+    return model, None, model._safedelete_policy, manager._db or router.db_for_write(model, **manager._hints)
+
+
+def log_operation(operation):
+    """A handler logging the operations to the ``safedelete.instrumentation`` logger.
+
+    The measures are in the ``safedelete_operation`` attribute of the log records,
+    see :py:meth:`Operation.as_dict`.
+    """
+    logger.debug(
+        '%s %s: %d rows in %.1f ms, %d queries, cascade depth %d.',
+        operation.name, operation.model, sum(operation.rows.values()),
+        operation.elapsed * 1000, operation.queries, operation.depth,
+        extra={'safedelete_operation': operation.as_dict()},
+    )
+
+
+def log_slow_operation(operation):
+    """A handler logging the slow deletions and undeletions to the ``safedelete.slow`` logger.
+
+    An operation is slow when it took at least ``SAFE_DELETE_SLOW_CASCADE_MS`` milliseconds or
+    changed at least ``SAFE_DELETE_SLOW_CASCADE_ROWS`` objects. A single ``WARNING`` record is
+    logged per operation, with the root model and primary key, the policy, and the rows and time
+    of each relation of the cascade in its ``safedelete_operation`` attribute, see
+    :py:meth:`Operation.as_dict`.
+    """
+    if operation.name not in DELETION_OPERATIONS:
+        return
+    max_ms = getattr(settings, 'SAFE_DELETE_SLOW_CASCADE_MS', None)
+    max_rows = getattr(settings, 'SAFE_DELETE_SLOW_CASCADE_ROWS', None)
+    elapsed_ms = operation.elapsed * 1000
+    rows = sum(operation.rows.values())
+    if (max_ms is None or elapsed_ms < max_ms) and (max_rows is None or rows < max_rows):
+        return
+    slow_logger.warning(
+        'Slow %s of %s %s with the %s policy: %d rows in %.1f ms, %d queries, %d relations.',
+        operation.name, operation.model, operation.pk if operation.pk is not None else '(queryset)',
+        POLICY_NAMES.get(operation.policy, operation.policy), rows, elapsed_ms, operation.queries,
+        len(operation.relations),
+        extra={'safedelete_operation': operation.as_dict()},
+    )
+
+
+class MetricsHandler:
+    """A handler sending the measures of the operations to a metrics client.
+
+    "emit" is called with the metric name, its value and the tags ``model``, ``policy``
+    and ``operation``, e.g. to send them to StatsD or Prometheus:
+
+    .. code-block:: python
+
+        add_handler(MetricsHandler(lambda name, value, tags: statsd.timing(name, value, tags=tags)))
+
+    The metrics are ``<prefix>.elapsed`` (in milliseconds), ``<prefix>.queries``, ``<prefix>.rows``,
+    ``<prefix>.depth`` and ``<prefix>.fan_out``.
+    """
+
+    def __init__(self, emit: Callable[[str, Any, dict], Any], prefix='safedelete'):
+        self.emit = emit
+        self.prefix = prefix
+
+    def __call__(self, operation):
+        tags = {'model': operation.model, 'policy': operation.policy, 'operation': operation.name}
+        self.emit(self.prefix + '.elapsed', operation.elapsed * 1000, tags)
+        self.emit(self.prefix + '.queries', operation.queries, tags)
+        self.emit(self.prefix + '.rows', sum(operation.rows.values()), tags)
+        self.emit(self.prefix + '.depth', operation.depth, tags)
+        self.emit(self.prefix + '.fan_out', operation.fan_out, tags)
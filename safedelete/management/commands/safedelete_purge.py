@@ -0,0 +1,90 @@
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...purge import get_retention_models, purge, sort_models
+from ...registry import is_safedelete_cls
+
+
+class Command(BaseCommand):
+    help = (
+        'Hard delete the objects soft deleted for more than the given number of days, '
+        'or than the _safedelete_retention of their model.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='app_label.ModelName',
+            help='The models to purge, by default all the safedelete models with --days, '
+                 'or those with a retention.',
+        )
+        parser.add_argument(
+            '--days', type=float,
+            help='Purge the objects soft deleted for more than this number of days '
+                 'instead of the retention of their model.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='The number of objects deleted per transaction.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Seconds to wait between batches.',
+        )
+        parser.add_argument(
+            '--max-runtime', type=float,
+            help='Do not start a batch after this number of seconds.',
+        )
+        parser.add_argument(
+            '--database',
+            help='The database to purge, the database for write of each model by default.',
+        )
+
+    def get_models(self, labels, days):
+        if not labels:
+            if days is None:
+                return get_retention_models()
+            return sort_models(
+                model for model in apps.get_models()
+                if is_safedelete_cls(model) and not model._meta.proxy
+            )
+        models = []
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            if not is_safedelete_cls(model):
+                raise CommandError('%s is not a safedelete model.' % label)
+            if days is None and model._safedelete_retention is None:
+                raise CommandError('%s has no retention, use --days.' % label)
+            models.append(model)
+        return sort_models(models)
+
+    def handle(self, *args, **options):
+        days = options['days']
+        models = self.get_models(options['models'], days)
+        now = timezone.now()
+        max_runtime = options['max_runtime']
+        start = time.monotonic()
+
+        for model in models:
+            cutoff = now - (model._safedelete_retention if days is None else timedelta(days=days))
+            remaining_runtime = None
+            if max_runtime is not None:
+                remaining_runtime = max_runtime - (time.monotonic() - start)
+                if remaining_runtime <= 0:
+                    self.stdout.write('Maximum runtime reached.')
+                    break
+            count, _ = purge(
+                model, cutoff,
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                max_runtime=remaining_runtime,
+                using=options['database'],
+            )
+            if options['verbosity'] >= 1:
+                self.stdout.write('Purged %d objects of %s.' % (count, model._meta.label))
@@ -1,17 +1,46 @@
-from typing import Optional, Tuple, Type
+from functools import reduce
+from operator import or_
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, Q
+from django.db.models.utils import resolve_callables
 
 from .config import (
+    BULK_CREATED,
+    BULK_REVIVED,
+    BULK_UPDATED,
+    DELETED_BY_CASCADE_FIELD_NAME,
     DELETED_INVISIBLE,
     DELETED_ONLY_VISIBLE,
+    DELETED_OPERATION_FIELD_NAME,
     DELETED_VISIBLE,
     FIELD_NAME,
     SOFT_DELETE,
     SOFT_DELETE_CASCADE,
 )
+from .instrumentation import (
+    bulk_update_or_create_rows,
+    describe_manager,
+    instrument,
+    update_or_create_rows,
+)
 from .queryset import SafeDeleteQueryset
+from .registry import get_plan
+from .signals import post_bulk_undelete
+from .utils import has_field, has_operation_field
 
 
 class SafeDeleteManager(models.Manager):
@@ -110,14 +139,18 @@ class SafeDeleteManager(models.Manager):
             qs.query._safedelete_force_visibility = force_visibility
         return qs
 
+    @instrument('update_or_create', describe_manager, rows=update_or_create_rows)
     def update_or_create(self, defaults=None, **kwargs) -> Tuple[models.Model, bool]:
         """See :func:`~django.db.models.Query.update_or_create.`.
 
         Change to regular djangoesk function:
         Regular update_or_create() fails on soft-deleted, existing record with unique constraint on non-id field
-        If object is soft-deleted we don't update-or-create it but reset the deleted field to None.
+        If object is soft-deleted we don't create it but reset the deleted field to None while updating it.
         So the object is visible again like a create in any other case.
 
+        The object is looked up with a single locked query including the soft-deleted objects, then
+        revived and updated with a single ``UPDATE``.
+
         Attention: If the object is "revived" from a soft-deleted state the created return value will
         still be false because the object is technically not created unless you set
         SAFE_DELETE_INTERPRET_UNDELETED_OBJECTS_AS_CREATED = True in the django settings.
@@ -127,27 +160,200 @@ class SafeDeleteManager(models.Manager):
             kwargs: Attributes to lookup model instance with
         """
 
-        # Check if one of the model fields contains a unique constraint
-        revived_soft_deleted_object = False
-        if self.model.has_unique_fields() or 'pk' in kwargs or self.model._meta.pk.name in kwargs:
-            # Check if object is already soft-deleted
-            deleted_object = self.all_with_deleted().filter(**kwargs).exclude(**{FIELD_NAME: None}).first()
-
-            # If object is soft-deleted, reset delete-state...
-            if deleted_object and deleted_object._safedelete_policy in self.get_soft_delete_policies():
-                setattr(deleted_object, FIELD_NAME, None)
-                deleted_object.save()
-                revived_soft_deleted_object = True
-
-        # Do the standard logic
-        obj, created = super(SafeDeleteManager, self).update_or_create(defaults, **kwargs)
+        # Only the models with a unique constraint, or a lookup on the primary key, can conflict with soft
+        # deleted objects. The others are updated or created among the visible objects, like Django does.
+        if self.model._safedelete_policy not in self.get_soft_delete_policies() or not (
+            self.model.has_unique_fields() or 'pk' in kwargs or self.model._meta.pk.name in kwargs
+        ):
+            return super(SafeDeleteManager, self).update_or_create(defaults, **kwargs)
+
+        update_defaults = defaults or {}
+        # Django >= 5.0 supports distinct defaults when creating the object.
+        create_defaults = kwargs.pop('create_defaults', None)
+        if create_defaults is None:
+            create_defaults = update_defaults
+
+        queryset = self.all_with_deleted()
+        # Read and write on the database for write, like Django's update_or_create().
+        queryset._for_write = True  # type: ignore[attr-defined]
+        with transaction.atomic(using=queryset.db):
+            # A single locked SELECT finds the object among the deleted ones too, and blocks a concurrent
+            # update until the object is saved.
+            obj = self._get_for_update_or_create(queryset, kwargs)
+            if obj is None:
+                params = queryset._extract_model_params(create_defaults, **kwargs)  # type: ignore[attr-defined]
+                try:
+                    with transaction.atomic(using=queryset.db):
+                        return queryset.create(**params), True
+                except IntegrityError:
+                    # Created by a concurrent transaction, like in Django's get_or_create().
+                    obj = self._get_for_update_or_create(queryset, kwargs)
+                    if obj is None:
+                        raise
+
+            revived_soft_deleted_object = getattr(obj, FIELD_NAME) is not None
+            for key, value in resolve_callables(update_defaults):
+                setattr(obj, key, value)
+            # save() resets the deleted state, so the object is revived and updated with the same UPDATE.
+            obj.save(using=queryset.db, update_fields=self._get_update_fields(update_defaults))
 
         # If object was soft-deleted and is "revived" and settings flag is True, show object as created
         if revived_soft_deleted_object and \
                 getattr(settings, 'SAFE_DELETE_INTERPRET_UNDELETED_OBJECTS_AS_CREATED', False):
-            created = True
+            return obj, True
+
+        return obj, False
+
+    def _get_for_update_or_create(self, queryset, lookup):
+        """Return the object updated by :func:`update_or_create`, locked, or None.
 
-        return obj, created
+        The alive object is preferred, else the first soft deleted object (by primary key) is revived.
+        """
+        objs = list(queryset.select_for_update().filter(**lookup).order_by(
+            F(FIELD_NAME).asc(nulls_first=True), 'pk',
+        )[:2])
+        if len(objs) > 1 and getattr(objs[1], FIELD_NAME) is None:
+            raise self.model.MultipleObjectsReturned(
+                'update_or_create() returned more than one %s.' % self.model._meta.object_name
+            )
+        return objs[0] if objs else None
+
+    def _get_update_fields(self, update_defaults):
+        """Return the fields saved by :func:`update_or_create`, or None to save all the fields.
+
+        Those are the updated fields, the deletion state fields and the fields set on ``pre_save()``,
+        like ``auto_now`` fields, as Django does.
+        """
+        opts = self.model._meta
+        update_fields = {FIELD_NAME, DELETED_BY_CASCADE_FIELD_NAME, *update_defaults}
+        if DELETED_OPERATION_FIELD_NAME is not None:
+            update_fields.add(DELETED_OPERATION_FIELD_NAME)
+
+        concrete_field_names = set()
+        for field in opts.concrete_fields:
+            if not field.primary_key:
+                concrete_field_names.update((field.name, field.attname))
+        # update_fields does not support non-concrete fields.
+        if not concrete_field_names.issuperset(update_fields):
+            return None
+        for field in opts.concrete_fields:
+            if not field.primary_key and field.__class__.pre_save is not models.Field.pre_save:
+                update_fields.add(field.name)
+        return update_fields
+
+    async def aupdate_or_create(  # type: ignore[override]
+        self, defaults=None, **kwargs
+    ) -> Tuple[models.Model, bool]:
+        """Async version of :func:`update_or_create`.
+
+        Django's ``aupdate_or_create()`` runs the queryset ``update_or_create()`` which does not revive soft
+        deleted objects.
+        """
+        return await sync_to_async(self.update_or_create)(defaults, **kwargs)
+
+    @instrument('bulk_update_or_create', describe_manager, rows=bulk_update_or_create_rows)
+    def bulk_update_or_create(
+        self,
+        objs: Iterable[Union[models.Model, dict]],
+        unique_fields: Sequence[str],
+        update_fields: Sequence[str],
+        batch_size: Optional[int] = None,
+    ) -> List[Tuple[models.Model, str]]:
+        """Batch counterpart of :func:`update_or_create`.
+
+        The existing objects matching ``unique_fields``, soft deleted or not, are found with a query
+        per batch of ``SAFE_DELETE_BULK_BATCH_SIZE`` objects. The soft deleted ones are revived and all
+        of them are updated with ``bulk_update()``, the others are created with ``bulk_create()``,
+        with ``update_conflicts`` when ``unique_fields`` are unique and the database supports it.
+        The ``post_bulk_undelete`` signal is sent with the primary keys of the revived objects.
+
+        Like ``bulk_update()`` and ``bulk_create()``, ``save()`` is not called and the per-object
+        signals are not sent.
+
+        Args:
+            objs: Model instances, or dicts of their field values.
+            unique_fields: The names of the fields matching an object with an existing one.
+            update_fields: The names of the fields updated on the existing objects.
+            batch_size: Passed onto ``bulk_update()`` and ``bulk_create()``. (default: {None})
+
+        Returns:
+            A ``(obj, status)`` tuple for each object, in order, where ``status`` is one of
+            ``BULK_CREATED``, ``BULK_REVIVED`` and ``BULK_UPDATED``.
+        """
+        opts = self.model._meta
+        instances: List[models.Model] = [obj if isinstance(obj, models.Model) else self.model(**obj) for obj in objs]
+        unique_attnames = [(opts.pk if name == 'pk' else opts.get_field(name)).attname for name in unique_fields]
+        keys = [tuple(getattr(obj, attname) for attname in unique_attnames) for obj in instances]
+        if len(set(keys)) != len(keys):
+            raise ValueError('bulk_update_or_create() objects must have distinct unique_fields values.')
+
+        queryset = self.all_with_deleted()
+        # Look the objects up and write them on the database for write, like bulk_update() and bulk_create().
+        queryset._for_write = True  # type: ignore[attr-defined]
+        using = queryset.db
+        lookup_batch_size = getattr(settings, 'SAFE_DELETE_BULK_BATCH_SIZE', 1000)
+        existing = {}
+        for start in range(0, len(keys), lookup_batch_size):
+            batch_keys = keys[start:start + lookup_batch_size]
+            if len(unique_attnames) == 1:
+                lookup = Q(**{unique_attnames[0] + '__in': [key[0] for key in batch_keys]})
+            else:
+                lookup = reduce(or_, (Q(**dict(zip(unique_attnames, key))) for key in batch_keys))
+            for pk, deleted, *key in queryset.filter(lookup).values_list('pk', FIELD_NAME, *unique_attnames):
+                existing[tuple(key)] = (pk, deleted)
+
+        # The deletion fields reset on the existing objects, the model may opt out of deleted_by_cascade.
+        deletion_fields: Dict[Any, Any] = {FIELD_NAME: None}
+        if has_field(self.model, DELETED_BY_CASCADE_FIELD_NAME):
+            deletion_fields[DELETED_BY_CASCADE_FIELD_NAME] = False
+        if has_operation_field(self.model):
+            deletion_fields[DELETED_OPERATION_FIELD_NAME] = None
+        results = []
+        objs_to_update = []
+        objs_to_create = []
+        revived_pks = []
+        for obj, key in zip(instances, keys):
+            if key not in existing:
+                objs_to_create.append(obj)
+                results.append((obj, BULK_CREATED))
+                continue
+            pk, deleted = existing[key]
+            obj.pk = pk
+            obj._state.adding = False
+            obj._state.db = using
+            for field_name, value in deletion_fields.items():
+                setattr(obj, field_name, value)
+            if deleted is None:
+                results.append((obj, BULK_UPDATED))
+            else:
+                revived_pks.append(pk)
+                results.append((obj, BULK_REVIVED))
+            objs_to_update.append(obj)
+
+        with transaction.atomic(using=using):
+            if objs_to_update:
+                queryset.bulk_update(objs_to_update, [*update_fields, *deletion_fields], batch_size=batch_size)
+            if objs_to_create:
+                create_kwargs: Dict[str, Any] = {}
+                can_update_conflicts = connections[using].features.supports_update_conflicts_with_target
+                # The objects created concurrently since the lookup are updated instead of failing.
+                if update_fields and can_update_conflicts and self._has_unique_constraint(unique_fields):
+                    create_kwargs = {
+                        'update_conflicts': True,
+                        'unique_fields': unique_fields,
+                        'update_fields': update_fields,
+                    }
+                queryset.bulk_create(objs_to_create, batch_size=batch_size, **create_kwargs)
+
+        if revived_pks and post_bulk_undelete.has_listeners(self.model):
+            post_bulk_undelete.send(sender=self.model, pks=revived_pks, using=using)
+        return results
+
+    def _has_unique_constraint(self, field_names):
+        """Whether a unique constraint without condition covers exactly the fields named "field_names"."""
+        pk_name = self.model._meta.pk.name
+        field_names = frozenset(pk_name if name == 'pk' else name for name in field_names)
+        return field_names == {pk_name} or field_names in get_plan(self.model).unique_sets
 
     @staticmethod
     def get_soft_delete_policies():
@@ -1,20 +1,35 @@
 import warnings
 from collections import Counter, defaultdict
+from datetime import timedelta
 from functools import reduce
 from itertools import chain
 from operator import or_
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Optional, Sequence, Tuple, Type, List, Union
 
 import django
+from asgiref.sync import sync_to_async
 from django.contrib.admin.utils import NestedObjects
+from django.core import checks
 from django.core.exceptions import ValidationError
-from django.db import models, router
-from django.db.models import UniqueConstraint
-from django.db.models.deletion import ProtectedError
+from django.db import models, router, transaction
+from django.db.backends.utils import names_digest
+from django.db.models import Count, Q, UniqueConstraint
+from django.db.models.deletion import CASCADE, ProtectedError
+from django.db.models.signals import class_prepared, post_save, pre_save
 from django.utils import timezone
 
+from .cascade import (
+    CascadeTooDeep,
+    SoftDeleteCollector,
+    UndeleteCollector,
+    can_bulk_soft_delete_cascade,
+    can_bulk_undelete_cascade,
+    get_cascade_relations,
+)
 from .config import (
     DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_DB_INDEX,
     FIELD_NAME,
     HARD_DELETE,
     HARD_DELETE_NOCASCADE,
@@ -22,29 +37,31 @@ from .config import (
     SOFT_DELETE,
     SOFT_DELETE_CASCADE,
 )
+from .instrumentation import describe_model, instrument, record_pks
 from .managers import (
     SafeDeleteAllManager,
     SafeDeleteDeletedManager,
     SafeDeleteManager,
 )
+from .operations import (
+    DeletionResult,
+    can_undelete_operations_cascade,
+    deletion_result,
+    get_operation_id,
+    get_operation_roots,
+    new_operation_id,
+    set_operation_id,
+    undelete_operations_cascade,
+)
+from .registry import get_plan, is_safedelete_cls
 from .signals import post_softdelete, post_undelete, pre_softdelete
-from .utils import can_hard_delete, related_objects
-
-
-def is_safedelete_cls(cls):
-    # compare against this module's ``__name__`` instead of
-    # the hard-coded literal ``'safedelete.models'``. The upstream check
-    # silently returns ``False`` as soon as the package is imported under
-    # a different dotted path (e.g. when vendored or when the app label is
-    # rewired), which disables ``SOFT_DELETE_CASCADE`` entirely. Comparing
-    # against ``__name__`` makes the check location-agnostic while
-    # remaining byte-for-byte compatible for the default import path.
-    for base in cls.__bases__:
-        if base.__module__ == __name__:
-            return True
-        if is_safedelete_cls(base):
-            return True
-    return False
+from .triggers import has_local_field
+from .utils import (
+    can_hard_delete,
+    has_field,
+    has_operation_field,
+    related_objects,
+)
 
 
 def is_safedelete(related):
@@ -89,6 +106,37 @@ class SafeDeleteModel(models.Model):
         ...
         >>> # Now you have your model (with its ``deleted`` field, and custom manager and delete method)
 
+    :attribute _safedelete_retention: how long the soft deleted objects are kept before being purged by
+        :py:func:`safedelete.purge.purge_expired` (e.g. with the ``safedelete_purge`` command).
+        Defaults to ``None``, the objects are kept forever.
+
+        >>> class MyModel(SafeDeleteModel):
+        ...     _safedelete_retention = timedelta(days=90)
+
+    :attribute _safedelete_indexed_fields: the field names (or tuples of field names) to index
+        for the objects which are not deleted only, with partial indexes on ``deleted IS NULL``.
+        Defaults to no index.
+
+        >>> class MyModel(SafeDeleteModel):
+        ...     _safedelete_indexed_fields = ('name', ('category', 'created'))
+
+    :attribute _safedelete_unique_fields: the field names (or tuples of field names) which must be unique
+        among the objects which are not deleted only, with partial unique constraints on ``deleted IS NULL``.
+        Unlike ``unique=True``, a soft deleted object does not prevent creating an equal one.
+        Defaults to no constraint.
+
+        >>> class MyModel(SafeDeleteModel):
+        ...     _safedelete_unique_fields = ('slug', ('team', 'name'))
+
+    :attribute _safedelete_db_cascade: whether the ``SOFT_DELETE_CASCADE`` policy leaves the cascade to the
+        database triggers created by :py:class:`safedelete.triggers.CreateCascadeTriggers`, soft deleting and
+        undeleting the objects of this model only. The models deleted in cascade with it must set it too.
+        Defaults to ``False``.
+
+        >>> class MyModel(SafeDeleteModel):
+        ...     _safedelete_policy = SOFT_DELETE_CASCADE
+        ...     _safedelete_db_cascade = True
+
     :attribute objects:
         The :class:`safedelete.managers.SafeDeleteManager` returns the non-deleted models.
 
@@ -100,6 +148,10 @@ class SafeDeleteModel(models.Model):
     """
 
     _safedelete_policy: int = SOFT_DELETE
+    _safedelete_retention: Optional[timedelta] = None
+    _safedelete_indexed_fields: Sequence[Union[str, Sequence[str]]] = ()
+    _safedelete_unique_fields: Sequence[Union[str, Sequence[str]]] = ()
+    _safedelete_db_cascade: bool = False
 
     objects = SafeDeleteManager()
     all_objects = SafeDeleteAllManager()
@@ -131,6 +183,8 @@ class SafeDeleteModel(models.Model):
                 was_undeleted = True
             setattr(self, FIELD_NAME, None)
             setattr(self, DELETED_BY_CASCADE_FIELD_NAME, False)
+            if DELETED_OPERATION_FIELD_NAME is not None:
+                setattr(self, DELETED_OPERATION_FIELD_NAME, None)
 
         super(SafeDeleteModel, self).save(**kwargs)
 
@@ -139,6 +193,7 @@ class SafeDeleteModel(models.Model):
             using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
             post_undelete.send(sender=self.__class__, instance=self, using=using)
 
+    @instrument('undelete', describe_model, result=deletion_result)
     def undelete(self, force_policy: Optional[int] = None, **kwargs) -> Tuple[int, Dict[str, int]]:
         """Undelete a soft-deleted model.
 
@@ -152,21 +207,139 @@ class SafeDeleteModel(models.Model):
         current_policy = force_policy or self._safedelete_policy
 
         assert getattr(self, FIELD_NAME)
-        self.save(keep_deleted=False, **kwargs)
-        undeleted_counter = Counter({self._meta.label: 1})
+
+        if current_policy == SOFT_DELETE_CASCADE and self._safedelete_db_cascade:
+            # The database triggers undelete the objects deleted by cascade.
+            current_policy = SOFT_DELETE
+        elif current_policy == SOFT_DELETE_CASCADE and can_bulk_undelete_cascade(type(self)):
+            if self._can_undelete_operation(**kwargs):
+                return self._undelete_operation(**kwargs)
+            try:
+                return self._undelete_cascade_bulk(**kwargs)
+            except CascadeTooDeep:
+                pass
+
+        count = self._undelete_self(**kwargs)
+        undeleted_counter = Counter({self._meta.label: count} if count else {})
 
         if current_policy == SOFT_DELETE_CASCADE:
+            # The related objects include the whole cascade, so they are undeleted without cascading again.
             for related in related_objects(self, only_deleted_by_cascade=True):
                 if is_safedelete_cls(related.__class__) and getattr(related, FIELD_NAME):
-                    _, undelete_response = related.undelete(**kwargs)
+                    _, undelete_response = related.undelete(force_policy=SOFT_DELETE, **kwargs)
                     undeleted_counter.update(undelete_response)
 
         return sum(undeleted_counter.values()), dict(undeleted_counter)
 
+    def _undelete_cascade_bulk(self, **kwargs) -> Tuple[int, Dict[str, int]]:
+        # Undelete the objects deleted by cascade with an UPDATE per relation, without loading them.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        collector = UndeleteCollector(using=using)
+        collector.collect(type(self), type(self)._base_manager.using(using).filter(pk=self.pk))
+
+        with transaction.atomic(using=using, savepoint=False):
+            count = self._undelete_self(**kwargs)
+            undeleted_counter = collector.undelete()
+            if count:
+                undeleted_counter[self._meta.label] += count
+
+        return sum(undeleted_counter.values()), dict(undeleted_counter)
+
+    async def aundelete(self, force_policy: Optional[int] = None, **kwargs) -> Tuple[int, Dict[str, int]]:
+        """Async version of :func:`undelete`."""
+        return await sync_to_async(self.undelete)(force_policy=force_policy, **kwargs)
+
+    def _can_undelete_operation(self, **kwargs) -> bool:
+        # The objects deleted in cascade can be found through the operation id if this object is the only one
+        # which was deleted by the operation without being deleted by cascade.
+        if get_operation_id(self) is None or getattr(self, DELETED_BY_CASCADE_FIELD_NAME) \
+                or not can_undelete_operations_cascade(type(self)):
+            return False
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        queryset = type(self)._base_manager.using(using).filter(pk=self.pk)
+        return not get_operation_roots(type(self), queryset, using).exclude(pk=self.pk).exists()
+
+    def _undelete_operation(self, **kwargs) -> Tuple[int, Dict[str, int]]:
+        # Undelete the objects deleted by cascade with this object with an indexed UPDATE per model.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            undeleted_counter = undelete_operations_cascade(type(self), [get_operation_id(self)], using)
+            count = self._undelete_self(**kwargs)
+            if count:
+                undeleted_counter[self._meta.label] += count
+
+        return sum(undeleted_counter.values()), dict(undeleted_counter)
+
+    def _undelete_self(self, **kwargs) -> int:
+        # Undelete this object only, return 1 if it was undeleted.
+        if not self._can_update_deletion_fields(undelete=True, **kwargs):
+            self.save(keep_deleted=False, **kwargs)
+            record_pks(type(self), [self.pk])
+            return 1
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        self._set_deletion_fields(None)
+        count = self._update_deletion_fields(using, was_deleted=True)
+        if count:
+            post_undelete.send(sender=self.__class__, instance=self, using=using)
+            record_pks(type(self), [self.pk])
+        return count
+
+    def _can_update_deletion_fields(self, undelete=False, **kwargs) -> bool:
+        # Save the object instead of updating its deletion fields if it is not in the database yet,
+        # if the save arguments (other than using) need save() or if save() has side effects.
+        if self._state.adding or self.pk is None or set(kwargs) - {'using'}:
+            return False
+        # The overridden methods and the pre_softdelete receivers may change other fields of the object,
+        # which are saved with the deletion.
+        cls = type(self)
+        if undelete:
+            names: Tuple[str, ...] = ('undelete', '_undelete_self')
+        else:
+            names = ('delete', '_delete', 'soft_delete_policy_action', 'soft_delete_cascade_policy_action',
+                     'hard_delete_cascade_policy_action')
+        if any(getattr(cls, name) is not getattr(SafeDeleteModel, name) for name in names):
+            return False
+        if not undelete and pre_softdelete.has_listeners(cls):
+            return False
+        return self.can_update_deletion_fields()
+
+    def _set_deletion_fields(self, deleted, is_cascade=False, operation_id=None):
+        setattr(self, FIELD_NAME, deleted)
+        setattr(self, DELETED_BY_CASCADE_FIELD_NAME, is_cascade)
+        if DELETED_OPERATION_FIELD_NAME is not None:
+            setattr(self, DELETED_OPERATION_FIELD_NAME, operation_id)
+
+    def _update_deletion_fields(self, using, was_deleted):
+        # UPDATE the deletion fields of this object only, guarded on its deletion state in the database,
+        # so that concurrent deletions (or undeletions) of the same object update it once.
+        field_names = [FIELD_NAME]
+        if has_field(type(self), DELETED_BY_CASCADE_FIELD_NAME):
+            field_names.append(DELETED_BY_CASCADE_FIELD_NAME)
+        if has_operation_field(type(self)):
+            field_names.append(DELETED_OPERATION_FIELD_NAME)
+        count = type(self)._base_manager.using(using).filter(
+            pk=self.pk, **{FIELD_NAME + '__isnull': not was_deleted}
+        ).update(**{field_name: getattr(self, field_name) for field_name in field_names})
+        if not count:
+            # Another transaction changed the deletion state, get it back.
+            self.refresh_from_db(using=using, fields=field_names)
+        self._state.db = using
+        return count
+
     def delete(self, force_policy=None, **kwargs):
         # To know why we need to do that, see https://github.com/makinacorpus/django-safedelete/issues/117
         return self._delete(force_policy, **kwargs)
 
+    async def adelete(self, force_policy=None, **kwargs):
+        """Async version of :func:`delete`.
+
+        .. note::
+            Django's ``adelete()`` passes ``keep_parents`` which is not supported by soft deletes.
+        """
+        return await sync_to_async(self.delete)(force_policy=force_policy, **kwargs)
+
+    @instrument('delete', describe_model, result=deletion_result)
     def _delete(self, force_policy: Optional[int] = None, **kwargs) -> Tuple[int, Dict[str, int]]:
         """Overrides Django's delete behaviour based on the model's delete policy.
 
@@ -190,23 +363,40 @@ class SafeDeleteModel(models.Model):
 
     def soft_delete_policy_action(self, **kwargs) -> Tuple[int, Dict[str, int]]:
         # Only soft-delete the object, marking it as deleted.
-        setattr(self, FIELD_NAME, timezone.now())
+        # deleted_at shares the timestamp of a cascade, it shouldn't be in kwargs when calling save method.
+        setattr(self, FIELD_NAME, kwargs.pop('deleted_at', None) or timezone.now())
 
         # is_cascade shouldn't be in kwargs when calling save method.
         if kwargs.pop('is_cascade', False):
             setattr(self, DELETED_BY_CASCADE_FIELD_NAME, True)
 
+        # operation_id is shared by the objects deleted in cascade, it shouldn't be in kwargs when calling save method.
+        set_operation_id(self, kwargs.pop('operation_id', None))
+
         using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
         # send pre_softdelete signal
         pre_softdelete.send(sender=self.__class__, instance=self, using=using)
-        self.save(keep_deleted=True, **kwargs)
+        if self._can_update_deletion_fields(**kwargs):
+            # Only write the deletion fields, unless the object is already deleted. No receiver is
+            # connected to pre_softdelete on this path, so it is not left without a post_softdelete.
+            count = self._update_deletion_fields(using, was_deleted=False)
+            if not count:
+                return DeletionResult(0, {})
+        else:
+            self.save(keep_deleted=True, **kwargs)
         # send softdelete signal
         post_softdelete.send(sender=self.__class__, instance=self, using=using)
+        record_pks(type(self), [self.pk])
 
-        return (1, {self._meta.label: 1})
+        return DeletionResult(
+            1, {self._meta.label: 1},
+            operation_id=get_operation_id(self),
+            deleted=getattr(self, FIELD_NAME),
+        )
 
     def hard_delete_policy_action(self, **kwargs) -> Tuple[int, Dict[str, int]]:
         # Normally hard-delete the object.
+        record_pks(type(self), [self.pk])
         return super(SafeDeleteModel, self).delete()
 
     def hard_delete_cascade_policy_action(self, **kwargs) -> Tuple[int, Dict[str, int]]:
@@ -217,6 +407,16 @@ class SafeDeleteModel(models.Model):
             return self._delete(force_policy=HARD_DELETE, **kwargs)
 
     def soft_delete_cascade_policy_action(self, **kwargs) -> Tuple[int, Dict[str, int]]:
+        if self._safedelete_db_cascade:
+            # The database triggers soft delete the related objects.
+            return self._delete(force_policy=SOFT_DELETE, **kwargs)
+
+        if can_bulk_soft_delete_cascade(type(self)):
+            try:
+                return self._soft_delete_cascade_bulk(**kwargs)
+            except CascadeTooDeep:
+                pass
+
         collector = NestedObjects(using=router.db_for_write(type(self)))
         collector.collect([self])
         # Soft-delete-cascade raises an exception when trying to delete a object that related object is PROTECT
@@ -234,9 +434,13 @@ class SafeDeleteModel(models.Model):
                 set(chain.from_iterable(protected_objects.values())),
             )
 
+        # The objects deleted in cascade share the operation id of the object
+        if has_operation_field(type(self)):
+            kwargs['operation_id'] = new_operation_id()
+
         # Soft-delete on related objects before
         deleted_counter: Counter = Counter()
-        for related in related_objects(self):
+        for related in related_objects(self, collector=collector):
             if is_safedelete_cls(related.__class__) and not getattr(related, FIELD_NAME):
                 res = related.delete(force_policy=SOFT_DELETE, is_cascade=True, **kwargs)
                 if res is not None:
@@ -278,7 +482,100 @@ class SafeDeleteModel(models.Model):
                         collector.using,
                     )
 
-        return sum(deleted_counter.values()), dict(deleted_counter)
+        return DeletionResult(
+            sum(deleted_counter.values()), dict(deleted_counter),
+            operation_id=kwargs.get('operation_id'),
+            deleted=getattr(self, FIELD_NAME),
+        )
+
+    def _soft_delete_cascade_bulk(self, **kwargs) -> Tuple[int, Dict[str, int]]:
+        # Soft-delete the related objects with an UPDATE per relation, without loading them.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        collector = SoftDeleteCollector(using=using)
+        collector.collect(type(self), type(self)._base_manager.using(using).filter(pk=self.pk))
+        collector.raise_protected(type(self))
+
+        deleted = timezone.now()
+        operation_id = new_operation_id() if has_operation_field(type(self)) else None
+        with transaction.atomic(using=using, savepoint=False):
+            deleted_counter = collector.soft_delete(deleted, operation_id=operation_id)
+            _, delete_response = self._delete(
+                force_policy=SOFT_DELETE, deleted_at=deleted, operation_id=operation_id, **kwargs
+            )
+            deleted_counter.update(delete_response)
+            collector.update_fields()
+
+        return DeletionResult(
+            sum(deleted_counter.values()), dict(deleted_counter),
+            operation_id=operation_id,
+            deleted=deleted,
+        )
+
+    @classmethod
+    def can_bulk_soft_delete(cls) -> bool:
+        """Checks if querysets of this model can be soft deleted with a single ``UPDATE``.
+
+        The bulk path bypasses :func:`delete` and the per-instance ``pre_softdelete`` and
+        ``post_softdelete`` signals, so it is only used when none of the delete methods are
+        overridden and no receiver is connected to those signals for this model, and when
+        :func:`can_update_deletion_fields` returns True, like for a single object.
+        """
+        for name in ('delete', '_delete', 'soft_delete_policy_action'):
+            if getattr(cls, name) is not getattr(SafeDeleteModel, name):
+                return False
+        if pre_softdelete.has_listeners(cls) or post_softdelete.has_listeners(cls):
+            return False
+        return cls.can_update_deletion_fields()
+
+    @classmethod
+    def can_update_deletion_fields(cls) -> bool:
+        """Checks if objects of this model can be soft deleted and undeleted by updating their deletion fields only.
+
+        The ``UPDATE`` bypasses :func:`save` and the ``pre_save`` and ``post_save`` signals, so it is
+        only used when :func:`save` is not overridden and no receiver is connected to those signals
+        for this model. Otherwise the objects are saved, which writes all their fields.
+        """
+        if cls.save is not SafeDeleteModel.save:
+            return False
+        return not (pre_save.has_listeners(cls) or post_save.has_listeners(cls))
+
+    @classmethod
+    def can_bulk_hard_delete_nocascade(cls) -> bool:
+        """Checks if querysets of this model can be deleted in bulk with the ``HARD_DELETE_NOCASCADE`` policy.
+
+        Like :func:`can_bulk_soft_delete`, with the hard delete methods not overridden either.
+        """
+        for name in ('hard_delete_policy_action', 'hard_delete_cascade_policy_action'):
+            if getattr(cls, name) is not getattr(SafeDeleteModel, name):
+                return False
+        return cls.can_bulk_soft_delete()
+
+    @classmethod
+    def can_split_dependents(cls) -> bool:
+        """Checks if the objects of a queryset with dependents can be found with a single query when
+        the objects are deleted one by one with the ``HARD_DELETE_NOCASCADE`` policy.
+
+        Each object is then deleted with the ``SOFT_DELETE`` or ``HARD_DELETE`` policy instead of
+        checking its own dependents, so it is only used when the delete methods are not overridden
+        and the objects of this model cannot be deleted in cascade with each other.
+        """
+        for name in ('delete', '_delete', 'hard_delete_cascade_policy_action'):
+            if getattr(cls, name) is not getattr(SafeDeleteModel, name):
+                return False
+        return cls not in get_plan(cls).cascade_models
+
+    @classmethod
+    def can_bulk_undelete(cls) -> bool:
+        """Checks if querysets of this model can be undeleted with a single ``UPDATE``.
+
+        The bulk path bypasses :func:`undelete`, :func:`save` and the per-instance
+        ``post_undelete`` signal, so it is only used when :func:`undelete` is not overridden,
+        no receiver is connected to that signal for this model and
+        :func:`can_update_deletion_fields` returns True, like for a single object.
+        """
+        if cls.undelete is not SafeDeleteModel.undelete or post_undelete.has_listeners(cls):
+            return False
+        return cls.can_update_deletion_fields()
 
     @classmethod
     def has_unique_fields(cls) -> bool:
@@ -289,21 +586,105 @@ class SafeDeleteModel(models.Model):
         Args:
             model: Model instance to check
         """
-        if cls._meta.unique_together:
-            return True
-
-        if django.VERSION[0] > 3 or (django.VERSION[0] == 3 and django.VERSION[1] >= 1):
-            if cls._meta.total_unique_constraints:
-                return True
-        else:  # derived from total_unique_constraints in django >= 3.1
-            for constraint in cls._meta.constraints:
-                if isinstance(constraint, UniqueConstraint) and constraint.condition is None:
-                    return True
-
-        for field in cls._meta.fields:
-            if field._unique:  # type: ignore
-                return True
-        return False
+        return bool(get_plan(cls).unique_sets)
+
+    @classmethod
+    def check(cls, **kwargs) -> List[checks.CheckMessage]:
+        errors = super(SafeDeleteModel, cls).check(**kwargs)
+        errors.extend(cls._check_alive_indexes())
+        errors.extend(cls._check_db_cascade())
+        return errors
+
+    @classmethod
+    def _check_alive_indexes(cls) -> List[checks.CheckMessage]:
+        errors: List[checks.CheckMessage] = []
+        for attribute in ('_safedelete_indexed_fields', '_safedelete_unique_fields'):
+            for fields in getattr(cls, attribute):
+                for field_name in ((fields,) if isinstance(fields, str) else fields):
+                    if not has_field(cls, field_name):
+                        errors.append(checks.Error(
+                            "'%s' refers to the nonexistent field '%s'." % (attribute, field_name),
+                            obj=cls,
+                            id='safedelete.E001',
+                        ))
+
+        if FIELD_DB_INDEX:
+            return errors
+
+        # Without the index on the deleted field, the indexed fields should be indexed for alive objects.
+        alive_condition = Q(**{FIELD_NAME + '__isnull': True})
+        alive_indexed_fields = set()
+        deleted_indexed_fields = set()
+        for index in cls._meta.indexes:
+            index_fields = [field_name.lstrip('-') for field_name in index.fields]
+            if not index_fields:
+                continue
+            if index.condition == alive_condition:
+                alive_indexed_fields.add(index_fields[0])
+            elif index.condition is None and FIELD_NAME in index_fields[1:]:
+                deleted_indexed_fields.add(index_fields[0])
+        ignored_fields = alive_indexed_fields | deleted_indexed_fields | {FIELD_NAME, DELETED_OPERATION_FIELD_NAME}
+        unindexed_fields = []
+        unindexed_relations = []
+        for field in cls._meta.local_concrete_fields:
+            if not field.db_index or field.unique or field.name in ignored_fields:  # type: ignore
+                continue
+            if not field.is_relation:
+                unindexed_fields.append(field.name)
+            elif not (field.remote_field.related_name or '').endswith('+'):  # type: ignore[union-attr]
+                # The related manager of the foreign key filters the alive objects. Without one, only
+                # the cascades use the index, reading all the objects, so it is needed as is.
+                unindexed_relations.append(field.name)
+        if unindexed_fields:
+            errors.append(checks.Warning(
+                'The indexes of %s are not restricted to the objects which are not deleted: %s.' % (
+                    cls._meta.label, ', '.join(unindexed_fields),
+                ),
+                hint='Add these fields to _safedelete_indexed_fields.',
+                obj=cls,
+                id='safedelete.W001',
+            ))
+        if unindexed_relations:
+            errors.append(checks.Warning(
+                'The related objects of %s are looked up without the deleted field: %s.' % (
+                    cls._meta.label, ', '.join(unindexed_relations),
+                ),
+                hint='Replace the index of these foreign keys: set db_index=False on them and add an index '
+                     'on each of them followed by the deleted field to Meta.indexes.',
+                obj=cls,
+                id='safedelete.W001',
+            ))
+        return errors
+
+    @classmethod
+    def _check_db_cascade(cls) -> List[checks.CheckMessage]:
+        # The database triggers only follow the CASCADE foreign keys to models soft deleting in the database too.
+        if not cls._safedelete_db_cascade:
+            return []
+        if not has_local_field(cls, FIELD_NAME):
+            return [checks.Error(
+                '_safedelete_db_cascade needs the deleted field in the table of %s.' % cls._meta.label,
+                obj=cls,
+                id='safedelete.E002',
+            )]
+        errors: List[checks.CheckMessage] = []
+        for field, related_model, on_delete in get_cascade_relations(cls):
+            if getattr(field.remote_field, 'parent_link', False):
+                continue
+            if on_delete is not CASCADE or hasattr(field, 'bulk_related_objects') \
+                    or not is_safedelete_cls(related_model) or not related_model._safedelete_db_cascade \
+                    or not has_local_field(related_model, DELETED_BY_CASCADE_FIELD_NAME) \
+                    or field.target_field.model._meta.db_table != cls._meta.db_table:
+                errors.append(checks.Error(
+                    'The database cascade of %s does not follow %s.%s.' % (
+                        cls._meta.label, related_model._meta.label, field.name,
+                    ),
+                    hint='Only CASCADE foreign keys of models with a deleted_by_cascade field and '
+                         '_safedelete_db_cascade set are followed.',
+                    obj=cls,
+                    id='safedelete.E003',
+                ))
+        return errors
 
     # We need to overwrite this check to ensure uniqueness is also checked
     # against "deleted" (but still in db) objects.
@@ -311,6 +692,8 @@ class SafeDeleteModel(models.Model):
     def _perform_unique_checks(self, unique_checks) -> Dict[str, List[ValidationError]]:
         errors: Dict[str, List[ValidationError]] = {}
 
+        # (unique_check, lookup_kwargs) of each model class, to evaluate them with a single query
+        model_class_checks: Dict[Type[models.Model], List[Tuple[Sequence[str], Dict[str, object]]]] = {}
         for model_class, unique_check in unique_checks:
             lookup_kwargs = {}
             for field_name in unique_check:
@@ -323,17 +706,28 @@ class SafeDeleteModel(models.Model):
                 lookup_kwargs[str(field_name)] = lookup_value
             if len(unique_check) != len(lookup_kwargs):
                 continue
+            model_class_checks.setdefault(model_class, []).append((unique_check, lookup_kwargs))
 
+        for model_class, model_checks in model_class_checks.items():
             # This is the changed line
             if hasattr(model_class, 'all_objects'):
-                qs = model_class.all_objects.filter(**lookup_kwargs)
+                qs = model_class.all_objects.all()
             else:
-                qs = model_class._default_manager.filter(**lookup_kwargs)
+                qs = model_class._default_manager.all()
 
             model_class_pk = self._get_pk_val(model_class._meta)  # type: ignore
             if not self._state.adding and model_class_pk is not None:
                 qs = qs.exclude(pk=model_class_pk)
-            if qs.exists():
+
+            # Count the objects colliding with each unique check, among the objects colliding with any.
+            lookups = [Q(**lookup_kwargs) for unique_check, lookup_kwargs in model_checks]
+            collisions = qs.filter(reduce(or_, lookups)).aggregate(**{
+                '_safedelete_unique_%d' % index: Count('pk', filter=lookup) for index, lookup in enumerate(lookups)
+            })
+
+            for index, (unique_check, lookup_kwargs) in enumerate(model_checks):
+                if not collisions['_safedelete_unique_%d' % index]:
+                    continue
                 if len(unique_check) == 1:
                     key = unique_check[0]
                 else:
@@ -344,8 +738,66 @@ class SafeDeleteModel(models.Model):
         return errors
 
 
-SafeDeleteModel.add_to_class(FIELD_NAME, models.DateTimeField(editable=False, null=True, db_index=True))
+SafeDeleteModel.add_to_class(FIELD_NAME, models.DateTimeField(editable=False, null=True, db_index=FIELD_DB_INDEX))
 SafeDeleteModel.add_to_class(DELETED_BY_CASCADE_FIELD_NAME, models.BooleanField(editable=False, default=False))
+if DELETED_OPERATION_FIELD_NAME is not None:
+    SafeDeleteModel.add_to_class(
+        DELETED_OPERATION_FIELD_NAME, models.UUIDField(editable=False, null=True, blank=True, db_index=True)
+    )
+
+
+def get_alive_options_name(model, fields, suffix):
+    """ Return the name of an index or a constraint on "fields" of "model", of 30 characters at most. """
+    digest = names_digest(model._meta.db_table, *fields, suffix, length=6)
+    return '%s_%s_%s_%s' % (model._meta.db_table[:9], fields[0][:7], digest, suffix)
+
+
+def get_alive_index(model, fields):
+    """ Return the index on "fields" of "model" restricted to the objects which are not deleted. """
+    return models.Index(
+        fields=list(fields),
+        condition=Q(**{FIELD_NAME + '__isnull': True}),
+        name=get_alive_options_name(model, fields, 'alive'),
+    )
+
+
+def get_alive_unique_constraint(model, fields):
+    """ Return the unique constraint on "fields" of "model" restricted to the objects which are not deleted. """
+    return UniqueConstraint(
+        fields=list(fields),
+        condition=Q(**{FIELD_NAME + '__isnull': True}),
+        name=get_alive_options_name(model, fields, 'uniq'),
+    )
+
+
+def add_alive_options(sender, **kwargs):
+    # Add the indexes and constraints declared by _safedelete_indexed_fields and _safedelete_unique_fields
+    # to the model options, so that they are part of the migrations like Meta.indexes and Meta.constraints.
+    if not is_safedelete_cls(sender) or sender._meta.abstract or sender._meta.proxy:
+        return
+    local_field_names = {field.name for field in sender._meta.local_fields}
+
+    def get_local_fields(declared_fields):
+        for fields in declared_fields:
+            fields = (fields,) if isinstance(fields, str) else tuple(fields)
+            # The fields of multi-table inheritance parents are handled with their parent.
+            if set(fields) <= local_field_names:
+                yield fields
+
+    # The migration state only copies the options declared in Meta, i.e. in original_attrs.
+    indexes = [get_alive_index(sender, fields) for fields in get_local_fields(sender._safedelete_indexed_fields)]
+    if indexes:
+        sender._meta.indexes = [*sender._meta.indexes, *indexes]
+        sender._meta.original_attrs['indexes'] = sender._meta.indexes
+    constraints = [
+        get_alive_unique_constraint(sender, fields) for fields in get_local_fields(sender._safedelete_unique_fields)
+    ]
+    if constraints:
+        sender._meta.constraints = [*sender._meta.constraints, *constraints]
+        sender._meta.original_attrs['constraints'] = sender._meta.constraints
+
+
+class_prepared.connect(add_alive_options)
 
 
 class SafeDeleteMixin(SafeDeleteModel):
@@ -0,0 +1,192 @@
+import time
+import uuid
+from collections import Counter
+
+from django.apps import apps
+from django.db import router, transaction
+
+from . import instrumentation
+from .cascade import get_operation_models, undelete_rows
+from .config import (
+    DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_NAME,
+    SOFT_DELETE,
+)
+from .registry import is_safedelete_cls
+from .utils import has_field, has_operation_field
+
+
+class DeletionResult(tuple):
+    """The ``(count, {label: count})`` tuple returned by deletions and undeletions.
+
+    It unpacks like the result of Django's ``delete()``. The outermost ``delete()`` or ``undelete()``
+    call also sets the measures of the whole operation, including the objects deleted one by one.
+
+    :attribute operation_id:
+        The id stamped on the soft deleted objects when the ``SAFE_DELETE_OPERATION_FIELD_NAME``
+        setting is set, or None. It is the undo token of the deletion,
+        see :py:func:`undelete_operation`.
+
+    :attribute deleted:
+        The deletion timestamp shared by the soft deleted objects, None for undeletions and hard deletions.
+
+    :attribute elapsed:
+        The wall time in seconds.
+
+    :attribute queries:
+        The number of SQL statements run on the database.
+
+    :attribute pks:
+        The primary keys of the objects deleted or undeleted per model label, inside a
+        :py:func:`safedelete.instrumentation.collect_pks` block, otherwise None. The lists are
+        truncated to the limit of the block, and only have the objects hard deleted by the operation,
+        not the objects hard deleted with them by Django's cascade.
+    """
+
+    def __new__(cls, count, counter, operation_id=None, deleted=None, elapsed=None, queries=None, pks=None):
+        result = super(DeletionResult, cls).__new__(cls, (count, counter))
+        result.operation_id = operation_id
+        result.deleted = deleted
+        result.elapsed = elapsed
+        result.queries = queries
+        result.pks = pks
+        return result
+
+    def __getnewargs__(self):
+        # Pickle the count and counter as two arguments, the attributes are in __dict__.
+        return tuple(self)
+
+    def as_dict(self):
+        """ Return the result as a dictionary of JSON serializable values. """
+        count, counter = self
+        return {
+            'count': count,
+            'counter': dict(counter),
+            'operation_id': str(self.operation_id) if self.operation_id is not None else None,
+            'deleted': self.deleted.isoformat() if self.deleted is not None else None,
+            'elapsed': self.elapsed,
+            'queries': self.queries,
+            'pks': instrumentation.json_pks(self.pks),
+        }
+
+
+def deletion_result(result, operation):
+    """ Return the :py:class:`DeletionResult` of a deletion or undeletion measured as "operation". """
+    if result is None:
+        return result
+    count, counter = result
+    return DeletionResult(
+        count, counter,
+        operation_id=getattr(result, 'operation_id', None),
+        deleted=getattr(result, 'deleted', None),
+        elapsed=operation.elapsed,
+        queries=operation.queries,
+        pks=operation.pks,
+    )
+
+
+def new_operation_id():
+    """ Return a new deletion operation id. """
+    return uuid.uuid4()
+
+
+def get_operation_id(obj):
+    """ Return the id of the operation which soft deleted "obj", or None. """
+    if not has_operation_field(type(obj)):
+        return None
+    return getattr(obj, DELETED_OPERATION_FIELD_NAME)
+
+
+def set_operation_id(obj, operation_id=None):
+    """ Stamp "obj" with "operation_id", or a new operation id, if its model has the operation field. """
+    if has_operation_field(type(obj)):
+        setattr(obj, DELETED_OPERATION_FIELD_NAME, operation_id or new_operation_id())
+
+
+def can_undelete_operations_cascade(model):
+    """ Return whether the objects deleted in cascade with "model" objects can be found through the operation id. """
+    return has_operation_field(model) and has_field(model, DELETED_BY_CASCADE_FIELD_NAME) \
+        and get_operation_models(model) is not None
+
+
+def get_operation_roots(model, queryset, using):
+    """ Return the "model" objects deleted without being deleted by cascade by the operations of "queryset".
+
+    Undeleting the objects of "queryset" in cascade through the operation ids is only right
+    if these are all in "queryset".
+    """
+    return model._base_manager.using(using).filter(**{
+        DELETED_OPERATION_FIELD_NAME + '__in': queryset.values(DELETED_OPERATION_FIELD_NAME),
+        DELETED_BY_CASCADE_FIELD_NAME: False,
+        FIELD_NAME + '__isnull': False,
+    })
+
+
+def can_undelete_queryset_operations_cascade(model, queryset):
+    """ Return whether the objects deleted in cascade with the soft deleted objects of "queryset" can be
+    found through their operation ids. """
+    if not can_undelete_operations_cascade(model):
+        return False
+    if queryset.filter(**{DELETED_OPERATION_FIELD_NAME + '__isnull': True}).exists():
+        return False
+    return not get_operation_roots(model, queryset, queryset.db).exclude(pk__in=queryset.values('pk')).exists()
+
+
+def get_operation_ids(queryset):
+    """ Return the ids of the operations which soft deleted the objects of "queryset". """
+    return list(queryset.values_list(DELETED_OPERATION_FIELD_NAME, flat=True).distinct())
+
+
+def undelete_operations_cascade(model, operation_ids, using):
+    """ Undelete the objects deleted in cascade with "model" objects by the operations "operation_ids".
+
+    The objects are undeleted with an indexed ``UPDATE`` per model.
+    """
+    undeleted_counter = Counter()
+    for operation_model in get_operation_models(model):
+        start = time.perf_counter()
+        count = undelete_rows(operation_model, operation_model._base_manager.using(using).filter(**{
+            DELETED_OPERATION_FIELD_NAME + '__in': operation_ids,
+            DELETED_BY_CASCADE_FIELD_NAME: True,
+        }))
+        instrumentation.record_relation(model, operation_model, None, None, count, time.perf_counter() - start)
+        if count:
+            undeleted_counter[operation_model._meta.label] += count
+    return undeleted_counter
+
+
+def undelete_operation(operation_id, using=None):
+    """Undelete the objects soft deleted by an operation, with an ``UPDATE`` per model.
+
+    Args:
+        operation_id: The ``operation_id`` of the result of a soft deletion.
+        using: The database alias. (default: {None}, the database for write of each model)
+
+    .. code-block:: python
+
+        result = article.delete()
+        undelete_operation(result.operation_id)
+    """
+
+    undeleted_counter = Counter()
+    with transaction.atomic(using=using):
+        for model in apps.get_models():
+            # Proxy and multi-table inheritance children share the field of their concrete parent.
+            if not is_safedelete_cls(model) or not has_operation_field(model) \
+                    or model._meta.get_field(DELETED_OPERATION_FIELD_NAME).model is not model:
+                continue
+            queryset = model._base_manager.using(using or router.db_for_write(model)).filter(**{
+                DELETED_OPERATION_FIELD_NAME: operation_id,
+                FIELD_NAME + '__isnull': False,
+            })
+            if model.can_bulk_undelete():
+                count = undelete_rows(model, queryset)
+            else:
+                count = 0
+                for obj in queryset:
+                    undelete_count, _ = obj.undelete(force_policy=SOFT_DELETE)
+                    count += undelete_count
+            if count:
+                undeleted_counter[model._meta.label] += count
+    return sum(undeleted_counter.values()), dict(undeleted_counter)
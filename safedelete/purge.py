@@ -0,0 +1,125 @@
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .config import FIELD_NAME
+from .registry import is_safedelete_cls
+
+
+def get_purge_batches(model, cutoff, batch_size, using):
+    """ Yield the primary keys of the "model" objects soft deleted before "cutoff", by batches.
+
+    The objects are paginated over (deleted, pk), so that each batch is an index range scan
+    starting after the previous one, whether its objects were purged or not.
+    """
+    queryset = model._base_manager.using(using).filter(**{FIELD_NAME + '__lt': cutoff}).order_by(FIELD_NAME, 'pk')
+    last = None
+    while True:
+        batch_queryset = queryset
+        if last is not None:
+            last_deleted, last_pk = last
+            batch_queryset = queryset.filter(
+                Q(**{FIELD_NAME + '__gt': last_deleted}) | Q(**{FIELD_NAME: last_deleted, 'pk__gt': last_pk})
+            )
+        batch = list(batch_queryset.values_list(FIELD_NAME, 'pk')[:batch_size])
+        if not batch:
+            return
+        yield [pk for deleted, pk in batch]
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+
+
+def purge(model, cutoff, batch_size=None, sleep=0, max_runtime=None, using=None):
+    """Hard delete the objects of "model" soft deleted before "cutoff", by batches.
+
+    Each batch is deleted in its own transaction, with Django's ``QuerySet.delete()``,
+    so the objects related to the purged ones are deleted according to their ``on_delete``.
+
+    Args:
+        model: A safedelete model.
+        cutoff: The objects soft deleted before this datetime are purged.
+        batch_size: The number of objects per batch. (default: {None}, the SAFE_DELETE_PURGE_BATCH_SIZE setting)
+        sleep: Seconds to wait between batches. (default: {0})
+        max_runtime: No batch is started after this number of seconds. (default: {None})
+        using: The database alias. (default: {None}, the database for write of the model)
+
+    Returns:
+        The number of objects deleted and a dictionary with the number of deletions per model type,
+        like ``QuerySet.delete()``.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'SAFE_DELETE_PURGE_BATCH_SIZE', 1000)
+    using = using or router.db_for_write(model)
+    start = time.monotonic()
+
+    deleted_counter = Counter()
+    for index, pks in enumerate(get_purge_batches(model, cutoff, batch_size, using)):
+        if index and sleep:
+            time.sleep(sleep)
+        if max_runtime is not None and time.monotonic() - start >= max_runtime:
+            break
+        with transaction.atomic(using=using):
+            _, delete_response = model._base_manager.using(using).filter(pk__in=pks).delete()
+        deleted_counter.update({label: count for label, count in delete_response.items() if count})
+    return sum(deleted_counter.values()), dict(deleted_counter)
+
+
+def sort_models(models):
+    """ Return "models" sorted so that the models referencing others come first.
+
+    Purging the referencing models first spares loading their objects when the referenced objects are purged.
+    """
+    models = set(models)
+    sorted_models = []
+    visited = set()
+
+    def visit(model):
+        if model in visited:
+            return
+        visited.add(model)
+        for related in model._meta.related_objects:
+            if related.related_model in models:
+                visit(related.related_model)
+        sorted_models.append(model)
+
+    for model in sorted(models, key=lambda model: model._meta.label):
+        visit(model)
+    return sorted_models
+
+
+def get_retention_models():
+    """ Return the safedelete models with a ``_safedelete_retention``, sorted by :py:func:`sort_models`. """
+    return sort_models(
+        model for model in apps.get_models()
+        if is_safedelete_cls(model) and not model._meta.proxy and model._safedelete_retention is not None
+    )
+
+
+def purge_expired(batch_size=None, sleep=0, max_runtime=None, using=None):
+    """Purge the objects soft deleted for longer than the ``_safedelete_retention`` of their model.
+
+    The models are purged in the order of :py:func:`get_retention_models`, see :py:func:`purge`
+    for the arguments. The maximum runtime is shared by all the models.
+    """
+    start = time.monotonic()
+    now = timezone.now()
+
+    deleted_counter = Counter()
+    for model in get_retention_models():
+        remaining_runtime = None
+        if max_runtime is not None:
+            remaining_runtime = max_runtime - (time.monotonic() - start)
+            if remaining_runtime <= 0:
+                break
+        _, delete_response = purge(
+            model, now - model._safedelete_retention,
+            batch_size=batch_size, sleep=sleep, max_runtime=remaining_runtime, using=using,
+        )
+        deleted_counter.update(delete_response)
+    return sum(deleted_counter.values()), dict(deleted_counter)
@@ -1,17 +1,48 @@
 from collections import Counter
-from typing import Dict, Optional, Tuple, Type, TypeVar
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple, Type, TypeVar
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
 from django.db.models import query
+from django.utils import timezone
 
+from .cascade import (
+    CascadeTooDeep,
+    SoftDeleteCollector,
+    UndeleteCollector,
+    can_bulk_soft_delete_cascade,
+    can_bulk_undelete_cascade,
+    soft_delete_rows,
+    split_dependents,
+    undelete_rows,
+)
 from .config import (
     DELETED_ONLY_VISIBLE,
     DELETED_VISIBLE,
     FIELD_NAME,
     HARD_DELETE,
+    HARD_DELETE_NOCASCADE,
     NO_DELETE,
+    SOFT_DELETE,
+    SOFT_DELETE_CASCADE,
+)
+from .instrumentation import (
+    collects_pks,
+    describe_queryset,
+    instrument,
+    record_pks,
+)
+from .operations import (
+    DeletionResult,
+    can_undelete_queryset_operations_cascade,
+    deletion_result,
+    get_operation_ids,
+    new_operation_id,
+    undelete_operations_cascade,
 )
 from .query import SafeDeleteQuery
+from .utils import has_operation_field
 
 _QS = TypeVar('_QS', bound='SafeDeleteQueryset')
 
@@ -47,11 +78,30 @@ class SafeDeleteQueryset(query.QuerySet):
         return manager
     as_manager.queryset_only = True  # type: ignore
 
-    def delete(self, force_policy: Optional[int] = None) -> Tuple[int, Dict[str, int]]:
+    @instrument('queryset.delete', describe_queryset, result=deletion_result)
+    def delete(
+        self, force_policy: Optional[int] = None, chunk_size: Optional[int] = None, atomic_chunks: bool = False
+    ) -> Tuple[int, Dict[str, int]]:
         """Overrides bulk delete behaviour.
 
+        Args:
+            force_policy: Force a specific delete policy. (default: {None})
+            chunk_size: Load the objects by chunks of this size when they are deleted one by one,
+                so that the memory used does not grow with the queryset. (default: {None})
+            atomic_chunks: Delete each chunk in its own transaction. (default: {False})
+
+        With the ``SOFT_DELETE`` policy, the objects are soft deleted with a single ``UPDATE``
+        and the ``pre_bulk_softdelete``/``post_bulk_softdelete`` signals are sent once for the
+        whole queryset, unless
+        :py:func:`safedelete.models.SafeDeleteModel.can_bulk_soft_delete` returns False.
+        With the ``SOFT_DELETE_CASCADE`` policy, the related objects are soft deleted with an
+        ``UPDATE`` per relation, see :py:class:`safedelete.cascade.SoftDeleteCollector`.
+        With the ``HARD_DELETE_NOCASCADE`` policy, the objects with related objects deleted in
+        cascade are soft deleted with a single ``UPDATE`` and the others are hard deleted
+        together, see :py:func:`safedelete.cascade.split_dependents`.
+
         .. note::
-            The current implementation loses performance on bulk deletes in order
+            The other policies lose performance on bulk deletes in order
             to safely delete objects according to the deletion policies set.
 
         .. seealso::
@@ -59,47 +109,252 @@ class SafeDeleteQueryset(query.QuerySet):
         """
         assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with delete."
 
+        current_policy = self.model._safedelete_policy if force_policy is None else force_policy
+
         if force_policy == NO_DELETE:
             return (0, {})
         elif force_policy == HARD_DELETE:
             return self.hard_delete_policy_action()
-        else:
-            deleted_counter: Counter = Counter()
-            # TODO: Replace this by bulk update if we can
-            for obj in self.all():
-                res = obj.delete(force_policy=force_policy)
+        elif current_policy == SOFT_DELETE and self.model.can_bulk_soft_delete():
+            return self.soft_delete_policy_action()
+        elif current_policy == SOFT_DELETE_CASCADE and self.model._safedelete_db_cascade \
+                and self.model.can_bulk_soft_delete():
+            # The database triggers soft delete the related objects.
+            return self.soft_delete_policy_action()
+        elif current_policy == SOFT_DELETE_CASCADE and self.model.can_bulk_soft_delete() \
+                and can_bulk_soft_delete_cascade(self.model):
+            try:
+                return self.soft_delete_cascade_policy_action()
+            except CascadeTooDeep:
+                pass
+        elif current_policy == HARD_DELETE_NOCASCADE and self.model.can_bulk_hard_delete_nocascade():
+            return self.hard_delete_cascade_policy_action()
+
+        split = force_policy is None and current_policy == HARD_DELETE_NOCASCADE and self.model.can_split_dependents()
+        deleted_counter: Counter = Counter()
+        for chunk in self._chunks(chunk_size, atomic_chunks):
+            dependent_pks = self._get_dependent_pks(chunk) if split else None
+            for obj in chunk:
+                if dependent_pks is not None:
+                    res = obj.delete(force_policy=SOFT_DELETE if obj.pk in dependent_pks else HARD_DELETE)
+                else:
+                    res = obj.delete(force_policy=force_policy)
                 if res is not None:
                     _, delete_response = res
-                    deleted_counter.update(delete_response)                
-            self._result_cache = None
-            return sum(deleted_counter.values()), dict(deleted_counter)
+                    deleted_counter.update(delete_response)
+        self._result_cache = None
+        return sum(deleted_counter.values()), dict(deleted_counter)
     delete.alters_data = True  # type: ignore
 
+    async def adelete(
+        self, force_policy: Optional[int] = None, chunk_size: Optional[int] = None, atomic_chunks: bool = False
+    ) -> Tuple[int, Dict[str, int]]:
+        """Async version of :func:`delete`."""
+        return await sync_to_async(self.delete)(
+            force_policy=force_policy, chunk_size=chunk_size, atomic_chunks=atomic_chunks
+        )
+    adelete.alters_data = True  # type: ignore
+
+    def _chunks(self, chunk_size: Optional[int], atomic_chunks: bool) -> Iterator[List]:
+        # Yield the objects by chunks of primary keys, in a transaction if atomic_chunks is set.
+        # Each chunk is selected after the previous one was processed, so that the objects are
+        # not all loaded at once and only the chunk being processed is locked.
+        if chunk_size is None:
+            with transaction.atomic(using=self.db) if atomic_chunks else nullcontext():
+                yield list(self.all())
+            return
+
+        queryset = self.all().order_by('pk')
+        last_pk = None
+        while True:
+            with transaction.atomic(using=self.db) if atomic_chunks else nullcontext():
+                chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                chunk = list(chunk_queryset[:chunk_size])
+                if len(chunk) < chunk_size:
+                    if chunk:
+                        yield chunk
+                    return
+                # Read before the chunk is processed, hard deleted objects lose their primary key.
+                last_pk = chunk[-1].pk
+                yield chunk
+
+    def _get_dependent_pks(self, objs) -> set:
+        # The primary keys of "objs" with objects deleted in cascade, found with a single query
+        # instead of checking the dependents of each object.
+        queryset = self.model._base_manager.using(self.db).filter(pk__in=[obj.pk for obj in objs])
+        _, dependent_queryset = split_dependents(queryset)
+        return set(dependent_queryset.values_list('pk', flat=True))
+
     def hard_delete_policy_action(self) -> Tuple[int, Dict[str, int]]:
         # Normally hard-delete the objects.
         self.query._filter_visibility()
+        if collects_pks():
+            record_pks(self.model, list(self.values_list('pk', flat=True)))
         return super().delete()
 
-    def undelete(self, force_policy: Optional[int] = None) -> Tuple[int, Dict[str, int]]:
+    def soft_delete_policy_action(self) -> Tuple[int, Dict[str, int]]:
+        # Soft-delete the visible objects which are not deleted yet, in a single UPDATE.
+        queryset = self.all()
+        queryset._for_write = True  # type: ignore[attr-defined]
+        queryset.query._filter_visibility()
+
+        deleted = timezone.now()
+        operation_id = new_operation_id() if has_operation_field(self.model) else None
+        with transaction.atomic(using=queryset.db, savepoint=False):
+            count = soft_delete_rows(self.model, queryset, deleted, operation_id=operation_id)
+
+        if not count:
+            return DeletionResult(0, {})
+        return DeletionResult(count, {self.model._meta.label: count}, operation_id=operation_id, deleted=deleted)
+
+    def soft_delete_cascade_policy_action(self) -> Tuple[int, Dict[str, int]]:
+        # Soft-delete the visible objects and their related objects, with an UPDATE per relation.
+        queryset = self.all()
+        queryset._for_write = True  # type: ignore[attr-defined]
+        queryset.query._filter_visibility()
+
+        collector = SoftDeleteCollector(using=queryset.db)
+        collector.collect(self.model, queryset)
+        collector.raise_protected(self.model)
+
+        deleted = timezone.now()
+        operation_id = new_operation_id() if has_operation_field(self.model) else None
+        with transaction.atomic(using=queryset.db, savepoint=False):
+            deleted_counter = collector.soft_delete(deleted, operation_id=operation_id)
+            # The related objects are selected through the queryset, so update them before it.
+            collector.update_fields()
+            count = soft_delete_rows(self.model, queryset, deleted, operation_id=operation_id)
+            if count:
+                deleted_counter[self.model._meta.label] += count
+        if not deleted_counter:
+            return DeletionResult(0, {})
+        return DeletionResult(
+            sum(deleted_counter.values()), dict(deleted_counter), operation_id=operation_id, deleted=deleted
+        )
+
+    def hard_delete_cascade_policy_action(self) -> Tuple[int, Dict[str, int]]:
+        # Soft-delete the visible objects with dependents in a single UPDATE and hard-delete the others.
+        queryset = self.all()
+        queryset._for_write = True  # type: ignore[attr-defined]
+        queryset.query._filter_visibility()
+        free_queryset, dependent_queryset = split_dependents(queryset)
+
+        deleted = timezone.now()
+        operation_id = new_operation_id() if has_operation_field(self.model) else None
+        with transaction.atomic(using=queryset.db):
+            # Soft deleted objects keep their dependents, so the split is the same for the DELETE.
+            count = soft_delete_rows(self.model, dependent_queryset, deleted, operation_id=operation_id)
+            if collects_pks():
+                record_pks(self.model, list(free_queryset.values_list('pk', flat=True)))
+            _, delete_response = super(SafeDeleteQueryset, free_queryset).delete()
+
+        deleted_counter: Counter = Counter({label: count for label, count in delete_response.items() if count})
+        if not count:
+            return sum(deleted_counter.values()), dict(deleted_counter)
+        deleted_counter[self.model._meta.label] += count
+        return DeletionResult(
+            sum(deleted_counter.values()), dict(deleted_counter), operation_id=operation_id, deleted=deleted
+        )
+
+    @instrument('queryset.undelete', describe_queryset, result=deletion_result)
+    def undelete(
+        self, force_policy: Optional[int] = None, chunk_size: Optional[int] = None, atomic_chunks: bool = False
+    ) -> Tuple[int, Dict[str, int]]:
         """Undelete all soft deleted models.
 
+        Args:
+            force_policy: Force a specific undelete policy. (default: {None})
+            chunk_size: Load the objects by chunks of this size when they are undeleted one by one,
+                so that the memory used does not grow with the queryset. (default: {None})
+            atomic_chunks: Undelete each chunk in its own transaction. (default: {False})
+
+        The objects are undeleted with a single ``UPDATE`` and the ``post_bulk_undelete`` signal
+        is sent once for the whole queryset, as long as
+        :py:func:`safedelete.models.SafeDeleteModel.can_bulk_undelete` returns True.
+        With the ``SOFT_DELETE_CASCADE`` policy, the objects deleted by cascade are undeleted
+        with an ``UPDATE`` per relation, see :py:class:`safedelete.cascade.UndeleteCollector`.
+
         .. note::
-            The current implementation loses performance on bulk undeletes in
+            Otherwise the current implementation loses performance on bulk undeletes in
             order to call the pre/post-save signals.
 
         .. seealso::
             :py:func:`safedelete.models.SafeDeleteModel.undelete`
         """
         assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with undelete."
+
+        current_policy = self.model._safedelete_policy if force_policy is None else force_policy
+
+        if (current_policy != SOFT_DELETE_CASCADE or self.model._safedelete_db_cascade) \
+                and self.model.can_bulk_undelete():
+            return self.undelete_policy_action()
+        elif current_policy == SOFT_DELETE_CASCADE and self.model.can_bulk_undelete() \
+                and can_bulk_undelete_cascade(self.model):
+            try:
+                return self.undelete_cascade_policy_action()
+            except CascadeTooDeep:
+                pass
+
         undeleted_counter: Counter = Counter()
-        # TODO: Replace this by bulk update if we can (need to call pre/post-save signal)
-        for obj in self.all():
-            _, undelete_response = obj.undelete(force_policy=force_policy)
-            undeleted_counter.update(undelete_response)
+        for chunk in self._chunks(chunk_size, atomic_chunks):
+            for obj in chunk:
+                _, undelete_response = obj.undelete(force_policy=force_policy)
+                undeleted_counter.update(undelete_response)
         self._result_cache = None
         return sum(undeleted_counter.values()), dict(undeleted_counter)
     undelete.alters_data = True  # type: ignore
 
+    async def aundelete(
+        self, force_policy: Optional[int] = None, chunk_size: Optional[int] = None, atomic_chunks: bool = False
+    ) -> Tuple[int, Dict[str, int]]:
+        """Async version of :func:`undelete`."""
+        return await sync_to_async(self.undelete)(
+            force_policy=force_policy, chunk_size=chunk_size, atomic_chunks=atomic_chunks
+        )
+    aundelete.alters_data = True  # type: ignore
+
+    def undelete_policy_action(self) -> Tuple[int, Dict[str, int]]:
+        # Undelete the visible soft deleted objects, in a single UPDATE.
+        queryset = self.all()
+        queryset._for_write = True  # type: ignore[attr-defined]
+        queryset.query._filter_visibility()
+
+        with transaction.atomic(using=queryset.db, savepoint=False):
+            count = undelete_rows(self.model, queryset)
+
+        if not count:
+            return (0, {})
+        return count, {self.model._meta.label: count}
+
+    def undelete_cascade_policy_action(self) -> Tuple[int, Dict[str, int]]:
+        # Undelete the visible soft deleted objects and the objects deleted by cascade with them.
+        queryset = self.all()
+        queryset._for_write = True  # type: ignore[attr-defined]
+        queryset.query._filter_visibility()
+        queryset = queryset.filter(**{FIELD_NAME + '__isnull': False})
+
+        if can_undelete_queryset_operations_cascade(self.model, queryset):
+            # The objects deleted in cascade are found through the operation ids of the queryset.
+            with transaction.atomic(using=queryset.db, savepoint=False):
+                undeleted_counter = undelete_operations_cascade(
+                    self.model, get_operation_ids(queryset), queryset.db
+                )
+                count = undelete_rows(self.model, queryset)
+                if count:
+                    undeleted_counter[self.model._meta.label] += count
+            return sum(undeleted_counter.values()), dict(undeleted_counter)
+
+        collector = UndeleteCollector(using=queryset.db)
+        collector.collect(self.model, queryset)
+
+        with transaction.atomic(using=queryset.db, savepoint=False):
+            undeleted_counter = collector.undelete()
+            # The related objects are selected through the queryset, so undelete them before it.
+            count = undelete_rows(self.model, queryset)
+            if count:
+                undeleted_counter[self.model._meta.label] += count
+        return sum(undeleted_counter.values()), dict(undeleted_counter)
+
     def all(self: _QS, force_visibility=None) -> _QS:
         """Override so related managers can also see the deleted models.
 
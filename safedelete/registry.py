@@ -0,0 +1,124 @@
+"""Per-model metadata used by the deletion hot paths, computed once per model.
+
+The registry is populated for all the models in :py:meth:`safedelete.apps.SafeDeleteConfig.ready`,
+the models defined later are added on first use. Defining a model clears the metadata of the other
+models, like Django expires the relations cached in the model options.
+"""
+from typing import Dict, Type
+from weakref import WeakKeyDictionary
+
+from django.apps import apps
+from django.db.models import Model
+from django.db.models.deletion import (
+    CASCADE,
+    DO_NOTHING,
+    get_candidate_relations_to_delete,
+)
+from django.db.models.signals import class_prepared
+from django.utils.functional import cached_property
+
+# The module defining SafeDeleteModel, compared to the module of the bases of the models.
+# It is derived from this module's ``__name__`` so that it does not depend on the import path.
+MODELS_MODULE = __name__.rsplit('.', 1)[0] + '.models'
+
+# class: whether it is a safedelete class, this never changes. The historical models of the
+# migrations are checked too, they are not kept alive.
+_safedelete_classes: 'WeakKeyDictionary[type, bool]' = WeakKeyDictionary()
+# model: ModelPlan
+_plans: Dict[Type[Model], 'ModelPlan'] = {}
+
+
+def is_safedelete_cls(cls):
+    """ Return whether "cls" inherits from a class of ``safedelete.models``, e.g. ``SafeDeleteModel``. """
+    try:
+        return _safedelete_classes[cls]
+    except KeyError:
+        pass
+    result = any(base.__module__ == MODELS_MODULE or is_safedelete_cls(base) for base in cls.__bases__)
+    _safedelete_classes[cls] = result
+    return result
+
+
+class ModelPlan:
+    """The metadata of a model used when deleting its objects.
+
+    :attribute is_safedelete: whether the model is a safedelete model.
+    :attribute relations: the (field, related model) of the relations to the model, the field
+        being either the foreign key of the related model or a generic relation of the model.
+    :attribute unique_sets: the sets of field names which must be unique together,
+        from ``unique=True``, ``unique_together`` and the unique constraints without condition.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.is_safedelete = is_safedelete_cls(model)
+        self.relations = tuple(self.get_relations(model))
+        self.unique_sets = tuple(self.get_unique_sets(model))
+
+    @staticmethod
+    def get_relations(model):
+        for related in get_candidate_relations_to_delete(model._meta):
+            yield related.field, related.related_model
+        for field in model._meta.private_fields:
+            if hasattr(field, 'bulk_related_objects'):
+                yield field, field.remote_field.model
+
+    @staticmethod
+    def get_unique_sets(model):
+        opts = model._meta
+        for field in opts.fields:
+            if field._unique:
+                yield frozenset((field.name,))
+        for fields in opts.unique_together:
+            yield frozenset(fields)
+        for constraint in opts.total_unique_constraints:
+            yield frozenset(constraint.fields)
+
+    @cached_property
+    def cascade_relations(self):
+        """ The (field, related model, on_delete) of the relations followed when deleting objects of the model.
+
+        Computed once per plan, replacing the ``on_delete`` of a field afterwards needs a :py:func:`clear`.
+        """
+        relations = []
+        for field, related_model in self.relations:
+            if hasattr(field, 'bulk_related_objects'):
+                relations.append((field, related_model, CASCADE))
+            elif field.remote_field.on_delete is not DO_NOTHING:
+                relations.append((field, related_model, field.remote_field.on_delete))
+        return tuple(relations)
+
+    @cached_property
+    def cascade_models(self):
+        """ The models whose objects can be deleted in cascade with objects of the model, in the order they are reached. """
+        seen = {}
+        stack = [self.model]
+        while stack:
+            for field, related_model, on_delete in get_plan(stack.pop()).cascade_relations:
+                if on_delete is CASCADE and related_model not in seen:
+                    seen[related_model] = None
+                    stack.append(related_model)
+        return tuple(seen)
+
+
+def get_plan(model):
+    """ Return the :py:class:`ModelPlan` of "model", computing it if needed. """
+    try:
+        return _plans[model]
+    except KeyError:
+        plan = _plans[model] = ModelPlan(model)
+        return plan
+
+
+def populate():
+    """ Compute the plans of all the installed models. """
+    for model in apps.get_models(include_auto_created=True):
+        get_plan(model)
+
+
+def clear(**kwargs):
+    """ Clear the plans, whose relations may change when a model is defined or a relation is replaced. """
+    _plans.clear()
+
+
+class_prepared.connect(clear)
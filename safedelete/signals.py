@@ -3,3 +3,6 @@ from django.db.models.signals import ModelSignal
 pre_softdelete = ModelSignal(use_caching=True)
 post_softdelete = ModelSignal(use_caching=True)
 post_undelete = ModelSignal(use_caching=True)
+pre_bulk_softdelete = ModelSignal(use_caching=True)
+post_bulk_softdelete = ModelSignal(use_caching=True)
+post_bulk_undelete = ModelSignal(use_caching=True)
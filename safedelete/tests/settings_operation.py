@@ -0,0 +1,7 @@
+import random
+import string
+
+from .settings import *  # noqa: F401,F403
+
+# The deletion operation field is optional, the tests run with and without it.
+SAFE_DELETE_OPERATION_FIELD_NAME = ''.join(random.choice(string.ascii_uppercase) for i in range(9))
@@ -167,6 +167,7 @@ class AdminTestCase(TestCase):
             '_selected_action': [self.categories[1].pk],
         })
         self.assertTemplateUsed(resp, 'safedelete/hard_delete_selected_confirmation.html')
+        self.assertEqual(resp.context['cascade_preview'], [])
         self.assertTrue(getattr(self.categories[1], FIELD_NAME))
 
         resp = self.client.post('/admin/safedelete/category/', data={
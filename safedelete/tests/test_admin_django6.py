@@ -88,3 +88,39 @@ class LogUndeletionTestCase(TestCase):
             self.assertTrue(hasattr(LogEntry.objects, "log_actions"))
         else:  # pragma: no cover - executed on Django <= 5.x only
             self.assertTrue(hasattr(LogEntry.objects, "log_action"))
+
+    def test_log_undeletions(self):
+        """log_undeletions writes a CHANGE LogEntry per object."""
+        cats = [AdminLoggableCategory.objects.create(name=str(i)) for i in range(3)]
+        AdminLoggableCategory.objects.all().delete()
+
+        request = self.factory.get("/admin/")
+        request.user = self.user
+
+        model_admin = SafeDeleteAdmin(AdminLoggableCategory, admin.site)
+        model_admin.log_undeletions(request, AdminLoggableCategory.all_objects.all())
+
+        self.assertEqual(
+            sorted(LogEntry.objects.filter(action_flag=CHANGE).values_list("object_id", flat=True)),
+            sorted(str(cat.pk) for cat in cats),
+        )
+
+    def test_log_undeletions_overridden_log_undeletion(self):
+        """An overridden log_undeletion is still called for each object."""
+        logged = []
+
+        class LoggingAdmin(SafeDeleteAdmin):
+            def log_undeletion(self, request, obj, object_repr):
+                logged.append(object_repr)
+
+        for i in range(2):
+            AdminLoggableCategory.objects.create(name=str(i)).delete()
+
+        request = self.factory.get("/admin/")
+        request.user = self.user
+
+        LoggingAdmin(AdminLoggableCategory, admin.site).log_undeletions(
+            request, AdminLoggableCategory.all_objects.order_by("pk")
+        )
+        self.assertEqual(logged, ["0", "1"])
+        self.assertEqual(LogEntry.objects.count(), 0)
@@ -0,0 +1,56 @@
+from django.db import models
+from django.test import TestCase
+
+from ..config import HARD_DELETE, SOFT_DELETE_CASCADE
+from ..models import SafeDeleteModel
+
+
+class AsyncModel(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, unique=True)
+
+
+class AsyncChild(SafeDeleteModel):
+    parent = models.ForeignKey(AsyncModel, on_delete=models.CASCADE)
+
+
+class AsyncTestCase(TestCase):
+
+    def setUp(self):
+        self.instances = [AsyncModel.objects.create(name=str(i)) for i in range(3)]
+        AsyncChild.objects.create(parent=self.instances[0])
+
+    async def test_adelete(self):
+        output = await self.instances[0].adelete()
+        self.assertEqual(output, (2, {AsyncModel._meta.label: 1, AsyncChild._meta.label: 1}))
+        self.assertEqual(await AsyncChild.objects.acount(), 0)
+
+        output = await self.instances[0].aundelete()
+        self.assertEqual(output, (2, {AsyncModel._meta.label: 1, AsyncChild._meta.label: 1}))
+        self.assertEqual(await AsyncChild.objects.acount(), 1)
+
+    async def test_adelete_hard(self):
+        await self.instances[1].adelete(force_policy=HARD_DELETE)
+        self.assertEqual(await AsyncModel.all_objects.acount(), 2)
+
+    async def test_queryset_adelete(self):
+        output = await AsyncModel.objects.filter(name__in=['0', '1']).adelete()
+        self.assertEqual(output, (3, {AsyncModel._meta.label: 2, AsyncChild._meta.label: 1}))
+
+        output = await AsyncModel.deleted_objects.all().aundelete()
+        self.assertEqual(output, (3, {AsyncModel._meta.label: 2, AsyncChild._meta.label: 1}))
+        self.assertEqual(await AsyncModel.objects.acount(), 3)
+
+    async def test_aupdate_or_create(self):
+        await self.instances[0].adelete()
+        obj, created = await AsyncModel.objects.aupdate_or_create(name='0')
+        self.assertFalse(created)
+        self.assertEqual(obj, self.instances[0])
+        self.assertEqual(await AsyncModel.objects.acount(), 3)
+
+    async def test_async_iteration(self):
+        await self.instances[0].adelete()
+        self.assertEqual([obj async for obj in AsyncModel.objects.all_with_deleted().order_by('pk')], self.instances)
+        self.assertEqual([obj async for obj in AsyncModel.objects.deleted_only()], [self.instances[0]])
+        self.assertEqual([obj async for obj in AsyncModel.objects.deleted_only().aiterator()], [self.instances[0]])
@@ -0,0 +1,381 @@
+from django.db import models
+from django.db.models.signals import post_save, pre_delete
+from django.test import override_settings
+
+from ..config import (
+    BULK_CREATED,
+    BULK_REVIVED,
+    BULK_UPDATED,
+    DELETED_BY_CASCADE_FIELD_NAME,
+    FIELD_NAME,
+    HARD_DELETE_NOCASCADE,
+    SOFT_DELETE_CASCADE,
+)
+from ..models import SafeDeleteModel
+from ..signals import (
+    post_bulk_softdelete,
+    post_bulk_undelete,
+    post_undelete,
+    pre_bulk_softdelete,
+    pre_softdelete,
+)
+from .testcase import ReadReplicaRouter, SafeDeleteTestCase
+
+
+class BulkModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, blank=True)
+
+
+class BulkParentModel(SafeDeleteModel):
+    pass
+
+
+class BulkDependentModel(SafeDeleteModel):
+    parent = models.ForeignKey(BulkParentModel, on_delete=models.CASCADE)
+
+
+class BulkUniqueModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+
+
+class BulkUniqueNoCascadeFieldModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+    vars()[DELETED_BY_CASCADE_FIELD_NAME] = None
+
+
+class BulkOverrideModel(SafeDeleteModel):
+
+    def soft_delete_policy_action(self, **kwargs):
+        self.name = 'overridden'
+        return super().soft_delete_policy_action(**kwargs)
+
+
+class BulkSoftDeleteTestCase(SafeDeleteTestCase):
+
+    def setUp(self):
+        self.instances = [BulkModel.objects.create(name=str(i)) for i in range(5)]
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            output = BulkModel.objects.all().delete()
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(BulkModel.objects.count(), 0)
+        self.assertEqual(BulkModel.deleted_objects.count(), 5)
+
+    def test_shared_timestamp(self):
+        BulkModel.objects.all().delete()
+        self.assertEqual(BulkModel.deleted_objects.values(FIELD_NAME).distinct().count(), 1)
+
+    def test_filters(self):
+        output = BulkModel.objects.filter(name__in=['0', '1']).delete()
+        self.assertEqual(output, (2, {BulkModel._meta.label: 2}))
+        self.assertEqual(BulkModel.objects.count(), 3)
+
+    def test_already_deleted_untouched(self):
+        self.instances[0].delete()
+        self.instances[0].refresh_from_db()
+        deleted = getattr(self.instances[0], FIELD_NAME)
+
+        output = BulkModel.all_objects.all().delete()
+        self.assertEqual(output, (4, {BulkModel._meta.label: 4}))
+        self.instances[0].refresh_from_db()
+        self.assertEqual(getattr(self.instances[0], FIELD_NAME), deleted)
+
+    @override_settings(SAFE_DELETE_BULK_BATCH_SIZE=2)
+    def test_batch_signal(self):
+        received = []
+
+        def receiver(sender, pks, using, deleted, **kwargs):
+            received.append((sender, list(pks), using, deleted))
+
+        post_bulk_softdelete.connect(receiver, sender=BulkModel)
+        try:
+            with self.assertNumQueries(4):
+                output = BulkModel.objects.all().delete()
+        finally:
+            post_bulk_softdelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(len(received), 1)
+        sender, pks, using, deleted = received[0]
+        self.assertEqual(sender, BulkModel)
+        self.assertEqual(pks, [instance.pk for instance in self.instances])
+        self.assertEqual(using, 'default')
+        self.assertEqual(getattr(BulkModel.deleted_objects.get(pk=pks[0]), FIELD_NAME), deleted)
+
+    def test_pre_batch_signal(self):
+        received = []
+
+        def receiver(sender, pks, using, deleted, **kwargs):
+            # Objects are not deleted yet
+            received.append((list(pks), BulkModel.objects.filter(pk__in=pks).count()))
+
+        pre_bulk_softdelete.connect(receiver, sender=BulkModel)
+        try:
+            BulkModel.objects.filter(name__in=['3', '4']).delete()
+        finally:
+            pre_bulk_softdelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(received, [([self.instances[3].pk, self.instances[4].pk], 2)])
+        self.assertEqual(BulkModel.objects.count(), 3)
+
+    def test_per_instance_receivers(self):
+        received = []
+
+        def receiver(sender, instance, **kwargs):
+            received.append(instance.pk)
+
+        pre_softdelete.connect(receiver, sender=BulkModel)
+        try:
+            self.assertFalse(BulkModel.can_bulk_soft_delete())
+            output = BulkModel.objects.all().delete()
+        finally:
+            pre_softdelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(sorted(received), [instance.pk for instance in self.instances])
+        self.assertTrue(BulkModel.can_bulk_soft_delete())
+
+    def test_chunks(self):
+        loaded = []
+
+        def receiver(sender, instance, **kwargs):
+            loaded.append(instance.pk)
+
+        pre_softdelete.connect(receiver, sender=BulkModel)
+        try:
+            # A SELECT per chunk of 2 objects and an UPDATE per object
+            with self.assertNumQueries(8):
+                output = BulkModel.objects.all().delete(chunk_size=2)
+        finally:
+            pre_softdelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(loaded, [instance.pk for instance in self.instances])
+
+    def test_hard_delete_chunks(self):
+        # The hard deleted objects lose their primary key, the next chunk starts after the last one loaded
+        # and not over the soft deleted ones.
+        parents = [BulkParentModel.objects.create() for i in range(5)]
+        BulkDependentModel.objects.create(parent=parents[0])
+        loaded = []
+
+        def receiver(sender, instance, **kwargs):
+            loaded.append(instance.pk)
+
+        pre_softdelete.connect(receiver, sender=BulkParentModel)
+        pre_delete.connect(receiver, sender=BulkParentModel)
+        try:
+            output = BulkParentModel.all_objects.all().delete(force_policy=HARD_DELETE_NOCASCADE, chunk_size=2)
+        finally:
+            pre_softdelete.disconnect(receiver, sender=BulkParentModel)
+            pre_delete.disconnect(receiver, sender=BulkParentModel)
+
+        self.assertEqual(output, (5, {BulkParentModel._meta.label: 5}))
+        self.assertEqual(loaded, [parent.pk for parent in parents])
+        self.assertEqual(list(BulkParentModel.all_objects.values_list('pk', flat=True)), [parents[0].pk])
+
+    def test_atomic_chunks(self):
+        def receiver(sender, instance, **kwargs):
+            if instance.name == '3':
+                raise ValueError()
+
+        pre_softdelete.connect(receiver, sender=BulkModel)
+        try:
+            with self.assertRaises(ValueError):
+                BulkModel.objects.all().delete(chunk_size=2, atomic_chunks=True)
+        finally:
+            pre_softdelete.disconnect(receiver, sender=BulkModel)
+
+        # The first chunk is deleted, the second one is rolled back.
+        self.assertEqual(list(BulkModel.objects.order_by('name').values_list('name', flat=True)), ['2', '3', '4'])
+
+    def test_save_receiver(self):
+        # The objects are saved like when they are deleted one by one.
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.pk)
+
+        post_save.connect(receiver, sender=BulkModel)
+        self.addCleanup(post_save.disconnect, receiver, sender=BulkModel)
+        self.assertFalse(BulkModel.can_bulk_soft_delete())
+        self.assertFalse(BulkModel.can_bulk_hard_delete_nocascade())
+        BulkModel.objects.all().delete()
+        self.assertEqual(saved, [instance.pk for instance in self.instances])
+
+    def test_overridden_delete(self):
+        BulkOverrideModel.objects.create()
+        self.assertFalse(BulkOverrideModel.can_bulk_soft_delete())
+        self.assertEqual(BulkOverrideModel.objects.all().delete(), (1, {BulkOverrideModel._meta.label: 1}))
+
+    def test_cascade_policy(self):
+        with self.assertNumQueries(1):
+            output = BulkModel.objects.all().delete(force_policy=SOFT_DELETE_CASCADE)
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+
+
+class BulkUndeleteTestCase(SafeDeleteTestCase):
+
+    def setUp(self):
+        self.instances = [BulkModel.objects.create(name=str(i)) for i in range(5)]
+        BulkModel.objects.all().delete()
+        BulkModel.all_objects.filter(pk=self.instances[0].pk).update(**{DELETED_BY_CASCADE_FIELD_NAME: True})
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            output = BulkModel.deleted_objects.all().undelete()
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(BulkModel.objects.count(), 5)
+        self.assertEqual(BulkModel.objects.filter(**{DELETED_BY_CASCADE_FIELD_NAME: True}).count(), 0)
+
+    def test_alive_untouched(self):
+        self.instances[0].refresh_from_db()
+        self.instances[0].undelete()
+        output = BulkModel.all_objects.all().undelete()
+        self.assertEqual(output, (4, {BulkModel._meta.label: 4}))
+        self.assertEqual(BulkModel.objects.all().undelete(), (0, {}))
+
+    @override_settings(SAFE_DELETE_BULK_BATCH_SIZE=3)
+    def test_batch_signal(self):
+        received = []
+
+        def receiver(sender, pks, using, **kwargs):
+            received.append((sender, list(pks), using))
+
+        post_bulk_undelete.connect(receiver, sender=BulkModel)
+        try:
+            with self.assertNumQueries(3):
+                output = BulkModel.deleted_objects.filter(name__in=['1', '2', '3', '4']).undelete()
+        finally:
+            post_bulk_undelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (4, {BulkModel._meta.label: 4}))
+        self.assertEqual(received, [(BulkModel, [instance.pk for instance in self.instances[1:]], 'default')])
+
+    def test_per_instance_receivers(self):
+        received = []
+
+        def receiver(sender, instance, **kwargs):
+            received.append(instance.pk)
+
+        post_undelete.connect(receiver, sender=BulkModel)
+        try:
+            self.assertFalse(BulkModel.can_bulk_undelete())
+            output = BulkModel.deleted_objects.all().undelete()
+        finally:
+            post_undelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(sorted(received), [instance.pk for instance in self.instances])
+        self.assertTrue(BulkModel.can_bulk_undelete())
+
+    def test_save_receiver(self):
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.pk)
+
+        post_save.connect(receiver, sender=BulkModel)
+        self.addCleanup(post_save.disconnect, receiver, sender=BulkModel)
+        self.assertFalse(BulkModel.can_bulk_undelete())
+        BulkModel.deleted_objects.all().undelete()
+        self.assertEqual(saved, [instance.pk for instance in self.instances])
+
+    def test_chunks(self):
+        def receiver(sender, instance, **kwargs):
+            pass
+
+        post_undelete.connect(receiver, sender=BulkModel)
+        try:
+            # A SELECT per chunk of 3 objects and an UPDATE per object
+            with self.assertNumQueries(7):
+                output = BulkModel.deleted_objects.all().undelete(chunk_size=3)
+        finally:
+            post_undelete.disconnect(receiver, sender=BulkModel)
+
+        self.assertEqual(output, (5, {BulkModel._meta.label: 5}))
+        self.assertEqual(BulkModel.objects.count(), 5)
+
+
+class BulkUpdateOrCreateTestCase(SafeDeleteTestCase):
+
+    def setUp(self):
+        self.alive = BulkUniqueModel.objects.create(name='alive', value=1)
+        self.deleted = BulkUniqueModel.objects.create(name='deleted', value=1)
+        self.deleted.delete()
+
+    def test_statuses(self):
+        results = BulkUniqueModel.objects.bulk_update_or_create(
+            [{'name': 'alive', 'value': 2}, BulkUniqueModel(name='deleted', value=2), {'name': 'new', 'value': 2}],
+            unique_fields=['name'],
+            update_fields=['value'],
+        )
+        self.assertEqual([status for obj, status in results], [BULK_UPDATED, BULK_REVIVED, BULK_CREATED])
+        self.assertEqual([obj.pk for obj, status in results[:2]], [self.alive.pk, self.deleted.pk])
+        self.assertEqual(
+            list(BulkUniqueModel.objects.order_by('name').values_list('name', 'value')),
+            [('alive', 2), ('deleted', 2), ('new', 2)],
+        )
+
+    def test_without_deleted_by_cascade(self):
+        BulkUniqueNoCascadeFieldModel.objects.create(name='deleted').delete()
+        results = BulkUniqueNoCascadeFieldModel.objects.bulk_update_or_create(
+            [{'name': 'deleted', 'value': 2}], unique_fields=['name'], update_fields=['value'],
+        )
+        self.assertEqual([status for obj, status in results], [BULK_REVIVED])
+        self.assertEqual(BulkUniqueNoCascadeFieldModel.objects.get().value, 2)
+
+    def test_queries(self):
+        objs = [{'name': 'alive'}, {'name': 'deleted'}] + [{'name': str(i)} for i in range(10)]
+        # The lookup, the bulk_update() and the bulk_create() (and savepoints).
+        with self.assertNumQueries(5):
+            BulkUniqueModel.objects.bulk_update_or_create(objs, unique_fields=['name'], update_fields=['value'])
+        self.assertEqual(BulkUniqueModel.objects.count(), 12)
+
+    @override_settings(SAFE_DELETE_BULK_BATCH_SIZE=1)
+    def test_lookup_batches(self):
+        results = BulkUniqueModel.objects.bulk_update_or_create(
+            [{'name': 'alive'}, {'name': 'deleted'}], unique_fields=['name'], update_fields=['value'],
+        )
+        self.assertEqual([status for obj, status in results], [BULK_UPDATED, BULK_REVIVED])
+
+    def test_batch_signal(self):
+        calls = []
+
+        def receiver(sender, pks, using, **kwargs):
+            calls.append((sender, pks, using))
+
+        post_bulk_undelete.connect(receiver)
+        try:
+            BulkUniqueModel.objects.bulk_update_or_create(
+                [{'name': 'alive'}, {'name': 'deleted'}], unique_fields=['name'], update_fields=['value'],
+            )
+        finally:
+            post_bulk_undelete.disconnect(receiver)
+        self.assertEqual(calls, [(BulkUniqueModel, [self.deleted.pk], 'default')])
+
+    def test_write_database(self):
+        calls = []
+
+        def receiver(sender, pks, using, **kwargs):
+            calls.append(using)
+
+        post_bulk_undelete.connect(receiver)
+        self.addCleanup(post_bulk_undelete.disconnect, receiver)
+        with override_settings(DATABASE_ROUTERS=[ReadReplicaRouter()]):
+            results = BulkUniqueModel.objects.bulk_update_or_create(
+                [{'name': 'alive'}, {'name': 'deleted'}, {'name': 'new'}],
+                unique_fields=['name'], update_fields=['value'],
+            )
+        self.assertEqual([obj._state.db for obj, status in results], ['default'] * 3)
+        self.assertEqual(calls, ['default'])
+        self.assertEqual(BulkUniqueModel.objects.count(), 3)
+
+    def test_duplicate_keys(self):
+        with self.assertRaises(ValueError):
+            BulkUniqueModel.objects.bulk_update_or_create(
+                [{'name': 'new'}, {'name': 'new'}], unique_fields=['name'], update_fields=['value'],
+            )
@@ -0,0 +1,169 @@
+from unittest.mock import patch
+
+from django.core import checks
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.state import ModelState, ProjectState
+from django.test import TestCase
+
+from ..config import FIELD_NAME
+from ..models import SafeDeleteModel
+
+
+class IndexedModel(SafeDeleteModel):
+    _safedelete_indexed_fields = ('name', ('code', 'name'))
+
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=100)
+    reference = models.CharField(max_length=100, db_index=True)
+
+
+class IndexedChild(IndexedModel):
+    title = models.CharField(max_length=100)
+
+
+class IndexedRelationsModel(SafeDeleteModel):
+    # Looked up with the related manager.
+    parent = models.ForeignKey(IndexedModel, on_delete=models.CASCADE)
+    # Only looked up by the cascades.
+    hidden = models.ForeignKey(IndexedModel, on_delete=models.CASCADE, related_name='+')
+    # Indexed with the deleted field.
+    other = models.ForeignKey(IndexedModel, on_delete=models.CASCADE, related_name='others', db_index=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['other', FIELD_NAME])]
+
+
+def get_migration_operations(model):
+    """ Return the operations of the migration creating "model", as generated by ``makemigrations``. """
+    to_state = ProjectState()
+    to_state.add_model(ModelState.from_model(model))
+    changes = MigrationAutodetector(ProjectState(), to_state)._detect_changes()
+    migration, = changes[model._meta.app_label]
+    return migration.operations
+
+
+def get_migration_options(model, name):
+    """ Return the names of the indexes or constraints "name" created by the migration of "model". """
+    names = []
+    for operation in get_migration_operations(model):
+        if hasattr(operation, 'options'):
+            names.extend(option.name for option in operation.options.get(name, []))
+        for attribute in ('index', 'constraint'):
+            if hasattr(operation, attribute):
+                names.append(getattr(operation, attribute).name)
+    return names
+
+
+class IndexesTestCase(TestCase):
+
+    def test_alive_indexes(self):
+        indexes = IndexedModel._meta.indexes
+        self.assertEqual([index.fields for index in indexes], [['name'], ['code', 'name']])
+        for index in indexes:
+            self.assertEqual(index.condition, models.Q(**{FIELD_NAME + '__isnull': True}))
+            self.assertLessEqual(len(index.name), 30)
+        # The fields of the parent are indexed with the parent.
+        self.assertEqual(IndexedChild._meta.indexes, [])
+
+    def test_migration(self):
+        # makemigrations creates the indexes without Meta.indexes.
+        names = [index.name for index in IndexedModel._meta.indexes]
+        self.assertEqual(
+            [index.name for index in ModelState.from_model(IndexedModel).options['indexes']], names,
+        )
+        self.assertEqual(get_migration_options(IndexedModel, 'indexes'), names)
+
+    def test_index_used(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks the SQLite query plan')
+        queryset = IndexedModel.objects.filter(name='name')
+        self.assertIn(IndexedModel._meta.indexes[0].name, queryset.explain())
+
+    def test_check(self):
+        self.assertEqual(IndexedModel._check_alive_indexes(), [])
+
+    def test_check_nonexistent_field(self):
+        with patch.object(IndexedModel, '_safedelete_indexed_fields', ('missing',)):
+            errors = IndexedModel._check_alive_indexes()
+        self.assertEqual([error.id for error in errors], ['safedelete.E001'])
+
+    @patch('safedelete.models.FIELD_DB_INDEX', False)
+    def test_check_unindexed_fields(self):
+        errors = IndexedModel._check_alive_indexes()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].id, 'safedelete.W001')
+        self.assertEqual(errors[0].level, checks.WARNING)
+        self.assertIn('reference', errors[0].msg)
+
+    @patch('safedelete.models.FIELD_DB_INDEX', False)
+    def test_check_unindexed_relations(self):
+        errors = IndexedRelationsModel._check_alive_indexes()
+        self.assertEqual([error.id for error in errors], ['safedelete.W001'])
+        self.assertTrue(errors[0].msg.endswith(': parent.'))
+        self.assertIn('db_index=False', errors[0].hint)
+
+
+class AliveUniqueModel(SafeDeleteModel):
+    _safedelete_unique_fields = ('name', ('code', 'name'))
+
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=100)
+
+
+class UniqueChecksModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, unique=True)
+    code = models.CharField(max_length=100, unique=True)
+    team = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('name', 'team')
+
+
+class UniqueConstraintsTestCase(TestCase):
+
+    def test_alive_unique_constraints(self):
+        constraints = AliveUniqueModel._meta.constraints
+        self.assertEqual([constraint.fields for constraint in constraints], [('name',), ('code', 'name')])
+        for constraint in constraints:
+            self.assertIsInstance(constraint, models.UniqueConstraint)
+            self.assertEqual(constraint.condition, models.Q(**{FIELD_NAME + '__isnull': True}))
+            self.assertLessEqual(len(constraint.name), 30)
+
+    def test_migration(self):
+        # makemigrations creates the constraints without Meta.constraints.
+        names = [constraint.name for constraint in AliveUniqueModel._meta.constraints]
+        self.assertEqual(
+            [constraint.name for constraint in ModelState.from_model(AliveUniqueModel).options['constraints']],
+            names,
+        )
+        self.assertEqual(get_migration_options(AliveUniqueModel, 'constraints'), names)
+
+    def test_alive_unique(self):
+        AliveUniqueModel.objects.create(name='name', code='code').delete()
+        # A soft deleted object does not prevent creating an equal one.
+        AliveUniqueModel(name='name', code='code').full_clean()
+        AliveUniqueModel.objects.create(name='name', code='code')
+        with self.assertRaises(ValidationError):
+            AliveUniqueModel(name='name', code='code').full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AliveUniqueModel.objects.create(name='name', code='code')
+
+    def test_check_nonexistent_field(self):
+        with patch.object(AliveUniqueModel, '_safedelete_unique_fields', ('missing',)):
+            errors = AliveUniqueModel._check_alive_indexes()
+        self.assertEqual([error.id for error in errors], ['safedelete.E001'])
+
+    def test_unique_checks_single_query(self):
+        UniqueChecksModel.objects.create(name='name', code='code', team='team').delete()
+        instance = UniqueChecksModel(name='name', code='other', team='team')
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError) as context:
+                instance.validate_unique()
+        self.assertEqual(sorted(context.exception.message_dict), [NON_FIELD_ERRORS, 'name'])
+
+    def test_unique_checks_exclude_self(self):
+        instance = UniqueChecksModel.objects.create(name='name', code='code', team='team')
+        with self.assertNumQueries(1):
+            instance.validate_unique()
@@ -0,0 +1,338 @@
+import json
+import pickle
+from unittest.mock import Mock, patch
+
+from django.core.exceptions import FieldError
+from django.db import connection, models
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import instrumentation
+from ..config import (
+    FIELD_NAME,
+    HARD_DELETE,
+    HARD_DELETE_NOCASCADE,
+    SOFT_DELETE_CASCADE,
+)
+from ..models import SafeDeleteModel
+from ..operations import DeletionResult
+from ..signals import pre_softdelete
+
+
+class InstrumentedParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, unique=True)
+
+
+class InstrumentedChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    parent = models.ForeignKey(InstrumentedParent, on_delete=models.CASCADE)
+
+
+class InstrumentedOtherChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    parent = models.ForeignKey(InstrumentedParent, on_delete=models.CASCADE)
+
+
+class InstrumentedGrandChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    parent = models.ForeignKey(InstrumentedChild, on_delete=models.CASCADE)
+
+
+def receiver(sender, instance, **kwargs):
+    pass
+
+
+class InstrumentationTestCase(TestCase):
+
+    def setUp(self):
+        self.parent = InstrumentedParent.objects.create(name='parent')
+        children = [InstrumentedChild.objects.create(parent=self.parent) for i in range(2)]
+        InstrumentedOtherChild.objects.create(parent=self.parent)
+        InstrumentedGrandChild.objects.create(parent=children[0])
+
+    def test_disabled(self):
+        # The deletions are measured for their result, without being reported.
+        self.assertFalse(instrumentation.is_enabled())
+        with patch('safedelete.instrumentation.emit') as emit:
+            self.parent.delete()
+        emit.assert_not_called()
+        with patch('safedelete.instrumentation.measure') as measure:
+            InstrumentedParent.objects.update_or_create(name='parent')
+        measure.assert_not_called()
+
+    def test_delete(self):
+        with instrumentation.record() as recorder:
+            with CaptureQueriesContext(connection) as queries:
+                self.parent.delete()
+        operation, = recorder.operations
+        self.assertEqual(operation.name, 'delete')
+        self.assertEqual(operation.model, InstrumentedParent._meta.label)
+        self.assertEqual(operation.policy, SOFT_DELETE_CASCADE)
+        self.assertEqual(operation.using, 'default')
+        self.assertEqual(operation.queries, len(queries))
+        self.assertGreater(operation.elapsed, 0)
+        self.assertEqual(operation.rows, {
+            InstrumentedParent._meta.label: 1,
+            InstrumentedChild._meta.label: 2,
+            InstrumentedOtherChild._meta.label: 1,
+            InstrumentedGrandChild._meta.label: 1,
+        })
+        self.assertEqual(
+            sorted((relation.model, relation.depth, relation.rows) for relation in operation.relations),
+            [
+                (InstrumentedChild._meta.label, 1, 2),
+                (InstrumentedGrandChild._meta.label, 2, 1),
+                (InstrumentedOtherChild._meta.label, 1, 1),
+            ],
+        )
+        self.assertEqual(operation.depth, 2)
+        self.assertEqual(operation.fan_out, 2)
+        self.assertIsNone(operation.exception)
+
+    def test_undelete(self):
+        self.parent.delete()
+        with instrumentation.record() as recorder:
+            self.parent.undelete()
+        operation, = recorder.operations
+        self.assertEqual(operation.name, 'undelete')
+        self.assertEqual(sum(operation.rows.values()), 5)
+        self.assertEqual(sum(relation.rows for relation in operation.relations), 4)
+
+    @patch('safedelete.models.can_undelete_operations_cascade', return_value=False)
+    def test_undelete_cascade(self, can_undelete_operations_cascade):
+        self.parent.delete()
+        with instrumentation.record() as recorder:
+            self.parent.undelete()
+        operation, = recorder.operations
+        self.assertEqual(sum(operation.rows.values()), 5)
+        self.assertEqual(operation.depth, 2)
+        self.assertEqual(operation.fan_out, 2)
+
+    def test_queryset(self):
+        with instrumentation.record() as recorder:
+            InstrumentedParent.objects.all().delete()
+            InstrumentedParent.deleted_objects.all().undelete()
+        self.assertEqual([operation.name for operation in recorder.operations], ['queryset.delete', 'queryset.undelete'])
+        self.assertEqual([sum(operation.rows.values()) for operation in recorder.operations], [5, 5])
+
+    def test_nested_operations(self):
+        # The objects deleted one by one are part of the queryset operation.
+        pre_softdelete.connect(receiver, sender=InstrumentedParent)
+        self.addCleanup(pre_softdelete.disconnect, receiver, sender=InstrumentedParent)
+        with instrumentation.record() as recorder:
+            InstrumentedParent.objects.all().delete()
+        operation, = recorder.operations
+        self.assertEqual(operation.name, 'queryset.delete')
+        self.assertEqual(sum(operation.rows.values()), 5)
+
+    def test_update_or_create(self):
+        self.parent.delete(force_policy=HARD_DELETE)
+        with instrumentation.record() as recorder:
+            InstrumentedParent.objects.update_or_create(name='parent')
+            InstrumentedParent.objects.bulk_update_or_create(
+                [{'name': 'parent'}, {'name': 'other'}], unique_fields=['name'], update_fields=['name'],
+            )
+        self.assertEqual(
+            [(operation.name, operation.rows) for operation in recorder.operations],
+            [
+                ('update_or_create', {InstrumentedParent._meta.label: 1}),
+                ('bulk_update_or_create', {InstrumentedParent._meta.label: 2}),
+            ],
+        )
+
+    def test_exception(self):
+        with instrumentation.record() as recorder:
+            with self.assertRaises(FieldError):
+                InstrumentedParent.objects.update_or_create(name='parent', missing=1)
+        operation, = recorder.operations
+        self.assertIsInstance(operation.exception, FieldError)
+        self.assertEqual(operation.rows, {})
+
+    def test_handler(self):
+        handler = Mock()
+        instrumentation.add_handler(handler)
+        self.addCleanup(instrumentation.remove_handler, handler)
+        self.assertTrue(instrumentation.is_enabled())
+        self.parent.delete()
+        handler.assert_called_once()
+        self.assertEqual(handler.call_args[0][0].name, 'delete')
+
+    @override_settings(SAFE_DELETE_INSTRUMENTATION_HANDLERS=['safedelete.instrumentation.log_operation'])
+    def test_log_operation(self):
+        with self.assertLogs('safedelete.instrumentation', 'DEBUG') as logs:
+            self.parent.delete()
+        record, = logs.records
+        self.assertIn('delete %s: 5 rows' % InstrumentedParent._meta.label, record.getMessage())
+        self.assertEqual(record.safedelete_operation['depth'], 2)
+        self.assertEqual(len(record.safedelete_operation['relations']), 3)
+
+    def test_metrics_handler(self):
+        emit = Mock()
+        handler = instrumentation.MetricsHandler(emit)
+        instrumentation.add_handler(handler)
+        self.addCleanup(instrumentation.remove_handler, handler)
+        self.parent.delete()
+        metrics = {name: value for name, value, tags in (call[0] for call in emit.call_args_list)}
+        self.assertEqual(sorted(metrics), [
+            'safedelete.depth', 'safedelete.elapsed', 'safedelete.fan_out', 'safedelete.queries', 'safedelete.rows',
+        ])
+        self.assertEqual(metrics['safedelete.rows'], 5)
+        self.assertEqual(emit.call_args[0][2], {
+            'model': InstrumentedParent._meta.label, 'policy': SOFT_DELETE_CASCADE, 'operation': 'delete',
+        })
+
+    def test_failing_handler(self):
+        handler = Mock(side_effect=RuntimeError)
+        instrumentation.add_handler(handler)
+        self.addCleanup(instrumentation.remove_handler, handler)
+        with self.assertLogs('safedelete.instrumentation', 'ERROR'):
+            self.assertEqual(self.parent.delete()[0], 5)
+
+
+class SlowCascadeTestCase(TestCase):
+
+    def setUp(self):
+        self.parent = InstrumentedParent.objects.create(name='parent')
+        child = InstrumentedChild.objects.create(parent=self.parent)
+        InstrumentedGrandChild.objects.create(parent=child)
+
+    @override_settings(SAFE_DELETE_SLOW_CASCADE_ROWS=3)
+    def test_rows_threshold(self):
+        with self.assertLogs('safedelete.slow', 'WARNING') as logs:
+            self.parent.delete()
+        record, = logs.records
+        self.assertIn(
+            'Slow delete of %s %s with the SOFT_DELETE_CASCADE policy: 3 rows' % (
+                InstrumentedParent._meta.label, self.parent.pk,
+            ),
+            record.getMessage(),
+        )
+        operation = record.safedelete_operation
+        self.assertEqual(operation['pk'], self.parent.pk)
+        self.assertEqual(operation['policy_name'], 'SOFT_DELETE_CASCADE')
+        self.assertEqual(
+            [(relation['source'], relation['model'], relation['field'], relation['rows']) for relation in operation['relations']],
+            [
+                (InstrumentedParent._meta.label, InstrumentedChild._meta.label, 'parent', 1),
+                (InstrumentedChild._meta.label, InstrumentedGrandChild._meta.label, 'parent', 1),
+            ],
+        )
+
+    @override_settings(SAFE_DELETE_SLOW_CASCADE_ROWS=4)
+    def test_under_threshold(self):
+        with patch('safedelete.instrumentation.slow_logger') as slow_logger:
+            self.parent.delete()
+            self.parent.undelete()
+        slow_logger.warning.assert_not_called()
+
+    @override_settings(SAFE_DELETE_SLOW_CASCADE_MS=0)
+    def test_time_threshold(self):
+        with patch('safedelete.instrumentation.slow_logger') as slow_logger:
+            InstrumentedParent.objects.all().delete()
+            InstrumentedParent.deleted_objects.all().undelete()
+            # Only the deletions and undeletions are logged.
+            InstrumentedParent.objects.update_or_create(name='parent')
+        self.assertEqual(
+            [call[0][1:3] for call in slow_logger.warning.call_args_list],
+            [
+                ('queryset.delete', InstrumentedParent._meta.label),
+                ('queryset.undelete', InstrumentedParent._meta.label),
+            ],
+        )
+
+    def test_disabled(self):
+        self.assertFalse(instrumentation.is_enabled())
+        with override_settings(SAFE_DELETE_SLOW_CASCADE_MS=100):
+            self.assertTrue(instrumentation.is_enabled())
+        self.assertFalse(instrumentation.is_enabled())
+
+
+class DeletionResultTestCase(TestCase):
+
+    def setUp(self):
+        self.parent = InstrumentedParent.objects.create(name='parent')
+        self.children = [InstrumentedChild.objects.create(parent=self.parent) for i in range(3)]
+        self.grand_child = InstrumentedGrandChild.objects.create(parent=self.children[0])
+
+    def test_delete(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.parent.delete()
+        count, counter = result
+        self.assertEqual(count, 5)
+        self.assertEqual(result, (5, counter))
+        self.assertIsInstance(result, DeletionResult)
+        self.assertEqual(result.queries, len(queries))
+        self.assertGreater(result.elapsed, 0)
+        self.assertEqual(result.deleted, getattr(self.parent, FIELD_NAME))
+        self.assertIsNone(result.pks)
+
+    def test_undelete(self):
+        self.parent.delete()
+        result = InstrumentedParent.deleted_objects.all().undelete()
+        self.assertEqual(result[0], 5)
+        self.assertGreater(result.queries, 0)
+        self.assertIsNone(result.deleted)
+
+    def test_collect_pks(self):
+        with instrumentation.collect_pks():
+            result = InstrumentedParent.objects.all().delete()
+        self.assertEqual(result.pks, {
+            InstrumentedParent._meta.label: [self.parent.pk],
+            InstrumentedChild._meta.label: [child.pk for child in self.children],
+            InstrumentedGrandChild._meta.label: [self.grand_child.pk],
+        })
+        self.parent.refresh_from_db()
+        with instrumentation.collect_pks():
+            result = self.parent.undelete()
+        self.assertEqual(sorted(result.pks[InstrumentedChild._meta.label]), [child.pk for child in self.children])
+        self.assertEqual(result.pks[InstrumentedParent._meta.label], [self.parent.pk])
+
+    def test_collect_pks_per_object(self):
+        # The objects deleted one by one are part of the queryset result.
+        pre_softdelete.connect(receiver, sender=InstrumentedChild)
+        self.addCleanup(pre_softdelete.disconnect, receiver, sender=InstrumentedChild)
+        with instrumentation.collect_pks():
+            result = InstrumentedChild.objects.all().delete()
+        self.assertEqual(result[0], 4)
+        self.assertEqual(sorted(result.pks[InstrumentedChild._meta.label]), [child.pk for child in self.children])
+
+    def test_collect_pks_limit(self):
+        with instrumentation.collect_pks(limit=2):
+            result = self.parent.delete()
+        self.assertEqual(result[1][InstrumentedChild._meta.label], 3)
+        self.assertEqual(result.pks[InstrumentedChild._meta.label], [child.pk for child in self.children[:2]])
+
+    def test_collect_pks_hard_delete(self):
+        with instrumentation.collect_pks():
+            result = InstrumentedGrandChild.objects.all().delete(force_policy=HARD_DELETE)
+        self.assertEqual(result.pks, {InstrumentedGrandChild._meta.label: [self.grand_child.pk]})
+        self.assertIsNone(result.deleted)
+
+    def test_collect_pks_hard_delete_nocascade(self):
+        with instrumentation.collect_pks():
+            result = InstrumentedChild.objects.all().delete(force_policy=HARD_DELETE_NOCASCADE)
+        self.assertEqual(sorted(result.pks[InstrumentedChild._meta.label]), [child.pk for child in self.children])
+        self.assertEqual(result[1], {InstrumentedChild._meta.label: 3})
+
+    def test_as_dict(self):
+        with instrumentation.collect_pks():
+            result = self.grand_child.delete()
+        self.assertEqual(json.loads(json.dumps(result.as_dict())), {
+            'count': 1,
+            'counter': {InstrumentedGrandChild._meta.label: 1},
+            'operation_id': str(result.operation_id) if result.operation_id else None,
+            'deleted': result.deleted.isoformat(),
+            'elapsed': result.elapsed,
+            'queries': result.queries,
+            'pks': {InstrumentedGrandChild._meta.label: [self.grand_child.pk]},
+        })
+
+    def test_pickle(self):
+        result = pickle.loads(pickle.dumps(self.parent.delete()))
+        self.assertEqual(result[0], 5)
+        self.assertEqual(result.deleted, getattr(self.parent, FIELD_NAME))
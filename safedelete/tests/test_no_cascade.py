@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import connection, models
 from django.db.models.deletion import ProtectedError
+from django.test.utils import CaptureQueriesContext
 
+from ..cascade import split_dependents
 from ..config import HARD_DELETE_NOCASCADE
 from ..models import SafeDeleteModel
+from ..utils import can_hard_delete
 from .testcase import SafeDeleteTestCase
 
 
@@ -93,3 +96,52 @@ class NoCascadeTestCase(SafeDeleteTestCase):
             parent=self.instance
         )
         self.assertHardDelete(self.instance)
+
+    def test_can_hard_delete_queries(self):
+        CascadeChild.objects.create(parent=self.instance)
+        # The first relation with objects stops the check.
+        with self.assertNumQueries(1):
+            self.assertFalse(can_hard_delete(self.instance))
+        CascadeChild.objects.all().delete()
+        # NullChild, DefaultChild and SetChild objects are not deleted in cascade.
+        NullChild.objects.create(parent=self.instance)
+        with self.assertNumQueries(1):
+            self.assertTrue(can_hard_delete(self.instance))
+
+    def test_split_dependents(self):
+        instances = [self.instance, NoCascadeModel.objects.create(), NoCascadeModel.objects.create()]
+        CascadeChild.objects.create(parent=instances[1])
+        NullChild.objects.create(parent=instances[2])
+        free, dependent = split_dependents(NoCascadeModel.objects.order_by('pk'))
+        with self.assertNumQueries(2):
+            self.assertEqual(list(free), [instances[0], instances[2]])
+            self.assertEqual(list(dependent), [instances[1]])
+
+    def test_queryset_delete(self):
+        instances = [self.instance, NoCascadeModel.objects.create(), NoCascadeModel.objects.create()]
+        CascadeChild.objects.create(parent=instances[1])
+        null_child = NullChild.objects.create(parent=instances[2])
+
+        output = NoCascadeModel.objects.all().delete()
+        self.assertEqual(output, (3, {NoCascadeModel._meta.label: 3}))
+        self.assertEqual(list(NoCascadeModel.all_objects.all()), [instances[1]])
+        self.assertEqual(NoCascadeModel.deleted_objects.count(), 1)
+        null_child.refresh_from_db()
+        self.assertIsNone(null_child.parent)
+
+    def test_queryset_delete_queries(self):
+        for i in range(10):
+            CascadeChild.objects.create(parent=NoCascadeModel.objects.create())
+            NoCascadeModel.objects.create()
+        with CaptureQueriesContext(connection) as queries:
+            NoCascadeModel.objects.all().delete()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "safedelete_nocascademodel"')]), 1)
+        self.assertEqual(
+            len([query for query in queries if query['sql'].startswith('DELETE FROM "safedelete_nocascademodel"')]), 1
+        )
+        self.assertEqual(NoCascadeModel.all_objects.count(), 10)
+
+    def test_queryset_delete_protected(self):
+        ProtectedChild.objects.create(parent=self.instance)
+        with self.assertRaises(ProtectedError):
+            NoCascadeModel.objects.all().delete()
@@ -0,0 +1,106 @@
+from unittest import skipIf
+
+from django.db import models
+from django.test import TestCase
+
+from ..config import (
+    DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_NAME,
+    SOFT_DELETE_CASCADE,
+)
+from ..models import SafeDeleteModel
+from ..operations import undelete_operation
+
+
+class OperationParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, blank=True)
+
+
+class OperationChild(SafeDeleteModel):
+    parent = models.ForeignKey(OperationParent, on_delete=models.CASCADE)
+
+
+class OperationOptOutParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class OperationOptOutChild(SafeDeleteModel):
+    parent = models.ForeignKey(OperationOptOutParent, on_delete=models.CASCADE)
+    if DELETED_OPERATION_FIELD_NAME is not None:
+        vars()[DELETED_OPERATION_FIELD_NAME] = None
+
+
+@skipIf(DELETED_OPERATION_FIELD_NAME is None, 'Run with the safedelete.tests.settings_operation settings')
+class OperationTestCase(TestCase):
+
+    def setUp(self):
+        self.parents = [OperationParent.objects.create(name=str(i)) for i in range(2)]
+        self.children = [OperationChild.objects.create(parent=parent) for parent in self.parents for i in range(2)]
+
+    def test_delete_operation_id(self):
+        output = self.parents[0].delete()
+        self.assertEqual(output, (3, {OperationParent._meta.label: 1, OperationChild._meta.label: 2}))
+        self.assertIsNotNone(output.operation_id)
+        self.assertEqual(OperationChild.deleted_objects.filter(**{
+            DELETED_OPERATION_FIELD_NAME: output.operation_id,
+            FIELD_NAME: output.deleted,
+        }).count(), 2)
+
+        self.parents[0].undelete()
+        self.assertEqual(OperationChild.all_objects.filter(**{DELETED_OPERATION_FIELD_NAME: output.operation_id}).count(), 0)
+
+    def test_queryset_delete_operation_id(self):
+        output = OperationParent.objects.all().delete()
+        self.assertEqual(output, (6, {OperationParent._meta.label: 2, OperationChild._meta.label: 4}))
+        self.assertEqual(OperationParent.deleted_objects.filter(**{DELETED_OPERATION_FIELD_NAME: output.operation_id}).count(), 2)
+        self.assertEqual(OperationChild.deleted_objects.filter(**{DELETED_OPERATION_FIELD_NAME: output.operation_id}).count(), 4)
+
+    def test_undelete_operation_queries(self):
+        self.parents[0].delete()
+        # The check of the operation roots, the save of the object and an UPDATE per related model.
+        with self.assertNumQueries(3):
+            output = self.parents[0].undelete()
+        self.assertEqual(output, (3, {OperationParent._meta.label: 1, OperationChild._meta.label: 2}))
+        self.assertEqual(OperationChild.objects.count(), 4)
+
+    def test_undelete_keeps_other_operations(self):
+        self.children[0].delete()
+        self.parents[0].delete()
+        output = self.parents[0].undelete()
+        self.assertEqual(output, (2, {OperationParent._meta.label: 1, OperationChild._meta.label: 1}))
+        self.assertEqual(OperationChild.deleted_objects.get(), self.children[0])
+
+    def test_undelete_part_of_operation(self):
+        # The operation deleted both parents, only the children of the undeleted one are undeleted.
+        OperationParent.objects.all().delete()
+        self.parents[0].refresh_from_db()
+        output = self.parents[0].undelete()
+        self.assertEqual(output, (3, {OperationParent._meta.label: 1, OperationChild._meta.label: 2}))
+        self.assertEqual(set(OperationChild.deleted_objects.values_list('parent', flat=True)), {self.parents[1].pk})
+
+    def test_undelete_queryset_operations(self):
+        OperationParent.objects.filter(pk=self.parents[0].pk).delete()
+        OperationParent.objects.filter(pk=self.parents[1].pk).delete()
+        output = OperationParent.deleted_objects.all().undelete()
+        self.assertEqual(output, (6, {OperationParent._meta.label: 2, OperationChild._meta.label: 4}))
+        self.assertEqual(OperationChild.all_objects.filter(**{DELETED_BY_CASCADE_FIELD_NAME: True}).count(), 0)
+
+    def test_undelete_operation(self):
+        output = self.parents[0].delete()
+        self.assertEqual(undelete_operation(output.operation_id), output)
+        self.assertEqual(OperationParent.objects.count(), 2)
+        self.assertEqual(OperationChild.objects.count(), 4)
+
+    def test_opt_out(self):
+        parent = OperationOptOutParent.objects.create()
+        OperationOptOutChild.objects.create(parent=parent)
+        parent.delete()
+        self.assertEqual(OperationOptOutChild.objects.count(), 0)
+
+        # The children are found through the relation instead.
+        output = parent.undelete()
+        self.assertEqual(output, (2, {OperationOptOutParent._meta.label: 1, OperationOptOutChild._meta.label: 1}))
+        self.assertEqual(OperationOptOutChild.objects.count(), 1)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..config import FIELD_NAME
+from ..models import SafeDeleteModel
+from ..purge import get_retention_models, purge, purge_expired
+
+
+class PurgeModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, blank=True)
+
+
+class PurgeChild(models.Model):
+    parent = models.ForeignKey(PurgeModel, on_delete=models.CASCADE)
+
+
+class RetentionParent(SafeDeleteModel):
+    _safedelete_retention = timedelta(days=30)
+
+
+class RetentionChild(SafeDeleteModel):
+    _safedelete_retention = timedelta(days=7)
+
+    parent = models.ForeignKey(RetentionParent, on_delete=models.CASCADE)
+
+
+class PurgeTestCase(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.instances = [PurgeModel.objects.create(name=str(i)) for i in range(6)]
+        PurgeChild.objects.create(parent=self.instances[0])
+        # 0 to 3 are deleted 10 days ago, 4 yesterday and 5 is not deleted
+        PurgeModel.objects.filter(pk__in=[instance.pk for instance in self.instances[:4]]).update(**{
+            FIELD_NAME: self.now - timedelta(days=10),
+        })
+        PurgeModel.objects.filter(pk=self.instances[4].pk).update(**{FIELD_NAME: self.now - timedelta(days=1)})
+
+    def test_purge(self):
+        output = purge(PurgeModel, self.now - timedelta(days=5))
+        self.assertEqual(output, (5, {PurgeModel._meta.label: 4, PurgeChild._meta.label: 1}))
+        self.assertEqual(
+            list(PurgeModel.all_objects.order_by('pk')),
+            self.instances[4:],
+        )
+
+    def test_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = purge(PurgeModel, self.now - timedelta(days=5), batch_size=2)
+        self.assertEqual(output, (5, {PurgeModel._meta.label: 4, PurgeChild._meta.label: 1}))
+        # Two full batches and an empty one
+        self.assertEqual(len([query for query in queries if query['sql'].endswith('LIMIT 2')]), 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('DELETE FROM "safedelete_purgemodel"')]), 2)
+
+    @patch('safedelete.purge.time.sleep')
+    def test_sleep(self, sleep):
+        purge(PurgeModel, self.now, batch_size=2, sleep=0.5)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(PurgeModel.all_objects.count(), 1)
+
+    def test_max_runtime(self):
+        self.assertEqual(purge(PurgeModel, self.now, max_runtime=0), (0, {}))
+        self.assertEqual(PurgeModel.all_objects.count(), 6)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('safedelete_purge', 'safedelete.PurgeModel', days=5, batch_size=3, stdout=out)
+        self.assertEqual(out.getvalue(), 'Purged 5 objects of safedelete.PurgeModel.\n')
+        self.assertEqual(PurgeModel.all_objects.count(), 2)
+
+    def test_command_not_safedelete_model(self):
+        with self.assertRaises(CommandError):
+            call_command('safedelete_purge', 'safedelete.PurgeChild', days=5)
+
+
+class RetentionTestCase(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        self.parents = [RetentionParent.objects.create() for i in range(2)]
+        self.children = [RetentionChild.objects.create(parent=parent) for parent in self.parents]
+        RetentionParent.objects.filter(pk=self.parents[0].pk).update(**{FIELD_NAME: now - timedelta(days=40)})
+        RetentionChild.objects.filter(pk=self.children[1].pk).update(**{FIELD_NAME: now - timedelta(days=10)})
+
+    def test_retention_models(self):
+        self.assertEqual(get_retention_models(), [RetentionChild, RetentionParent])
+
+    def test_purge_expired(self):
+        output = purge_expired()
+        self.assertEqual(output, (3, {RetentionParent._meta.label: 1, RetentionChild._meta.label: 2}))
+        self.assertEqual(list(RetentionParent.all_objects.all()), [self.parents[1]])
+        self.assertEqual(RetentionChild.all_objects.count(), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('safedelete_purge', stdout=out)
+        self.assertEqual(
+            out.getvalue(),
+            'Purged 1 objects of safedelete.RetentionChild.\nPurged 2 objects of safedelete.RetentionParent.\n',
+        )
+
+    def test_command_without_retention(self):
+        with self.assertRaises(CommandError):
+            call_command('safedelete_purge', 'safedelete.PurgeModel')
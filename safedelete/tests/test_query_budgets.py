@@ -0,0 +1,243 @@
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import models
+from django.test import RequestFactory
+
+from ..admin import SafeDeleteAdmin
+from ..config import (
+    HARD_DELETE,
+    HARD_DELETE_NOCASCADE,
+    NO_DELETE,
+    SOFT_DELETE,
+    SOFT_DELETE_CASCADE,
+)
+from ..models import SafeDeleteModel
+from ..signals import post_undelete, pre_softdelete
+from .testcase import QueryBudgetTestCase
+
+
+class BudgetParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, unique=True)
+
+
+class BudgetChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    parent = models.ForeignKey(BudgetParent, on_delete=models.CASCADE)
+
+
+class BudgetNoCascadeParent(SafeDeleteModel):
+    _safedelete_policy = HARD_DELETE_NOCASCADE
+
+
+class BudgetNoCascadeChild(SafeDeleteModel):
+    parent = models.ForeignKey(BudgetNoCascadeParent, on_delete=models.CASCADE)
+
+
+admin.site.register(BudgetParent, SafeDeleteAdmin)
+
+
+def create_parent(size, name='parent'):
+    """ Create a parent with "size" children. """
+    parent = BudgetParent.objects.create(name=name)
+    BudgetChild.objects.bulk_create(BudgetChild(parent=parent) for i in range(size))
+    return parent
+
+
+def create_parents(size):
+    """ Create "size" parents with a child each. """
+    for i in range(size):
+        create_parent(1, name='parent-%d' % i)
+
+
+def create_deleted_parent(size):
+    parent = create_parent(size)
+    parent.delete()
+    return parent
+
+
+def create_deleted_parents(size):
+    create_parents(size)
+    BudgetParent.objects.all().delete()
+
+
+def create_nocascade_parents(size):
+    """ Create "size" parents with a child and "size" parents without. """
+    parents = BudgetNoCascadeParent.objects.bulk_create(BudgetNoCascadeParent() for i in range(size * 2))
+    BudgetNoCascadeChild.objects.bulk_create(BudgetNoCascadeChild(parent=parent) for parent in parents[:size])
+
+
+def receiver(sender, instance, **kwargs):
+    pass
+
+
+class ModelQueryBudgetTestCase(QueryBudgetTestCase):
+    """ The sizes are the numbers of objects related to the deleted or undeleted object. """
+
+    def test_delete_hard(self):
+        self.assertQueryBudget(
+            'model.delete.hard', create_parent, lambda parent: parent.delete(force_policy=HARD_DELETE),
+        )
+
+    def test_delete_soft(self):
+        self.assertQueryBudget(
+            'model.delete.soft', create_parent, lambda parent: parent.delete(force_policy=SOFT_DELETE),
+        )
+
+    def test_delete_soft_cascade(self):
+        self.assertQueryBudget('model.delete.soft_cascade', create_parent, lambda parent: parent.delete())
+
+    def test_delete_hard_nocascade(self):
+        def setup(size):
+            parent = BudgetNoCascadeParent.objects.create()
+            BudgetNoCascadeChild.objects.bulk_create(BudgetNoCascadeChild(parent=parent) for i in range(size))
+            return parent
+        self.assertQueryBudget('model.delete.hard_nocascade', setup, lambda parent: parent.delete())
+
+    def test_delete_no_delete(self):
+        self.assertQueryBudget(
+            'model.delete.no_delete', create_parent, lambda parent: parent.delete(force_policy=NO_DELETE),
+        )
+
+    def test_undelete_soft(self):
+        def setup(size):
+            parent = create_parent(size)
+            parent.delete(force_policy=SOFT_DELETE)
+            return parent
+        self.assertQueryBudget(
+            'model.undelete.soft', setup, lambda parent: parent.undelete(force_policy=SOFT_DELETE),
+        )
+
+    def test_undelete_soft_cascade(self):
+        self.assertQueryBudget('model.undelete.soft_cascade', create_deleted_parent, lambda parent: parent.undelete())
+
+    def test_undelete_soft_cascade_receivers(self):
+        # The related objects are undeleted one by one, without collecting their own related objects.
+        post_undelete.connect(receiver, sender=BudgetChild)
+        self.addCleanup(post_undelete.disconnect, receiver, sender=BudgetChild)
+        self.assertQueryBudget(
+            'model.undelete.soft_cascade.receivers', create_deleted_parent, lambda parent: parent.undelete(),
+        )
+
+
+class QuerysetQueryBudgetTestCase(QueryBudgetTestCase):
+    """ The sizes are the numbers of objects of the queryset, with a related object each. """
+
+    def test_delete_hard(self):
+        self.assertQueryBudget(
+            'queryset.delete.hard', create_parents,
+            lambda data: BudgetParent.objects.all().delete(force_policy=HARD_DELETE),
+        )
+
+    def test_delete_soft(self):
+        self.assertQueryBudget(
+            'queryset.delete.soft', create_parents,
+            lambda data: BudgetParent.objects.all().delete(force_policy=SOFT_DELETE),
+        )
+
+    def test_delete_soft_cascade(self):
+        self.assertQueryBudget(
+            'queryset.delete.soft_cascade', create_parents, lambda data: BudgetParent.objects.all().delete(),
+        )
+
+    def test_delete_hard_nocascade(self):
+        self.assertQueryBudget(
+            'queryset.delete.hard_nocascade', create_nocascade_parents,
+            lambda data: BudgetNoCascadeParent.objects.all().delete(),
+        )
+
+    def test_delete_hard_nocascade_receivers(self):
+        # The objects are deleted one by one, the objects with dependents are found with a single query.
+        pre_softdelete.connect(receiver, sender=BudgetNoCascadeParent)
+        self.addCleanup(pre_softdelete.disconnect, receiver, sender=BudgetNoCascadeParent)
+        self.assertQueryBudget(
+            'queryset.delete.hard_nocascade.receivers', create_nocascade_parents,
+            lambda data: BudgetNoCascadeParent.objects.all().delete(),
+        )
+
+    def test_undelete_soft(self):
+        def setup(size):
+            create_parents(size)
+            BudgetParent.objects.all().delete(force_policy=SOFT_DELETE)
+        self.assertQueryBudget(
+            'queryset.undelete.soft', setup,
+            lambda data: BudgetParent.deleted_objects.all().undelete(force_policy=SOFT_DELETE),
+        )
+
+    def test_undelete_soft_cascade(self):
+        self.assertQueryBudget(
+            'queryset.undelete.soft_cascade', create_deleted_parents,
+            lambda data: BudgetParent.deleted_objects.all().undelete(),
+        )
+
+
+class UpdateOrCreateQueryBudgetTestCase(QueryBudgetTestCase):
+    """ The sizes are the numbers of other objects in the table. """
+
+    def setup(self, size):
+        create_parents(size)
+        create_deleted_parent(0)
+
+    def test_create(self):
+        self.assertQueryBudget(
+            'update_or_create.create', self.setup,
+            lambda data: BudgetParent.objects.update_or_create(name='new'),
+        )
+
+    def test_update(self):
+        self.assertQueryBudget(
+            'update_or_create.update', self.setup,
+            lambda data: BudgetParent.objects.update_or_create(name='parent-0', defaults={'name': 'parent-0'}),
+        )
+
+    def test_revive(self):
+        self.assertQueryBudget(
+            'update_or_create.revive', self.setup,
+            lambda data: BudgetParent.objects.update_or_create(name='parent'),
+        )
+
+
+class AdminQueryBudgetTestCase(QueryBudgetTestCase):
+    """ The sizes are the numbers of selected objects, with a related object each. """
+
+    def setUp(self):
+        self.modeladmin = admin.site._registry[BudgetParent]
+        self.user = User.objects.create_superuser('super', 'email@domain.com', 'secret')
+
+    def run_action(self, action, post):
+        request = RequestFactory().post('/', {'post': 'yes'} if post else {})
+        request.user = self.user
+        request._messages = CookieStorage(request)
+        # The content types are cached, start without them so that the sizes run the same queries.
+        ContentType.objects.clear_cache()
+        response = getattr(self.modeladmin, action)(request, BudgetParent.all_objects.all())
+        if response is not None:
+            response.render()
+
+    def test_undelete_selected_confirm(self):
+        self.assertQueryBudget(
+            'admin.undelete_selected.confirm', create_deleted_parents,
+            lambda data: self.run_action('undelete_selected', post=False),
+        )
+
+    def test_undelete_selected_post(self):
+        self.assertQueryBudget(
+            'admin.undelete_selected.post', create_deleted_parents,
+            lambda data: self.run_action('undelete_selected', post=True),
+        )
+
+    def test_hard_delete_soft_deleted_confirm(self):
+        self.assertQueryBudget(
+            'admin.hard_delete_soft_deleted.confirm', create_deleted_parents,
+            lambda data: self.run_action('hard_delete_soft_deleted', post=False),
+        )
+
+    def test_hard_delete_soft_deleted_post(self):
+        self.assertQueryBudget(
+            'admin.hard_delete_soft_deleted.post', create_deleted_parents,
+            lambda data: self.run_action('hard_delete_soft_deleted', post=True),
+        )
@@ -0,0 +1,66 @@
+import gc
+import weakref
+
+from django.db import models
+from django.test import TestCase
+from django.test.utils import isolate_apps
+
+from .. import registry
+from ..models import SafeDeleteModel
+from .models import Article, Author
+
+
+class RegistryModel(SafeDeleteModel):
+    name = models.CharField(max_length=100, unique=True)
+    code = models.CharField(max_length=100)
+    team = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('code', 'team')
+
+
+class RegistryTestCase(TestCase):
+
+    def test_populated(self):
+        self.assertIn(Author, registry._plans)
+
+    def test_is_safedelete_cls(self):
+        self.assertTrue(registry.is_safedelete_cls(RegistryModel))
+        self.assertFalse(registry.is_safedelete_cls(SafeDeleteModel))
+        self.assertFalse(registry.is_safedelete_cls(models.Model))
+
+    def test_is_safedelete_cls_weak(self):
+        # The historical models of the migrations are checked too, they must not be kept alive.
+        cls = type('Temporary', (), {})
+        registry.is_safedelete_cls(cls)
+        reference = weakref.ref(cls)
+        del cls
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_plan(self):
+        plan = registry.get_plan(Author)
+        self.assertTrue(plan.is_safedelete)
+        self.assertIn((Article._meta.get_field('author'), Article, models.CASCADE), plan.cascade_relations)
+        self.assertIn(Article, plan.cascade_models)
+        self.assertIs(registry.get_plan(Author), plan)
+        # Computed once per plan.
+        self.assertIs(plan.cascade_relations, plan.cascade_relations)
+        self.assertIs(plan.cascade_models, plan.cascade_models)
+
+    def test_unique_sets(self):
+        self.assertEqual(
+            set(registry.get_plan(RegistryModel).unique_sets),
+            {frozenset(['name']), frozenset(['code', 'team'])},
+        )
+        self.assertTrue(RegistryModel.has_unique_fields())
+        self.assertFalse(Author.has_unique_fields())
+
+    @isolate_apps('safedelete')
+    def test_cleared_on_model_definition(self):
+        plan = registry.get_plan(Author)
+
+        class RegistryChild(models.Model):
+            pass
+
+        self.assertIsNot(registry.get_plan(Author), plan)
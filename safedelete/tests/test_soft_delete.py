@@ -4,12 +4,15 @@ except ImportError:
     import mock
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_save
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
-from ..config import SOFT_DELETE_CASCADE
+from ..config import FIELD_NAME, SOFT_DELETE_CASCADE
 from ..models import SafeDeleteModel
-from .testcase import SafeDeleteForceTestCase
+from ..signals import pre_softdelete
+from .testcase import ReadReplicaRouter, SafeDeleteForceTestCase
 
 
 class SoftDeleteModel(SafeDeleteModel):
@@ -34,6 +37,27 @@ class UniqueSoftDeleteModel(SafeDeleteModel):
     )
 
 
+class StampedSoftDeleteModel(SafeDeleteModel):
+    name = models.CharField(max_length=100)
+    deleted_reason = models.CharField(max_length=100, blank=True)
+
+
+class OverriddenSoftDeleteModel(SafeDeleteModel):
+    name = models.CharField(max_length=100)
+
+    def soft_delete_policy_action(self, **kwargs):
+        self.name = 'deleted'
+        return super().soft_delete_policy_action(**kwargs)
+
+    def undelete(self, *args, **kwargs):
+        self.name = 'undeleted'
+        return super().undelete(*args, **kwargs)
+
+
+def stamp_deleted_reason(sender, instance, **kwargs):
+    instance.deleted_reason = 'gdpr'
+
+
 class UniqueConstraintSoftDeleteModel(SafeDeleteModel):
 
     name = models.CharField(max_length=100)
@@ -172,6 +196,99 @@ class SoftDeleteTestCase(SafeDeleteForceTestCase):
         self.assertEqual(obj.team, 'avengers')
         self.assertFalse(created)
 
+    def test_softdelete_updates_deletion_fields(self):
+        instance = UniqueSoftDeleteModel.objects.create(name='minimal')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(instance.delete(), (1, {UniqueSoftDeleteModel._meta.label: 1}))
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+        self.assertNotIn('"name"', queries[0]['sql'])
+        self.assertIn('IS NULL', queries[0]['sql'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(instance.undelete(), (1, {UniqueSoftDeleteModel._meta.label: 1}))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"name"', queries[0]['sql'])
+        self.assertEqual(UniqueSoftDeleteModel.objects.count(), 1)
+
+    def test_concurrent_softdelete(self):
+        instance = UniqueSoftDeleteModel.objects.create(name='concurrent')
+        other = UniqueSoftDeleteModel.objects.get(pk=instance.pk)
+        instance.delete()
+        # The object is already deleted, the other instance gets its deletion state.
+        self.assertEqual(other.delete(), (0, {}))
+        self.assertEqual(getattr(other, FIELD_NAME), getattr(instance, FIELD_NAME))
+
+        other.undelete()
+        self.assertEqual(instance.undelete(), (0, {}))
+        self.assertIsNone(getattr(instance, FIELD_NAME))
+
+    def test_softdelete_with_save_receiver(self):
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=UniqueSoftDeleteModel)
+        try:
+            UniqueSoftDeleteModel.objects.create(name='saved').delete()
+        finally:
+            post_save.disconnect(receiver, sender=UniqueSoftDeleteModel)
+        self.assertEqual(receiver.call_count, 2)
+
+    def test_softdelete_saves_overridden_changes(self):
+        instance = OverriddenSoftDeleteModel.objects.create(name='a')
+        instance.delete()
+        self.assertEqual(OverriddenSoftDeleteModel.all_objects.get().name, 'deleted')
+        instance.undelete()
+        self.assertEqual(OverriddenSoftDeleteModel.objects.get().name, 'undeleted')
+
+    def test_softdelete_saves_receiver_changes(self):
+        pre_softdelete.connect(stamp_deleted_reason, sender=StampedSoftDeleteModel)
+        self.addCleanup(pre_softdelete.disconnect, stamp_deleted_reason, sender=StampedSoftDeleteModel)
+        StampedSoftDeleteModel.objects.create(name='a').delete()
+        self.assertEqual(StampedSoftDeleteModel.all_objects.get().deleted_reason, 'gdpr')
+
+    def test_update_or_create_several_deleted(self):
+        # The lookup is not unique, the first soft deleted object is revived.
+        first = UniqueConstraintSoftDeleteModel.objects.create(name='thor', team='avengers')
+        second = UniqueConstraintSoftDeleteModel.objects.create(name='thor', team='asgard')
+        first.delete()
+        second.delete()
+        obj, created = UniqueConstraintSoftDeleteModel.objects.update_or_create(name='thor')
+        self.assertFalse(created)
+        self.assertEqual(obj.pk, first.pk)
+        self.assertEqual(list(UniqueConstraintSoftDeleteModel.objects.all()), [first])
+
+        # The alive object is updated rather than a deleted one.
+        obj, created = UniqueConstraintSoftDeleteModel.objects.update_or_create(name='thor', defaults={'team': 'shield'})
+        self.assertEqual(obj.pk, first.pk)
+        self.assertEqual(UniqueConstraintSoftDeleteModel.deleted_objects.get(), second)
+
+    def test_update_or_create_revives_with_one_update(self):
+        obj = UniqueConstraintSoftDeleteModel.objects.create(name='thor', team='avengers')
+        obj.delete()
+        with CaptureQueriesContext(connection) as queries:
+            revived, created = UniqueConstraintSoftDeleteModel.objects.update_or_create(
+                name='thor', defaults={'team': 'asgard'},
+            )
+        self.assertFalse(created)
+        self.assertEqual(revived.pk, obj.pk)
+        statements = [query['sql'].split()[0] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(statements, ['SELECT', 'UPDATE'])
+        self.assertEqual(UniqueConstraintSoftDeleteModel.objects.get().team, 'asgard')
+
+    @override_settings(DATABASE_ROUTERS=[ReadReplicaRouter()])
+    def test_update_or_create_write_database(self):
+        obj = UniqueSoftDeleteModel.objects.create(name='thor')
+        obj.delete()
+        revived, created = UniqueSoftDeleteModel.objects.update_or_create(name='thor')
+        self.assertFalse(created)
+        self.assertEqual(revived._state.db, 'default')
+        self.assertEqual(UniqueSoftDeleteModel.objects.using('default').get().pk, obj.pk)
+
+    def test_update_or_create_create_defaults(self):
+        obj, created = UniqueSoftDeleteModel.objects.update_or_create(name='thor', create_defaults={})
+        self.assertTrue(created)
+        obj, created = UniqueSoftDeleteModel.objects.update_or_create(name='thor', create_defaults={})
+        self.assertFalse(created)
+
     def test_update_or_create_with_unique_together_constraint(self):
         # Create and soft-delete object
         obj, created = UniqueTogetherSoftDeleteModel.objects.update_or_create(name='thor', team='avengers')
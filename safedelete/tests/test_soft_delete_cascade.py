@@ -4,15 +4,18 @@ from django.contrib.contenttypes.fields import (
 )
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import FieldError
-from django.db import models
+from django.db import connection, models, transaction
 from django.db.models import ProtectedError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from safedelete import SOFT_DELETE, SOFT_DELETE_CASCADE
-from safedelete.config import DELETED_BY_CASCADE_FIELD_NAME
+from safedelete import SOFT_DELETE, SOFT_DELETE_CASCADE, registry
+from safedelete.cascade import preview_cascade, split_dependents
+from safedelete.config import DELETED_BY_CASCADE_FIELD_NAME, FIELD_NAME
 from safedelete.models import SafeDeleteModel
 from safedelete.signals import pre_softdelete
 from safedelete.tests.models import Article, Author, Category
+from safedelete.utils import can_hard_delete
 
 try:
     from unittest.mock import patch
@@ -86,6 +89,49 @@ class ParentSelf(SafeDeleteModel):
     )
 
 
+class InheritedParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class InheritedChild(InheritedParent):
+    pass
+
+
+class InheritedParentReference(SafeDeleteModel):
+    parent = models.ForeignKey(InheritedParent, on_delete=models.CASCADE)
+
+
+class RestrictArtist(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class RestrictAlbum(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+    artist = models.ForeignKey(RestrictArtist, on_delete=models.CASCADE)
+
+
+class RestrictSong(SafeDeleteModel):
+    artist = models.ForeignKey(RestrictArtist, on_delete=models.CASCADE)
+    album = models.ForeignKey(RestrictAlbum, on_delete=models.RESTRICT)
+
+
+def custom_on_delete(collector, field, sub_objs, using):
+    # Uses other methods of the collector than the SET() handlers.
+    models.CASCADE(collector, field, sub_objs, using)
+
+
+class CustomOnDeleteParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class CustomOnDeleteChild(SafeDeleteModel):
+    parent = models.ForeignKey(CustomOnDeleteParent, on_delete=custom_on_delete)
+
+
+def receiver(sender, instance, **kwargs):
+    pass
+
+
 def pre_softdelete_article(sender, instance, *args, **kwargs):
     # Related objects should not be SET before instance was deleted
     assert instance.pressnormalmodel_set.count() == 1
@@ -93,6 +139,8 @@ def pre_softdelete_article(sender, instance, *args, **kwargs):
 
 class SimpleTest(TestCase):
     def setUp(self):
+        # The deletion plans follow the on_delete replaced by the tests.
+        self.addCleanup(registry.clear)
 
         self.authors = (
             Author.objects.create(),
@@ -159,6 +207,59 @@ class SimpleTest(TestCase):
         }
         self.assertEqual(output, (12, expected_output_dict))
 
+    def count_cascade_queries(self, delete):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                delete()
+                transaction.set_rollback(True)
+        return len(queries)
+
+    def test_soft_delete_cascade_queries(self):
+        # The related objects are soft deleted with an UPDATE per relation.
+        def delete():
+            self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+
+        num_queries = self.count_cascade_queries(delete)
+        for index in range(20):
+            Image.objects.create(index=index, section=self.sections[0])
+            Table.objects.create(index=index, section=self.sections[1])
+        self.assertEqual(self.count_cascade_queries(delete), num_queries)
+
+    def test_soft_delete_cascade_shared_timestamp(self):
+        self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+        self.authors[2].refresh_from_db()
+        deleted = getattr(self.authors[2], FIELD_NAME)
+        self.assertEqual(Article.all_objects.filter(**{FIELD_NAME: deleted}).count(), 1)
+        self.assertEqual(Section.all_objects.filter(**{FIELD_NAME: deleted}).count(), 3)
+        self.assertEqual(Table.all_objects.filter(**{FIELD_NAME: deleted}).count(), 3)
+
+    def test_soft_delete_cascade_queryset(self):
+        output = Author.objects.filter(pk__in=[self.authors[0].pk, self.authors[2].pk]).delete(
+            force_policy=SOFT_DELETE_CASCADE
+        )
+
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Article.objects.count(), 2)
+        self.assertEqual(Section.deleted_objects.filter(**{DELETED_BY_CASCADE_FIELD_NAME: True}).count(), 3)
+        self.assertEqual(Author.deleted_objects.filter(**{DELETED_BY_CASCADE_FIELD_NAME: True}).count(), 0)
+        expected_output_dict = {
+            'safedelete.Article': 1,
+            'safedelete.Press': 1,
+            'safedelete.Section': 3,
+            'safedelete.Table': 3,
+            'safedelete.Image': 3,
+            'safedelete.Author': 2,
+        }
+        self.assertEqual(output, (13, expected_output_dict))
+
+    @patch.object(PressNormalModel.article.field.remote_field, 'on_delete', models.SET_NULL)
+    def test_soft_delete_cascade_queryset_with_set_null(self):
+        registry.clear()
+        PressNormalModel.objects.create(name='press 0', article=self.articles[2])
+        Author.objects.filter(pk=self.authors[2].pk).delete(force_policy=SOFT_DELETE_CASCADE)
+
+        self.assertEqual(PressNormalModel.objects.first().article, None)
+
     def test_soft_delete_cascade_with_normal_model(self):
         PressNormalModel.objects.create(name='press 0', article=self.articles[2])
         pre_softdelete.connect(pre_softdelete_article, Article)
@@ -176,6 +277,7 @@ class SimpleTest(TestCase):
     def test_soft_delete_cascade_with_set_null(self):
         PressNormalModel.article.field.null = True
         PressNormalModel.article.field.remote_field.on_delete = models.SET_NULL
+        registry.clear()
         PressNormalModel.objects.create(name='press 0', article=self.articles[2])
         pre_softdelete.connect(pre_softdelete_article, Article)
         self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
@@ -186,6 +288,7 @@ class SimpleTest(TestCase):
     def test_soft_delete_cascade_with_set_default(self):
         PressNormalModel.article.field.default = self.articles[1]
         PressNormalModel.article.field.remote_field.on_delete = models.SET_DEFAULT
+        registry.clear()
         PressNormalModel.objects.create(name='press 0', article=self.articles[2])
         pre_softdelete.connect(pre_softdelete_article, Article)
         self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
@@ -195,6 +298,7 @@ class SimpleTest(TestCase):
 
     def test_soft_delete_cascade_with_set(self):
         PressNormalModel.article.field.remote_field.on_delete = models.SET(self.articles[0])
+        registry.clear()
         PressNormalModel.objects.create(name='press 0', article=self.articles[2])
         pre_softdelete.connect(pre_softdelete_article, Article)
         self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
@@ -204,6 +308,7 @@ class SimpleTest(TestCase):
 
     def test_soft_delete_cascade_with_protect(self):
         PressNormalModel.article.field.remote_field.on_delete = models.PROTECT
+        registry.clear()
         PressNormalModel.objects.create(name='press 0', article=self.articles[2])
         with self.assertRaises(ProtectedError):
             self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
@@ -269,6 +374,39 @@ class SimpleTest(TestCase):
         self.assertEqual(Image.objects.count(), 2)
         self.assertEqual(self.sections[1], Section.deleted_objects.first())
 
+    def test_undelete_with_soft_delete_cascade_policy_queries(self):
+        # The objects deleted by cascade are undeleted with an UPDATE per relation.
+        def undelete():
+            Author.deleted_objects.get().undelete(force_policy=SOFT_DELETE_CASCADE)
+
+        self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+        num_queries = self.count_cascade_queries(undelete)
+        self.authors[2].undelete(force_policy=SOFT_DELETE_CASCADE)
+        for index in range(20):
+            Image.objects.create(index=index, section=self.sections[0])
+        self.authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+        self.assertEqual(self.count_cascade_queries(undelete), num_queries)
+
+    def test_undelete_queryset_with_soft_delete_cascade_policy(self):
+        self.sections[1].delete(force_policy=SOFT_DELETE_CASCADE)
+        Author.objects.filter(pk__in=[self.authors[0].pk, self.authors[2].pk]).delete(
+            force_policy=SOFT_DELETE_CASCADE
+        )
+        output = Author.deleted_objects.all().undelete(force_policy=SOFT_DELETE_CASCADE)
+
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertEqual(Article.objects.count(), 3)
+        self.assertEqual(Section.objects.count(), 2)
+        self.assertEqual(self.sections[1], Section.deleted_objects.get())
+        expected_output_dict = {
+            'safedelete.Article': 1,
+            'safedelete.Press': 1,
+            'safedelete.Section': 2,
+            'safedelete.Image': 2,
+            'safedelete.Author': 2,
+        }
+        self.assertEqual(output, (8, expected_output_dict))
+
     def test_safe_delete_cascade_control_attribute_overriding(self):
 
         with self.assertRaises(FieldError):
@@ -294,6 +432,17 @@ class SimpleTest(TestCase):
         self.assertEqual(ChildGeneric.objects.count(), 1)
         self.assertEqual(ParentGeneric.objects.count(), 1)
 
+    def test_split_dependents_generic_foreign_key(self):
+        child = ChildGeneric.objects.create()
+        free_child = ChildGeneric.objects.create()
+        ParentGeneric.objects.create(child=child)
+
+        free, dependent = split_dependents(ChildGeneric.objects.all())
+        self.assertEqual(list(free), [free_child])
+        self.assertEqual(list(dependent), [child])
+        self.assertFalse(can_hard_delete(child))
+        self.assertTrue(can_hard_delete(free_child))
+
     def test_parent_self_cascade(self):
         parent = ParentSelf.objects.create()
         ParentSelf.objects.create(parent=parent)
@@ -303,3 +452,81 @@ class SimpleTest(TestCase):
         self.assertEqual(ParentSelf.objects.all().count(), 4)
         parent.delete()
         self.assertEqual(ParentSelf.objects.all().count(), 1)
+
+    def test_inherited_parent_cascade(self):
+        # The per-object implementation follows the relations to the multi-table inheritance parent.
+        pre_softdelete.connect(receiver, sender=InheritedParentReference)
+        self.addCleanup(pre_softdelete.disconnect, receiver, sender=InheritedParentReference)
+        child = InheritedChild.objects.create()
+        InheritedParentReference.objects.create(parent=child.inheritedparent_ptr)
+        child.delete()
+        self.assertFalse(InheritedParentReference.objects.exists())
+        self.assertFalse(InheritedChild.objects.exists())
+
+    def test_restrict_reached_through_cascade(self):
+        # Like Django, the songs are deleted with their artist even though their album restricts it.
+        artist = RestrictArtist.objects.create()
+        album = RestrictAlbum.objects.create(artist=artist)
+        RestrictSong.objects.create(artist=artist, album=album)
+        artist.delete()
+        self.assertFalse(RestrictSong.objects.exists())
+        self.assertFalse(RestrictAlbum.objects.exists())
+
+        other_artist = RestrictArtist.objects.create()
+        RestrictSong.objects.create(artist=other_artist, album=album)
+        RestrictArtist.all_objects.all().delete()
+        self.assertFalse(RestrictSong.objects.exists())
+
+    def test_restrict(self):
+        artist = RestrictArtist.objects.create()
+        album = RestrictAlbum.objects.create(artist=artist)
+        RestrictSong.objects.create(artist=RestrictArtist.objects.create(), album=album)
+        with self.assertRaises(ProtectedError):
+            album.delete()
+        with self.assertRaises(ProtectedError):
+            artist.delete()
+        self.assertTrue(RestrictAlbum.objects.exists())
+
+    def test_custom_on_delete(self):
+        # The custom handlers are run by the per-object implementation.
+        parent = CustomOnDeleteParent.objects.create()
+        CustomOnDeleteChild.objects.create(parent=parent)
+        parent.delete()
+        self.assertFalse(CustomOnDeleteChild.objects.exists())
+        self.assertEqual(CustomOnDeleteChild.deleted_objects.count(), 1)
+
+    def test_preview_cascade(self):
+        queryset = Author.objects.filter(pk=self.authors[2].pk)
+        preview = preview_cascade(queryset, sample_size=2)
+        self.assertEqual(
+            {label: (item.count, item.truncated) for label, item in preview.items()},
+            {
+                'safedelete.Article': (1, False),
+                'safedelete.Press': (1, False),
+                'safedelete.Section': (3, False),
+                'safedelete.Table': (3, False),
+                'safedelete.Image': (3, False),
+            },
+        )
+        self.assertEqual(preview['safedelete.Article'].pks, [self.articles[2].pk])
+        self.assertEqual(len(preview['safedelete.Section'].pks), 2)
+        # Nothing was deleted.
+        self.assertEqual(Section.objects.count(), 3)
+
+    def test_preview_cascade_max_count(self):
+        preview = preview_cascade(Author.objects.filter(pk=self.authors[2].pk), max_count=2)
+        self.assertEqual(preview['safedelete.Article'], (1, False, []))
+        self.assertEqual(preview['safedelete.Section'], (2, True, []))
+        # The deeper relations are walked from the first sections only.
+        if connection.features.allow_sliced_subqueries_with_in:
+            self.assertEqual(preview['safedelete.Table'], (1, True, []))
+            self.assertEqual(preview['safedelete.Image'], (1, True, []))
+
+    def test_preview_cascade_queries(self):
+        queryset = Author.objects.filter(pk=self.authors[2].pk)
+        with CaptureQueriesContext(connection) as queries:
+            preview_cascade(queryset)
+        for index in range(20):
+            Image.objects.create(index=index, section=self.sections[0])
+        with self.assertNumQueries(len(queries)):
+            preview_cascade(queryset)
@@ -0,0 +1,180 @@
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.apps import apps
+from django.db import NotSupportedError, connection, models
+from django.db.backends.signals import connection_created
+from django.db.migrations.state import ProjectState
+from django.test import TestCase
+
+from ..config import (
+    DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_NAME,
+    SOFT_DELETE,
+    SOFT_DELETE_CASCADE,
+)
+from ..models import SafeDeleteModel
+from ..triggers import (
+    CreateCascadeTriggers,
+    connect_recursive_triggers,
+    create_trigger_sql,
+    enable_recursive_triggers,
+)
+
+
+class TriggerParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+    _safedelete_db_cascade = True
+
+    name = models.CharField(max_length=100)
+
+
+class TriggerChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+    _safedelete_db_cascade = True
+
+    parent = models.ForeignKey(TriggerParent, on_delete=models.CASCADE)
+
+
+class TriggerGrandChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+    _safedelete_db_cascade = True
+
+    parent = models.ForeignKey(TriggerChild, on_delete=models.CASCADE)
+
+
+class TriggerNode(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+    _safedelete_db_cascade = True
+
+    parent = models.ForeignKey('self', null=True, on_delete=models.CASCADE)
+
+
+TRIGGER_MODELS = ('TriggerParent', 'TriggerChild', 'TriggerGrandChild', 'TriggerNode')
+
+
+def run_operations(method):
+    # The schema editor is not entered, SQLite does not allow it in the transaction of the test case.
+    state = ProjectState.from_apps(apps)
+    schema_editor = connection.schema_editor(collect_sql=True)
+    for model_name in TRIGGER_MODELS:
+        getattr(CreateCascadeTriggers(model_name), method)('safedelete', schema_editor, state, state)
+    with connection.cursor() as cursor:
+        for sql in schema_editor.collected_sql:
+            cursor.execute(sql)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'The triggers are created on SQLite and PostgreSQL')
+class TriggersTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Rolled back with the transaction of the test case.
+        run_operations('database_forwards')
+
+    def setUp(self):
+        self.parent = TriggerParent.objects.create(name='parent')
+        self.children = [TriggerChild.objects.create(parent=self.parent) for i in range(2)]
+        self.grand_children = [TriggerGrandChild.objects.create(parent=child) for child in self.children]
+        self.deleted_child = TriggerChild.objects.create(parent=self.parent)
+        self.deleted_child.delete()
+
+    def assertCascadeDeleted(self, deleted, operation_id=None):
+        for obj in self.children + self.grand_children:
+            obj.refresh_from_db()
+            self.assertEqual(getattr(obj, FIELD_NAME), deleted)
+            self.assertEqual(getattr(obj, DELETED_BY_CASCADE_FIELD_NAME), deleted is not None)
+            if DELETED_OPERATION_FIELD_NAME is not None:
+                self.assertEqual(getattr(obj, DELETED_OPERATION_FIELD_NAME), operation_id)
+
+    def test_delete(self):
+        # The cascade is a single statement.
+        with self.assertNumQueries(1):
+            result = self.parent.delete()
+        self.assertEqual(result, (1, {TriggerParent._meta.label: 1}))
+        self.assertCascadeDeleted(getattr(self.parent, FIELD_NAME), result.operation_id)
+        # The objects deleted before keep their deletion.
+        deleted = getattr(self.deleted_child, FIELD_NAME)
+        self.deleted_child.refresh_from_db()
+        self.assertEqual(getattr(self.deleted_child, FIELD_NAME), deleted)
+        self.assertFalse(getattr(self.deleted_child, DELETED_BY_CASCADE_FIELD_NAME))
+
+    def test_undelete(self):
+        self.parent.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.parent.undelete(), (1, {TriggerParent._meta.label: 1}))
+        self.assertCascadeDeleted(None)
+        self.assertEqual(TriggerChild.deleted_objects.get(), self.deleted_child)
+
+    def test_queryset(self):
+        with self.assertNumQueries(1):
+            TriggerParent.objects.all().delete()
+        self.assertEqual(TriggerGrandChild.objects.count(), 0)
+        with self.assertNumQueries(1):
+            TriggerParent.deleted_objects.all().undelete()
+        self.assertEqual(TriggerGrandChild.objects.count(), 2)
+        self.assertEqual(TriggerChild.objects.count(), 2)
+
+    def test_forced_policy(self):
+        # A forced SOFT_DELETE is cascaded by the triggers too.
+        self.children[0].delete(force_policy=SOFT_DELETE)
+        self.grand_children[0].refresh_from_db()
+        self.assertTrue(getattr(self.grand_children[0], DELETED_BY_CASCADE_FIELD_NAME))
+
+    def test_self_referential(self):
+        # The triggers of a table fire on the rows it updates, down a tree.
+        nodes = [TriggerNode.objects.create()]
+        for i in range(5):
+            nodes.append(TriggerNode.objects.create(parent=nodes[-1]))
+        self.assertEqual(TriggerNode._check_db_cascade(), [])
+        nodes[0].delete()
+        self.assertEqual(TriggerNode.objects.count(), 0)
+        self.assertEqual(TriggerNode.deleted_objects.filter(**{DELETED_BY_CASCADE_FIELD_NAME: True}).count(), 5)
+        nodes[0].undelete()
+        self.assertEqual(TriggerNode.objects.count(), 6)
+
+    def test_backwards(self):
+        run_operations('database_backwards')
+        self.parent.delete()
+        self.assertEqual(TriggerChild.objects.count(), 2)
+
+    def test_check(self):
+        self.assertEqual(TriggerParent._check_db_cascade(), [])
+        with patch.object(TriggerChild, '_safedelete_db_cascade', False):
+            errors = TriggerParent._check_db_cascade()
+        self.assertEqual([error.id for error in errors], ['safedelete.E003'])
+
+
+class TriggerSQLTestCase(TestCase):
+
+    def test_sql(self):
+        statements = create_trigger_sql(TriggerParent, connection)
+        # SQLite has a trigger per transition, PostgreSQL a function with both.
+        expected = 2 if connection.vendor == 'sqlite' else 1
+        self.assertEqual(sum(TriggerChild._meta.db_table in sql for sql in statements), expected)
+        # The leaves have no trigger.
+        self.assertTrue(all(sql.startswith('DROP') for sql in create_trigger_sql(TriggerGrandChild, connection)))
+
+    def test_not_supported(self):
+        mysql = Mock(vendor='mysql', display_name='MySQL')
+        with self.assertRaises(NotSupportedError):
+            create_trigger_sql(TriggerParent, mysql)
+
+    def test_connect_recursive_triggers(self):
+        # Connected when the models of this module were defined, only for the models cascading in the database.
+        self.assertTrue(connection_created.disconnect(dispatch_uid='safedelete_recursive_triggers'))
+        self.addCleanup(
+            connection_created.connect, enable_recursive_triggers, dispatch_uid='safedelete_recursive_triggers',
+        )
+        connect_recursive_triggers(SafeDeleteModel)
+        self.assertFalse(connection_created.disconnect(dispatch_uid='safedelete_recursive_triggers'))
+        connect_recursive_triggers(TriggerParent)
+        self.assertTrue(connection_created.disconnect(dispatch_uid='safedelete_recursive_triggers'))
+
+    def test_operation(self):
+        operation = CreateCascadeTriggers('TriggerParent')
+        self.assertEqual(operation.describe(), 'Create the safedelete cascade triggers of TriggerParent')
+        self.assertEqual(operation.migration_name_fragment, 'cascade_triggers_triggerparent')
+        self.assertEqual(operation.deconstruct(), ('CreateCascadeTriggers', ('TriggerParent',), {}))
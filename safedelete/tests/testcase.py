@@ -1,9 +1,25 @@
+import json
+import os
 import unittest
 
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from ..config import HARD_DELETE, SOFT_DELETE
 
+QUERY_BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+class ReadReplicaRouter:
+    """ Route the reads to a "replica" database which is not configured, so that any read from it fails. """
+
+    def db_for_read(self, model, **hints):
+        return 'replica'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
 
 class SafeDeleteTestCase(TestCase):
 
@@ -143,3 +159,61 @@ class SafeDeleteForceTestCase(SafeDeleteTestCase):
         """Test whether the subclasses their instances can also be force soft deleted."""
         self.check_skip()
         self.assertSoftDelete(self.instance, force=True)
+
+
+class QueryBudgetTestCase(TestCase):
+    """Compare the number of queries of operations to the budgets of ``query_budgets.json``.
+
+    Each operation is run for each of the ``sizes``, on data created for that size, and the
+    number of queries is compared to the budget recorded for that size. An operation running
+    more queries than its budget fails, and so does an operation whose budget is the same
+    for all the sizes but whose number of queries grows with the size.
+
+    Run the tests with the ``SAFE_DELETE_UPDATE_QUERY_BUDGETS`` environment variable set
+    to record the current numbers of queries as the budgets instead.
+    """
+    sizes = (1, 4, 16)
+
+    def count_queries(self, setup, operation, size):
+        """Return the number of queries run by "operation", called with the result of "setup".
+
+        Both are run in a transaction rolled back afterwards, so that each size starts from the same data.
+        """
+        with transaction.atomic():
+            data = setup(size)
+            with CaptureQueriesContext(connection) as queries:
+                operation(data)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def assertQueryBudget(self, name, setup, operation):
+        """Assert that "operation" does not run more queries than the budget "name".
+
+        Args:
+            name: The name of the budget in ``query_budgets.json``.
+            setup: A function creating the data for a size, its result is passed to "operation".
+            operation: The function whose queries are counted.
+        """
+        counts = {str(size): self.count_queries(setup, operation, size) for size in self.sizes}
+
+        with open(QUERY_BUDGETS_PATH) as f:
+            budgets = json.load(f)
+        if os.environ.get('SAFE_DELETE_UPDATE_QUERY_BUDGETS'):
+            budgets[name] = counts
+            with open(QUERY_BUDGETS_PATH, 'w') as f:
+                json.dump(dict(sorted(budgets.items())), f, indent=2)
+                f.write('\n')
+            return
+
+        budget = budgets.get(name)
+        if budget is None:
+            self.fail('No query budget for %s, run the tests with SAFE_DELETE_UPDATE_QUERY_BUDGETS=1.' % name)
+        self.assertEqual(sorted(budget), sorted(counts), 'The query budget of %s has other sizes.' % name)
+        if len(set(budget.values())) == 1 and len(set(counts.values())) > 1:
+            self.fail('%s ran %s queries, which was constant: %s' % (name, counts, budget))
+        for size, count in counts.items():
+            self.assertLessEqual(
+                count, budget[size], '%s ran %d queries for a size of %s, over its budget of %d.' % (
+                    name, count, size, budget[size],
+                ),
+            )
@@ -0,0 +1,213 @@
+"""Database triggers soft deleting and undeleting in cascade.
+
+With the triggers of a model, soft deleting one of its objects (setting its ``deleted`` field) soft
+deletes the objects related to it through ``CASCADE`` foreign keys in the same statement, marking
+them as deleted by cascade, and undeleting it undeletes them. The triggers of the related models
+continue the cascade.
+
+The triggers are created by the :py:class:`CreateCascadeTriggers` migration operation, on SQLite and
+PostgreSQL, and used by the models setting ``_safedelete_db_cascade``.
+"""
+from django.db import NotSupportedError
+from django.db.backends.signals import connection_created
+from django.db.backends.utils import truncate_name
+from django.db.migrations.operations.base import Operation
+from django.db.models import CASCADE
+
+from .config import (
+    DELETED_BY_CASCADE_FIELD_NAME,
+    DELETED_OPERATION_FIELD_NAME,
+    FIELD_NAME,
+)
+from .utils import has_field, has_operation_field
+
+
+def has_local_field(model, field_name):
+    """ Return whether "model" has the field "field_name" in its own table, not in the table of a parent. """
+    return has_field(model, field_name) and model._meta.get_field(field_name) in model._meta.local_fields
+
+
+def get_trigger_relations(model):
+    """ Return the foreign keys of the objects soft deleted and undeleted by the triggers of "model".
+
+    These are the ``CASCADE`` foreign keys to "model" of the models with a ``deleted`` and
+    a ``deleted_by_cascade`` field in their own table. "model" can be a historical model.
+    """
+    relations = []
+    for rel in model._meta.related_objects:
+        if rel.many_to_many or rel.on_delete is not CASCADE or getattr(rel, 'parent_link', False):
+            continue
+        field = rel.field
+        if field.target_field.model._meta.db_table != model._meta.db_table:
+            continue
+        if has_local_field(field.model, FIELD_NAME) and has_local_field(field.model, DELETED_BY_CASCADE_FIELD_NAME):
+            relations.append(field)
+    return relations
+
+
+def get_trigger_name(model, suffix, connection):
+    return truncate_name(
+        'safedelete_%s_%s' % (model._meta.db_table, suffix), connection.ops.max_name_length(),
+    )
+
+
+def cascade_update_sql(model, field, connection, undelete=False):
+    """ Return the ``UPDATE`` of the objects related through "field" run by the triggers of "model". """
+    quote_name = connection.ops.quote_name
+    related_model = field.model
+
+    def column(model, field_name):
+        return quote_name(model._meta.get_field(field_name).column)
+
+    deleted = column(related_model, FIELD_NAME)
+    by_cascade = column(related_model, DELETED_BY_CASCADE_FIELD_NAME)
+    if undelete:
+        values = [(deleted, 'NULL'), (by_cascade, 'FALSE')]
+        condition = '%s AND %s IS NOT NULL' % (by_cascade, deleted)
+        if has_operation_field(related_model):
+            values.append((column(related_model, DELETED_OPERATION_FIELD_NAME), 'NULL'))
+    else:
+        values = [(deleted, 'NEW.%s' % column(model, FIELD_NAME)), (by_cascade, 'TRUE')]
+        condition = '%s IS NULL' % deleted
+        if has_operation_field(related_model) and has_operation_field(model):
+            values.append((column(related_model, DELETED_OPERATION_FIELD_NAME), 'NEW.%s' % column(model, DELETED_OPERATION_FIELD_NAME)))
+    return 'UPDATE %s SET %s WHERE %s = NEW.%s AND %s' % (
+        quote_name(related_model._meta.db_table),
+        ', '.join('%s = %s' % value for value in values),
+        quote_name(field.column),
+        quote_name(field.target_field.column),
+        condition,
+    )
+
+
+def create_trigger_sql(model, connection):
+    """ Return the statements (re)creating the triggers of "model" on "connection". """
+    if not has_local_field(model, FIELD_NAME):
+        raise ValueError('%s has no deleted field in its own table.' % model._meta.label)
+    drop_statements = drop_trigger_sql(model, connection)
+    relations = get_trigger_relations(model)
+    if not relations:
+        return drop_statements
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    deleted = quote_name(model._meta.get_field(FIELD_NAME).column)
+    delete_statements = [cascade_update_sql(model, field, connection) for field in relations]
+    undelete_statements = [cascade_update_sql(model, field, connection, undelete=True) for field in relations]
+
+    if connection.vendor == 'sqlite':
+        # A trigger per transition, the statements of a trigger body end with a semicolon.
+        return drop_statements + [
+            'CREATE TRIGGER %s AFTER UPDATE OF %s ON %s FOR EACH ROW WHEN %s BEGIN %s; END' % (
+                quote_name(get_trigger_name(model, suffix, connection)), deleted, table,
+                condition, '; '.join(statements),
+            )
+            for suffix, condition, statements in (
+                ('delete', 'OLD.%s IS NULL AND NEW.%s IS NOT NULL' % (deleted, deleted), delete_statements),
+                ('undelete', 'OLD.%s IS NOT NULL AND NEW.%s IS NULL' % (deleted, deleted), undelete_statements),
+            )
+        ]
+
+    # PostgreSQL
+    name = quote_name(get_trigger_name(model, 'cascade', connection))
+    return drop_statements + [
+        'CREATE FUNCTION %s() RETURNS trigger AS $$ BEGIN '
+        'IF OLD.%s IS NULL AND NEW.%s IS NOT NULL THEN %s; '
+        'ELSIF OLD.%s IS NOT NULL AND NEW.%s IS NULL THEN %s; '
+        'END IF; RETURN NULL; END; $$ LANGUAGE plpgsql' % (
+            name,
+            deleted, deleted, '; '.join(delete_statements),
+            deleted, deleted, '; '.join(undelete_statements),
+        ),
+        'CREATE TRIGGER %s AFTER UPDATE OF %s ON %s FOR EACH ROW EXECUTE FUNCTION %s()' % (
+            name, deleted, table, name,
+        ),
+    ]
+
+
+def drop_trigger_sql(model, connection):
+    """ Return the statements dropping the triggers of "model" on "connection", if they exist. """
+    quote_name = connection.ops.quote_name
+    if connection.vendor == 'sqlite':
+        return [
+            'DROP TRIGGER IF EXISTS %s' % quote_name(get_trigger_name(model, suffix, connection))
+            for suffix in ('delete', 'undelete')
+        ]
+    if connection.vendor == 'postgresql':
+        name = quote_name(get_trigger_name(model, 'cascade', connection))
+        return [
+            'DROP TRIGGER IF EXISTS %s ON %s' % (name, quote_name(model._meta.db_table)),
+            'DROP FUNCTION IF EXISTS %s()' % name,
+        ]
+    raise NotSupportedError('The safedelete cascade triggers are not supported on %s.' % connection.display_name)
+
+
+def enable_recursive_triggers(sender, connection, **kwargs):
+    """ Let the triggers fire the triggers of the rows they update on SQLite, to cascade between objects of a same table.
+
+    Connected to ``connection_created`` by :py:func:`connect_recursive_triggers`, PostgreSQL triggers are always recursive.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA recursive_triggers = ON')
+
+
+def connect_recursive_triggers(sender, **kwargs):
+    """ Enable the recursive triggers on the connections opened once a model setting ``_safedelete_db_cascade`` is defined.
+
+    Connected to ``class_prepared``, the other projects keep the default semantics of their triggers.
+    """
+    if getattr(sender, '_safedelete_db_cascade', False):
+        connection_created.connect(enable_recursive_triggers, dispatch_uid='safedelete_recursive_triggers')
+
+
+class CreateCascadeTriggers(Operation):
+    """Create the triggers soft deleting and undeleting in cascade the objects related to a model.
+
+    The triggers follow the ``CASCADE`` foreign keys to the model of the models with a
+    ``deleted_by_cascade`` field, as they are in the migration state, so the operation goes after
+    the migrations creating them. Running it again replaces the triggers, e.g. once a relation was added.
+
+    .. code-block:: python
+
+        from safedelete.triggers import CreateCascadeTriggers
+
+        class Migration(migrations.Migration):
+            dependencies = [('blog', '0002_comment')]
+            operations = [CreateCascadeTriggers('Article')]
+
+    Args:
+        model_name: The name of the model, in the app of the migration.
+    """
+
+    reversible = True
+    reduces_to_sql = True
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    @property
+    def model_name_lower(self):
+        return self.model_name.lower()
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in create_trigger_sql(model, schema_editor.connection):
+                schema_editor.execute(sql, params=None)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in drop_trigger_sql(model, schema_editor.connection):
+                schema_editor.execute(sql, params=None)
+
+    def describe(self):
+        return 'Create the safedelete cascade triggers of %s' % self.model_name
+
+    @property
+    def migration_name_fragment(self):
+        return 'cascade_triggers_%s' % self.model_name_lower
@@ -1,31 +1,75 @@
 from itertools import chain
 
+from django.conf import settings
 from django.contrib.admin.utils import NestedObjects
+from django.core.exceptions import FieldDoesNotExist
 from django.db import router
 
-from .config import DELETED_BY_CASCADE_FIELD_NAME
+from .config import DELETED_BY_CASCADE_FIELD_NAME, DELETED_OPERATION_FIELD_NAME
 
 
-def related_objects(obj, only_deleted_by_cascade=False):
+def related_objects(obj, only_deleted_by_cascade=False, collector=None):
     """ Return a generator to the objects that would be deleted if we delete "obj" (excluding obj)
 
     Args:
         only_deleted_by_cascade: Include filter in flatten method to bypass elements controling undelete cascading.
+        collector: A ``NestedObjects`` collector which already collected "obj", e.g. along with other objects
+            so that their related objects are collected with a query per relation. (default: {None})
     """
 
-    collector = NestedObjects(using=router.db_for_write(type(obj)))
-    collector.collect([obj])
+    if collector is None:
+        collector = NestedObjects(using=router.db_for_write(type(obj)))
+        collector.collect([obj])
+
+    # The multi-table inheritance parents of "obj" are collected with it, the objects referencing them hang off them.
+    parent_models = set(obj._meta.get_parent_list())
+    roots = [obj, *(
+        elem for model, instances in collector.data.items() if model in parent_models
+        for elem in instances if elem.pk == obj.pk
+    )]
 
     def flatten(elem):
         if isinstance(elem, tuple):
             return elem
-        elif obj == elem or not only_deleted_by_cascade or getattr(elem, DELETED_BY_CASCADE_FIELD_NAME, False):
-            elem = [(elem,) if elem != obj else (), *collector.edges.get(elem, [])]
+        is_root = any(elem is root for root in roots) or obj == elem
+        if is_root or not only_deleted_by_cascade or getattr(elem, DELETED_BY_CASCADE_FIELD_NAME, False):
+            elem = [(elem,) if not is_root else (), *collector.edges.get(elem, [])]
             return chain.from_iterable(map(flatten, elem))
         return ()
 
-    return chain.from_iterable(map(flatten, collector.edges[None]))
+    return chain.from_iterable(map(flatten, roots))
 
 
 def can_hard_delete(obj):
-    return not bool(list(related_objects(obj)))
+    """ Return whether nothing would be deleted in cascade with "obj", see :py:func:`safedelete.cascade.has_dependents`. """
+    from .cascade import has_dependents
+
+    return not has_dependents(obj)
+
+
+def has_field(model, field_name):
+    """ Return whether "model" has a field named "field_name", e.g. the optional deleted_by_cascade field. """
+    try:
+        model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def has_operation_field(model):
+    """ Return whether "model" has the deletion operation field, see the SAFE_DELETE_OPERATION_FIELD_NAME setting. """
+    return DELETED_OPERATION_FIELD_NAME is not None and has_field(model, DELETED_OPERATION_FIELD_NAME)
+
+
+def update_in_batches(model, pks, using, filters, values, batch_size=None):
+    """ Update the objects of "model" matching "filters" by batches of primary keys, return their number.
+
+    The batch size defaults to the SAFE_DELETE_BULK_BATCH_SIZE setting.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'SAFE_DELETE_BULK_BATCH_SIZE', 1000)
+    manager = model._base_manager.db_manager(using)
+    count = 0
+    for start in range(0, len(pks), batch_size):
+        count += manager.filter(pk__in=pks[start:start + batch_size], **filters).update(**values)
+    return count
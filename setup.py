@@ -27,7 +27,7 @@ version = get_version('safedelete')
 
 setup(
     name='django-safedelete',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     version=version,
     description='Mask your objects instead of deleting them from your database.',
     long_description=long_description,